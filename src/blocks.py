@@ -0,0 +1,135 @@
+"""
+Block module for DXF Viewer application.
+Block definitions are compiled once into their own scene in block
+coordinates. INSERT and MINSERT entities only store a 2D transform and
+the array grid and are drawn as transformed copies of that scene.
+"""
+
+import math
+import numpy as np
+
+# Nested INSERTs deeper than this are not drawn
+MAX_BLOCK_DEPTH = 16
+
+# insert_params columns: 2D affine transform (block -> world) as
+# (m11, m12, m21, m22, dx, dy), MINSERT column and row step in world units
+# and the column and row counts
+INSERT_PARAMS = 12
+
+
+class Block:
+    """Compiled block definition shared by all INSERTs that reference it"""
+
+    def __init__(self, name, scene):
+        self.name = name
+        self.scene = scene      # Block content in block coordinates
+        self.bbox = scene.bounds()
+        bbox = self.bbox or (0.0, 0.0, 0.0, 0.0)
+        self.size = max(bbox[2] - bbox[0], bbox[3] - bbox[1])
+        # Drawing cache filled by the renderer
+        self.paths = {}         # (level, fill mode) -> combined outlines per block style
+
+
+class BlockTable:
+    """Compiled blocks by id, shared by a scene and the scenes of its blocks"""
+
+    def __init__(self):
+        self.blocks = []
+        self.ids = {}
+        # Names being compiled, guards against blocks that contain themselves
+        self._compiling = set()
+
+    def __getitem__(self, block_id):
+        return self.blocks[block_id]
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def add(self, block):
+        self.ids[block.name] = len(self.blocks)
+        self.blocks.append(block)
+        return self.ids[block.name]
+
+    def compile(self, layout, layer_table, scene_type):
+        """
+        Id of a block layout, compiled on first use. None if the block has
+        no drawable content or references itself.
+        """
+        name = layout.name
+        if name in self.ids:
+            return self.ids[name]
+        if name in self._compiling:
+            return None
+
+        self._compiling.add(name)
+        try:
+            scene = scene_type(layer_table, blocks=self)
+            for entity in layout:
+                scene.add(entity)
+            scene.build_index()
+        finally:
+            self._compiling.discard(name)
+        block = Block(name, scene)
+        if block.bbox is None:
+            # Remembered so the layout is not compiled again
+            self.ids[name] = None
+            return None
+        return self.add(block)
+
+
+def insert_params(insert):
+    """insert_params row of an INSERT or MINSERT entity"""
+    matrix = insert.matrix44()
+    ux, uy, origin = matrix.ux, matrix.uy, matrix.origin
+
+    dxf = insert.dxf
+    columns = dxf.get('column_count', 1) if dxf.get('column_spacing', 0) else 1
+    rows = dxf.get('row_count', 1) if dxf.get('row_spacing', 0) else 1
+    # The grid is rotated with the insert but not scaled
+    ocs = insert.ocs()
+    angle = math.radians(dxf.get('rotation', 0))
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    column_step = ocs.to_wcs((dxf.get('column_spacing', 0) * cos_a,
+                              dxf.get('column_spacing', 0) * sin_a, 0))
+    row_step = ocs.to_wcs((-dxf.get('row_spacing', 0) * sin_a,
+                           dxf.get('row_spacing', 0) * cos_a, 0))
+    return (ux.x, ux.y, uy.x, uy.y, origin.x, origin.y,
+            column_step.x, column_step.y, row_step.x, row_step.y,
+            max(int(columns), 1), max(int(rows), 1))
+
+
+def insert_offsets(params):
+    """(n, 2) world offsets of all MINSERT copies, a single zero row for INSERT"""
+    columns, rows = int(params[10]), int(params[11])
+    column, row = np.meshgrid(np.arange(columns), np.arange(rows))
+    column = column.ravel()[:, None]
+    row = row.ravel()[:, None]
+    return column * np.asarray(params[6:8]) + row * np.asarray(params[8:10])
+
+
+def transform_bbox(bbox, params):
+    """World bounding box of a block box placed with an insert_params transform"""
+    m11, m12, m21, m22, dx, dy = params[:6]
+    xs = np.array([bbox[0], bbox[2], bbox[0], bbox[2]])
+    ys = np.array([bbox[1], bbox[1], bbox[3], bbox[3]])
+    world_x = m11 * xs + m21 * ys + dx
+    world_y = m12 * xs + m22 * ys + dy
+    return (float(world_x.min()), float(world_y.min()),
+            float(world_x.max()), float(world_y.max()))
+
+
+def insert_bbox(bbox, params):
+    """World bounding box of all copies of an INSERT or MINSERT"""
+    min_x, min_y, max_x, max_y = transform_bbox(bbox, params)
+    # Copies are translations, the grid corners bound them
+    offsets = insert_offsets(params)
+    low = offsets.min(axis=0)
+    high = offsets.max(axis=0)
+    return (min_x + float(low[0]), min_y + float(low[1]),
+            max_x + float(high[0]), max_y + float(high[1]))
+
+
+def insert_scale(params):
+    """Largest scale factor of an insert transform"""
+    m11, m12, m21, m22 = params[:4]
+    return max(math.hypot(m11, m12), math.hypot(m21, m22))
@@ -0,0 +1,89 @@
+"""
+Drawing bounds module for DXF Viewer application.
+Per-layer extents computed with NumPy over the primitive bounding boxes
+and kept up to date when primitives are edited or removed.
+"""
+
+import numpy as np
+
+
+class LayerBounds:
+    def __init__(self, bboxes, codes, layer_ids):
+        """
+        bboxes: (n, 4) array of (min_x, min_y, max_x, max_y), NaN rows are ignored.
+        codes: layer id per row, layer_ids: layer name -> id.
+        All three are shared with their owner and read again on updates.
+        """
+        self.bboxes = bboxes
+        self.codes = codes
+        self.layer_ids = layer_ids
+        self._compute()
+
+    def _compute(self):
+        """Extents of all layers at once"""
+        count = len(self.layer_ids)
+        self._mins = np.full((count, 2), np.inf)
+        self._maxs = np.full((count, 2), -np.inf)
+        valid = ~np.isnan(self.bboxes).any(axis=1)
+        np.minimum.at(self._mins, self.codes[valid], self.bboxes[valid, :2])
+        np.maximum.at(self._maxs, self.codes[valid], self.bboxes[valid, 2:])
+
+    def _compute_layer(self, layer_id):
+        boxes = self.bboxes[self.codes == layer_id]
+        boxes = boxes[~np.isnan(boxes).any(axis=1)]
+        if len(boxes):
+            self._mins[layer_id] = boxes[:, :2].min(axis=0)
+            self._maxs[layer_id] = boxes[:, 2:].max(axis=0)
+        else:
+            self._mins[layer_id] = np.inf
+            self._maxs[layer_id] = -np.inf
+
+    def update(self, index, old_bbox, old_id):
+        """
+        Account for a changed row after its box and layer id were updated.
+        old_bbox is the previous box or None, a NaN box means removed.
+        """
+        new_id = int(self.codes[index])
+        missing = len(self.layer_ids) - len(self._mins)
+        if missing > 0:
+            # Layers added by edits
+            self._mins = np.vstack([self._mins, np.full((missing, 2), np.inf)])
+            self._maxs = np.vstack([self._maxs, np.full((missing, 2), -np.inf)])
+
+        # Shrinking is only possible if the old box touched the layer extents
+        if old_bbox is not None:
+            mins = self._mins[old_id]
+            maxs = self._maxs[old_id]
+            if (old_bbox[0] <= mins[0] or old_bbox[1] <= mins[1] or
+                    old_bbox[2] >= maxs[0] or old_bbox[3] >= maxs[1]):
+                self._compute_layer(old_id)
+
+        # Growing never needs a rescan
+        bbox = self.bboxes[index]
+        if not np.isnan(bbox).any():
+            np.minimum(self._mins[new_id], bbox[:2], out=self._mins[new_id])
+            np.maximum(self._maxs[new_id], bbox[2:], out=self._maxs[new_id])
+
+    def layer(self, name):
+        """Extents of one layer, None if it has no geometry"""
+        layer_id = self.layer_ids.get(name)
+        if layer_id is None:
+            return None
+        return self._extents([layer_id])
+
+    def union(self, layers=None):
+        """Extents of the given layers (all by default), None if empty"""
+        if layers is None:
+            ids = list(range(len(self.layer_ids)))
+        else:
+            ids = [self.layer_ids[name] for name in layers if name in self.layer_ids]
+        return self._extents(ids)
+
+    def _extents(self, ids):
+        if not ids:
+            return None
+        mins = self._mins[ids].min(axis=0)
+        maxs = self._maxs[ids].max(axis=0)
+        if not np.isfinite(mins).all():
+            return None
+        return (float(mins[0]), float(mins[1]), float(maxs[0]), float(maxs[1]))
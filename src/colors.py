@@ -0,0 +1,102 @@
+"""
+Color module for DXF Viewer application.
+The AutoCAD Color Index (ACI) table shared by all widgets and the
+resolution of entity colors from their layer and color attributes.
+"""
+
+from ezdxf.colors import DXF_DEFAULT_COLORS, int2rgb
+
+# ByBlock and ByLayer color indices
+BYBLOCK = 0
+BYLAYER = 256
+
+# Full 256 entry ACI table, index 7 (white/black) is drawn black
+# on the light background
+ACI_COLORS = tuple(tuple(int2rgb(value)) for value in DXF_DEFAULT_COLORS)
+ACI_COLORS = ACI_COLORS[:7] + ((0, 0, 0),) + ACI_COLORS[8:]
+
+
+def aci_to_rgb(color_index):
+    """
+    AutoCAD Color Index (ACI) color to RGB conversion
+    """
+    if 0 <= color_index <= 255:
+        return ACI_COLORS[color_index]
+    return (0, 0, 0)  # ByLayer and invalid indices
+
+
+def white_to_black(rgb):
+    # White would be invisible on the light background
+    return (0, 0, 0) if rgb == (255, 255, 255) else rgb
+
+
+def layer_color(layer):
+    """(r, g, b) swatch color of a layer table entry"""
+    try:
+        # First check RGB value
+        if layer.rgb is not None:
+            return tuple(layer.rgb)
+        # Check ACI color
+        if hasattr(layer.dxf, 'color') and layer.dxf.color >= 0:
+            return aci_to_rgb(layer.dxf.color)
+    except Exception as e:
+        print(f"Color conversion error: {str(e)}")
+    return (255, 255, 255)  # Default white
+
+
+def style_key(entity):
+    """Raw style attributes of an entity: (layer, color, true color, linetype)"""
+    true_color = entity.rgb if hasattr(entity, 'rgb') else None
+    return (
+        entity.dxf.layer,
+        entity.dxf.get('color', BYLAYER),
+        tuple(true_color) if true_color is not None else None,
+        entity.dxf.get('linetype')
+    )
+
+
+def block_style_key(key, insert_key):
+    """Style of a block entity drawn through an INSERT with style insert_key"""
+    layer, color, true_color, linetype = key
+    insert_layer, insert_color, insert_true_color, insert_linetype = insert_key
+    # Entities on layer 0 take the layer of the INSERT
+    if layer == '0':
+        layer = insert_layer
+    if color == BYBLOCK:
+        color, true_color = insert_color, insert_true_color
+    if linetype is not None and linetype.upper() == 'BYBLOCK':
+        linetype = insert_linetype
+    return (layer, color, true_color, linetype)
+
+
+def resolve_color(layer_table, layer_name, color_index, true_color):
+    """Resolved (r, g, b) drawing color for raw style attributes"""
+    try:
+        if color_index is not None:
+            # If layer (256) or by block (0), use layer color
+            if color_index == BYLAYER or color_index == BYBLOCK:
+                layer = layer_table.get(layer_name)
+                if layer and hasattr(layer.dxf, 'color'):
+                    color_index = layer.dxf.color
+                    # If layer has RGB value, use it
+                    if layer.rgb is not None:
+                        return white_to_black(tuple(layer.rgb))
+
+            # If RGB value exists, use it
+            if true_color is not None:
+                return white_to_black(tuple(true_color))
+            # Convert ACI color code to RGB
+            elif color_index >= 0:
+                return white_to_black(aci_to_rgb(color_index))
+
+        # Layer color
+        layer = layer_table.get(layer_name)
+        if layer:
+            if layer.rgb is not None:
+                return white_to_black(tuple(layer.rgb))
+            elif hasattr(layer.dxf, 'color') and layer.dxf.color >= 0:
+                return white_to_black(aci_to_rgb(layer.dxf.color))
+    except Exception as e:
+        print(f"Color conversion error: {str(e)}")
+
+    return (0, 0, 0)  # Default color is black
@@ -0,0 +1,119 @@
+"""
+Background document loading for DXF Viewer application.
+Parses DXF files (or restores them from the geometry cache) on a worker
+thread, reports progress by phase and supports cancellation.
+"""
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from dxf_document import LoadCancelled
+from geometry_cache import GeometryCache, load_document
+
+
+class _LoadThread(QThread):
+    progress = pyqtSignal(str, int)  # phase, percent (-1 = unknown)
+    loaded = pyqtSignal(object)      # DXFDocument
+    failed = pyqtSignal(str)         # error message
+    cancelled = pyqtSignal()
+
+    def __init__(self, filepath, streaming=False, cache=None, parent=None):
+        super().__init__(parent)
+        self.filepath = filepath
+        self.streaming = streaming
+        self.cache = cache
+        self._cancel_requested = False
+        self._last_report = None
+
+    def cancel(self):
+        """Request cancellation, checked at the next progress report"""
+        self._cancel_requested = True
+
+    def run(self):
+        try:
+            # Reopened files come from the geometry cache
+            document = load_document(self.filepath, self._report,
+                                     cache=self.cache, streaming=self.streaming)
+        except LoadCancelled:
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+
+        if self._cancel_requested:
+            self.cancelled.emit()
+        else:
+            self.loaded.emit(document)
+
+    def _report(self, phase, done, total):
+        if self._cancel_requested:
+            raise LoadCancelled()
+        percent = int(done * 100 / total) if total else -1
+        if (phase, percent) != self._last_report:
+            self._last_report = (phase, percent)
+            self.progress.emit(phase, percent)
+
+
+class DocumentLoader(QObject):
+    """Loads one document at a time; starting a new load cancels the old one"""
+    started = pyqtSignal(str)        # filepath
+    progress = pyqtSignal(str, int)  # phase, percent (-1 = unknown)
+    loaded = pyqtSignal(object)      # DXFDocument
+    failed = pyqtSignal(str)         # error message
+    cancelled = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._thread = None
+        # Read files entity by entity into view-only documents
+        self.streaming = False
+        # Compiled scenes of reopened files, None parses every time
+        self.cache = GeometryCache()
+        # Cancelled threads are kept alive until they actually finish
+        self._threads = set()
+
+    def is_loading(self):
+        return self._thread is not None
+
+    def load(self, filepath):
+        """Start loading filepath in the background"""
+        self.cancel()
+
+        thread = _LoadThread(filepath, self.streaming, self.cache)
+        thread.progress.connect(lambda phase, percent: self._on_progress(thread, phase, percent))
+        thread.loaded.connect(lambda document: self._on_loaded(thread, document))
+        thread.failed.connect(lambda message: self._on_failed(thread, message))
+        thread.cancelled.connect(lambda: self._on_cancelled(thread))
+        thread.finished.connect(lambda: self._threads.discard(thread))
+
+        self._thread = thread
+        self._threads.add(thread)
+        self.started.emit(filepath)
+        thread.start()
+
+    def cancel(self):
+        """Cancel the running load, its result is discarded"""
+        if self._thread is None:
+            return
+        thread = self._thread
+        self._thread = None
+        thread.cancel()
+        self.cancelled.emit()
+
+    def _on_progress(self, thread, phase, percent):
+        if thread is self._thread:
+            self.progress.emit(phase, percent)
+
+    def _on_loaded(self, thread, document):
+        if thread is self._thread:
+            self._thread = None
+            self.loaded.emit(document)
+
+    def _on_failed(self, thread, message):
+        if thread is self._thread:
+            self._thread = None
+            self.failed.emit(message)
+
+    def _on_cancelled(self, thread):
+        if thread is self._thread:
+            self._thread = None
+            self.cancelled.emit()
@@ -0,0 +1,246 @@
+"""
+Loaded DXF document module for DXF Viewer application.
+A DXF file is parsed once into a DXFDocument which is shared by the
+handler, the file panel and the canvas.
+"""
+
+import os
+import ezdxf
+from ezdxf.addons import iterdxf
+from ezdxf.entities import factory
+from ezdxf.entities.subentity import entity_linker
+from ezdxf.lldxf.extendedtags import ExtendedTags
+from ezdxf.lldxf.tagger import tag_compiler
+from ezdxf.lldxf.validator import is_binary_dxf_file
+from ezdxf.filemanagement import dxf_file_info
+from scene import Scene
+from colors import layer_color
+
+# Load phases reported to progress callbacks
+PHASE_READ = "read"
+PHASE_COUNT = "count"
+PHASE_COMPILE = "compile"
+PHASE_BOUNDS = "bounds"
+
+# Report progress every this many lines/entities
+PROGRESS_INTERVAL = 65536
+
+
+class LoadCancelled(Exception):
+    """Raised from a progress callback to abort loading"""
+
+
+class DXFDocument:
+    def __init__(self, filepath, doc, scene=None):
+        """doc may be None for documents restored from the geometry cache"""
+        self.filepath = filepath
+        self._doc = doc
+        self.scene = scene or Scene(doc.layers)
+        self.entity_counts = {}
+        # Entity type -> number of entities that are not drawn
+        self.skipped = {}
+        self.layers = []
+        # Layer name -> (r, g, b) swatch color
+        self.layer_colors = {}
+        # Streamed documents have no ezdxf document and cannot be edited
+        self.read_only = False
+
+    @classmethod
+    def load(cls, filepath, progress=None):
+        """
+        Parse a DXF file and derive everything the UI needs in one pass.
+        progress(phase, done, total) is called periodically and may raise
+        LoadCancelled to abort.
+        """
+        progress = progress or _no_progress
+        document = cls(filepath, _read_file(filepath, progress))
+        document._scan_modelspace(progress)
+        return document
+
+    @classmethod
+    def stream(cls, filepath, progress=None):
+        """
+        View-only document read entity by entity in a single pass over the
+        file. Each entity is compiled and discarded right away, so memory use
+        stays proportional to the compiled geometry instead of the whole ezdxf
+        document. Binary DXF files are loaded normally.
+        """
+        progress = progress or _no_progress
+        if is_binary_dxf_file(filepath):
+            return cls.load(filepath, progress)
+
+        progress(PHASE_READ, 0, 0)
+        layer_table = _LayerTable()
+        document = cls(filepath, None, Scene(layer_table))
+        document.read_only = True
+
+        info = dxf_file_info(filepath)
+        total = os.path.getsize(filepath)
+        with open(filepath, 'rb') as fp:
+            stream = _ProgressStream(fp, total, progress, PHASE_COMPILE)
+            # The layer table precedes the entities, colors resolve while compiling
+            for entity in _stream_entities(stream, info.encoding, layer_table):
+                document._add_entity(entity)
+        document._set_layers(layer_table)
+
+        progress(PHASE_BOUNDS, 0, 1)
+        document.scene.build_index()
+        progress(PHASE_BOUNDS, 1, 1)
+        return document
+
+    @property
+    def doc(self):
+        """ezdxf document, parsed on first access if the geometry came from the cache"""
+        if self._doc is None and not self.read_only:
+            self._doc = _read_file(self.filepath, _no_progress)
+            self.scene.layer_table = self._doc.layers
+        return self._doc
+
+    @property
+    def is_parsed(self):
+        return self._doc is not None
+
+    @property
+    def filename(self):
+        return os.path.basename(self.filepath)
+
+    @property
+    def bounds(self):
+        """Current drawing extents, follows edits and deletions"""
+        return self.scene.bounds()
+
+    @property
+    def layer_count(self):
+        return len(self.layers)
+
+    def _scan_modelspace(self, progress):
+        """Compile geometry and collect entity counts, layers and bounds in a single pass"""
+        modelspace = self.doc.modelspace()
+        total = len(modelspace)
+        progress(PHASE_COUNT, 0, total)
+
+        self._set_layers(self.doc.layers)
+
+        for index, entity in enumerate(modelspace):
+            if index % PROGRESS_INTERVAL == 0:
+                progress(PHASE_COMPILE, index, total)
+            self._add_entity(entity)
+
+        progress(PHASE_BOUNDS, 0, 1)
+        self.scene.build_index()
+        progress(PHASE_BOUNDS, 1, 1)
+
+    def _set_layers(self, layer_table):
+        # Layer table excluding Defpoints
+        self.layers = [
+            layer.dxf.name for layer in layer_table
+            if layer.dxf.name.lower() != 'defpoints'
+        ]
+        self.layer_colors = {
+            layer.dxf.name: layer_color(layer) for layer in layer_table
+        }
+
+    def _add_entity(self, entity):
+        # Don't count entities in Defpoints layer
+        entity_type = entity.dxftype()
+        if entity.dxf.layer.lower() != 'defpoints':
+            self.entity_counts[entity_type] = self.entity_counts.get(entity_type, 0) + 1
+
+        if self.scene.add(entity) is None:
+            self.skipped[entity_type] = self.skipped.get(entity_type, 0) + 1
+
+
+class _LayerTable:
+    """Case-insensitive layer lookup for documents without an ezdxf document"""
+
+    def __init__(self):
+        self._layers = {}
+
+    def add(self, layer):
+        self._layers[layer.dxf.name.lower()] = layer
+
+    def get(self, name):
+        return self._layers.get(name.lower())
+
+    def __iter__(self):
+        return iter(self._layers.values())
+
+
+def _stream_entities(stream, encoding, layer_table):
+    """
+    Modelspace entities of an ASCII DXF stream, one at a time. LAYER table
+    entries are added to layer_table, everything else outside the ENTITIES
+    section is skipped. Follows ezdxf's iterdxf.single_pass_modelspace, which
+    drops the last entity of the section and only loads a subset of types.
+    """
+    section = None
+    tags = []
+    # VERTEX and ATTRIB entities are attached to the preceding POLYLINE/INSERT
+    linked_entity = entity_linker()
+    queued = None
+
+    for tag in tag_compiler(iterdxf.binary_tagger(stream, encoding)):
+        if tag.code != 0:
+            tags.append(tag)
+            continue
+
+        # A new structure starts, the previous one is complete
+        if tags:
+            kind = tags[0].value
+            if kind == 'SECTION':
+                section = tags[1].value if len(tags) > 1 else None
+            elif section == 'TABLES' and kind == 'LAYER':
+                layer_table.add(factory.load(ExtendedTags(tags)))
+            elif section == 'ENTITIES':
+                entity = factory.load(ExtendedTags(tags))
+                if not linked_entity(entity) and entity.dxf.get('paperspace', 0) == 0:
+                    if queued is not None:
+                        yield queued
+                    queued = entity
+        tags = [tag]
+
+        if tag.value == 'ENDSEC':
+            if section == 'ENTITIES':
+                break
+            section = None
+            tags = []
+
+    if queued is not None:
+        yield queued
+
+
+def _no_progress(phase, done, total):
+    pass
+
+
+def _read_file(filepath, progress):
+    """ezdxf.readfile with read progress and cancellation for ASCII DXF"""
+    progress(PHASE_READ, 0, 0)
+    if is_binary_dxf_file(filepath):
+        return ezdxf.readfile(filepath)
+
+    info = dxf_file_info(filepath)
+    total = os.path.getsize(filepath)
+    with open(filepath, mode="rt", encoding=info.encoding, errors="surrogateescape") as fp:
+        doc = ezdxf.read(_ProgressStream(fp, total, progress))
+    doc.filename = filepath
+    return doc
+
+
+class _ProgressStream:
+    """Text or binary stream wrapper reporting read progress to a callback"""
+
+    def __init__(self, stream, total, progress, phase=PHASE_READ):
+        self._stream = stream
+        # Text streams report positions of their underlying binary buffer
+        self._position = stream.buffer.tell if hasattr(stream, 'buffer') else stream.tell
+        self._total = total
+        self._progress = progress
+        self._phase = phase
+        self._lines = 0
+
+    def readline(self):
+        self._lines += 1
+        if self._lines % PROGRESS_INTERVAL == 0:
+            self._progress(self._phase, self._position(), self._total)
+        return self._stream.readline()
@@ -0,0 +1,472 @@
+"""
+Entity store module for DXF Viewer application.
+Compiled entities are kept column by column in NumPy arrays: type code,
+layer id, style id, flags, handle, bounding box and a vertex range into a
+shared coordinate buffer. Text, arc, spline, bulge, block reference and
+hatch parameters live in side tables referenced by an aux column. A plain line
+costs about 100 bytes instead of several hundred for Python objects.
+Qt geometry is built on demand and kept in a bounded cache.
+"""
+
+import threading
+import numpy as np
+from PyQt6.QtCore import QPointF, QLineF
+from PyQt6.QtGui import QPainterPath
+from tessellation import EllipticalArc, SplineCurve, BulgePolyline, FINE_LEVEL, points_path
+from blocks import INSERT_PARAMS
+from hatching import pattern_lines, estimate_segments, MAX_PATTERN_SEGMENTS
+from text_layout import text_transform
+
+# Primitive kinds
+KIND_LINE = 0
+KIND_PATH = 1
+KIND_POINT = 2
+KIND_TEXT = 3
+KIND_CURVE = 4
+KIND_INSERT = 5
+KIND_HATCH = 6
+
+# Flag bits
+FLAG_CLOSED = 1
+FLAG_FILLABLE = 2
+FLAG_SPLINE = 4     # Curve stored in the spline table, arcs otherwise
+FLAG_RATIONAL = 8   # Spline with weights
+FLAG_SOLID = 16     # Hatch drawn as a solid fill
+FLAG_BULGE = 32     # Curve stored as polyline vertices with bulges
+FLAG_WIDE = 64      # Bulge polyline with start and end widths
+
+# Built Qt geometry kept for drawing
+GEOMETRY_CACHE_SIZE = 1 << 18
+
+# Expanded hatch pattern segments kept for drawing
+PATTERN_CACHE_SIZE = 1 << 21
+
+# Per entity columns: name -> (dtype, row shape)
+ENTITY_COLUMNS = {
+    'kinds': (np.int8, ()),
+    'types': (np.int16, ()),
+    'layers': (np.int32, ()),
+    'styles': (np.int32, ()),
+    'flags': (np.uint8, ()),
+    'handles': (np.uint64, ()),
+    'bboxes': (np.float64, (4,)),
+    'starts': (np.int64, ()),
+    'counts': (np.int32, ()),
+    'aux': (np.int32, ()),
+}
+
+# Shared buffers and side tables: name -> (dtype, row shape)
+TABLE_COLUMNS = {
+    'coords': (np.float64, (2,)),
+    'text_params': (np.float64, (9,)),        # height, rotation, width factor, halign,
+                                              # line spacing, alignment offset, extent
+    'arcs': (np.float64, (7,)),               # center, major axis, ratio, start, sweep
+    'spline_ranges': (np.int64, (7,)),        # degree, knot, control and sample ranges
+    'spline_bends': (np.float64, ()),
+    'knots': (np.float64, ()),
+    'control': (np.float64, (2,)),
+    'weights': (np.float64, ()),              # One per control point
+    'samples': (np.float64, (2,)),
+    'insert_blocks': (np.int32, ()),          # Block id per INSERT
+    'insert_params': (np.float64, (INSERT_PARAMS,)),
+    'hatch_ranges': (np.int64, (4,)),         # loop and pattern line ranges
+    'loop_counts': (np.int32, ()),            # Vertices per boundary loop
+    'hatch_lines': (np.float64, (6,)),        # Pattern line origin, direction, offset
+    'dash_ranges': (np.int64, (2,)),          # Dash range per pattern line
+    'dashes': (np.float64, ()),
+    'polyline_ranges': (np.int64, (2,)),      # bulge start, width start or -1
+    'bulges': (np.float64, ()),               # One per polyline vertex
+    'widths': (np.float64, (2,)),             # Start and end width per vertex
+}
+
+
+class EntityStore:
+    """Columnar storage of compiled entities, row index = scene index"""
+
+    def __init__(self):
+        for name, (dtype, shape) in {**ENTITY_COLUMNS, **TABLE_COLUMNS}.items():
+            setattr(self, name, np.empty((0,) + shape, dtype=dtype))
+        self.texts = []
+        self.type_names = []
+        self.type_ids = {}
+        self.layer_names = []
+        self.layer_ids = {}
+        # Rows and table parts appended since the last freeze
+        self._pending = {name: [] for name in {**ENTITY_COLUMNS, **TABLE_COLUMNS}}
+        self._sizes = {name: 0 for name in TABLE_COLUMNS}
+        # Index -> QLineF, QPainterPath, QPointF, QTransform (text) or Curve,
+        # shared with the tile and layer render threads
+        self._geometry = {}
+        self._lock = threading.Lock()
+        # Index -> (n, 4) expanded pattern segments of a hatch, guarded by the same lock
+        self._patterns = {}
+        self._pattern_size = 0
+
+    def __len__(self):
+        return len(self.kinds) + len(self._pending['kinds'])
+
+    @classmethod
+    def from_arrays(cls, arrays, texts, type_names, layer_names):
+        """Store over existing arrays, e.g. memory-mapped from the geometry cache"""
+        store = cls()
+        for name in {**ENTITY_COLUMNS, **TABLE_COLUMNS}:
+            setattr(store, name, arrays[name])
+        store._sizes = {name: len(arrays[name]) for name in TABLE_COLUMNS}
+        store.texts = list(texts)
+        store.type_names = list(type_names)
+        store.type_ids = {name: i for i, name in enumerate(store.type_names)}
+        store.layer_names = list(layer_names)
+        store.layer_ids = {name: i for i, name in enumerate(store.layer_names)}
+        return store
+
+    def arrays(self):
+        """All columns by name, for serialization"""
+        self.freeze()
+        return {name: getattr(self, name) for name in {**ENTITY_COLUMNS, **TABLE_COLUMNS}}
+
+    def append(self, primitive):
+        """Add a compiled primitive as a new row, returns its index"""
+        index = len(self)
+        for name, value in zip(ENTITY_COLUMNS, self._row(primitive)):
+            self._pending[name].append(value)
+        return index
+
+    def set(self, index, primitive):
+        """Replace the row at index, None marks it removed"""
+        self.freeze()
+        if primitive is None:
+            row = (-1, 0, self.layers[index], -1, 0, self.handles[index],
+                   (np.nan,) * 4, 0, 0, -1)
+        else:
+            row = self._row(primitive)
+        for name, value in zip(ENTITY_COLUMNS, row):
+            getattr(self, name)[index] = value
+        # Edits append their vertices and parameters
+        self.freeze()
+        with self._lock:
+            self._geometry.pop(index, None)
+            lines = self._patterns.pop(index, None)
+            if lines is not None:
+                self._pattern_size -= len(lines)
+
+    def freeze(self):
+        """Move appended rows and table parts into the arrays"""
+        for name, pending in self._pending.items():
+            if not pending:
+                continue
+            dtype, shape = {**ENTITY_COLUMNS, **TABLE_COLUMNS}[name]
+            current = getattr(self, name)
+            if name in ENTITY_COLUMNS:
+                added = np.array(pending, dtype=dtype).reshape((-1,) + shape)
+            else:
+                added = np.concatenate(pending).astype(dtype, copy=False)
+            setattr(self, name, np.concatenate([current, added]))
+            pending.clear()
+
+    def _extend(self, name, values):
+        """Append rows to a table, returns the index of the first one"""
+        dtype, shape = TABLE_COLUMNS[name]
+        values = np.asarray(values, dtype=dtype).reshape((-1,) + shape)
+        start = self._sizes[name]
+        self._pending[name].append(values)
+        self._sizes[name] += len(values)
+        return start
+
+    def _name_id(self, names, ids, name):
+        name_id = ids.get(name)
+        if name_id is None:
+            name_id = len(names)
+            names.append(name)
+            ids[name] = name_id
+        return name_id
+
+    def layer_id(self, name):
+        return self._name_id(self.layer_names, self.layer_ids, name)
+
+    def _row(self, primitive):
+        flags = ((FLAG_CLOSED if primitive.closed else 0) |
+                 (FLAG_FILLABLE if primitive.fillable else 0) |
+                 (FLAG_SOLID if primitive.solid else 0))
+        start = count = 0
+        aux = -1
+        if primitive.points is not None:
+            count = len(primitive.points)
+            start = self._extend('coords', primitive.points)
+        if primitive.kind == KIND_TEXT:
+            aux = self._extend('text_params', primitive.text_params)
+            self.texts.append(primitive.text)
+        elif primitive.kind == KIND_CURVE:
+            curve = primitive.curve
+            if isinstance(curve, BulgePolyline):
+                flags |= FLAG_BULGE
+                count = len(curve.vertices)
+                start = self._extend('coords', curve.vertices)
+                width_start = -1
+                if curve.widths is not None:
+                    flags |= FLAG_WIDE
+                    width_start = self._extend('widths', curve.widths)
+                aux = self._extend('polyline_ranges',
+                                   (self._extend('bulges', curve.bulges), width_start))
+            elif isinstance(curve, EllipticalArc):
+                aux = self._extend('arcs', curve.center + curve.major +
+                                   (curve.ratio, curve.start, curve.sweep))
+            else:
+                flags |= FLAG_SPLINE
+                aux = self._add_spline(curve)
+                if curve.weights is not None:
+                    flags |= FLAG_RATIONAL
+        elif primitive.kind == KIND_INSERT:
+            block_id, params = primitive.insert
+            self._extend('insert_blocks', block_id)
+            aux = self._extend('insert_params', params)
+        elif primitive.kind == KIND_HATCH:
+            loop_counts, baselines = primitive.hatch
+            aux = self._add_hatch(loop_counts, baselines)
+        return (
+            primitive.kind,
+            self._name_id(self.type_names, self.type_ids, primitive.dxftype),
+            self.layer_id(primitive.layer),
+            primitive.style,
+            flags,
+            int(primitive.handle, 16),
+            primitive.bbox,
+            start,
+            count,
+            aux,
+        )
+
+    def _add_spline(self, curve):
+        control = np.asarray(curve.control, dtype=float).reshape(-1, 2)
+        weights = curve.weights if curve.weights is not None else np.ones(len(control))
+        knot_start = self._extend('knots', curve.knots)
+        control_start = self._extend('control', control)
+        self._extend('weights', weights)
+        sample_start = self._extend('samples', curve.samples)
+        self._extend('spline_bends', curve.bend)
+        return self._extend('spline_ranges', (
+            curve.degree, knot_start, len(curve.knots), control_start, len(control),
+            sample_start, len(curve.samples)))
+
+    def _add_hatch(self, loop_counts, baselines):
+        loop_start = self._extend('loop_counts', loop_counts)
+        line_start = self._sizes['hatch_lines']
+        for origin, direction, offset, dashes in baselines:
+            self._extend('hatch_lines', origin + direction + offset)
+            self._extend('dash_ranges', (self._extend('dashes', dashes), len(dashes)))
+        return self._extend('hatch_ranges', (loop_start, len(loop_counts),
+                                             line_start, len(baselines)))
+
+    def handle(self, index):
+        """DXF handle string of the entity at index"""
+        return format(int(self.handles[index]), 'X')
+
+    def is_circle(self, indices):
+        """Mask of rows that are full circles"""
+        circle = self.type_ids.get('CIRCLE', -1)
+        return self.types[indices] == circle
+
+    def text(self, index):
+        """(text, halign, line spacing) of a text row, the key of its glyph outlines"""
+        aux = int(self.aux[index])
+        halign, spacing = self.text_params[aux, 3:5].tolist()
+        return self.texts[aux], halign, spacing
+
+    def text_heights(self, indices):
+        """Text height per text row"""
+        return self.text_params[self.aux[indices], 0]
+
+    def text_midlines(self, indices):
+        """(n, 4) world segments through the middle of text rows, left to right"""
+        height, rotation, width_factor, _, _, dx, dy, width, depth = \
+            self.text_params[self.aux[indices]].T
+        # Layout units -> world: scale, rotate, move to the anchor
+        u = np.stack([dx, dx + width]) * height * width_factor
+        v = (dy + (1 - depth) / 2) * height
+        angle = np.radians(rotation)
+        cos_a, sin_a = np.cos(angle), np.sin(angle)
+        anchors = self.coords[self.starts[indices]]
+        x = anchors[:, 0] + u * cos_a - v * sin_a
+        y = anchors[:, 1] + u * sin_a + v * cos_a
+        return np.column_stack([x[0], y[0], x[1], y[1]])
+
+    def points(self, index):
+        """(n, 2) vertices of a line, polyline or hatch, the anchor of text and points"""
+        start = int(self.starts[index])
+        return self.coords[start:start + int(self.counts[index])]
+
+    def insert(self, index):
+        """(block id, insert_params row) of an INSERT row"""
+        aux = int(self.aux[index])
+        return int(self.insert_blocks[aux]), self.insert_params[aux]
+
+    def loops(self, index):
+        """(n, 2) boundary loops of a hatch row"""
+        loop_start, loop_count = self.hatch_ranges[int(self.aux[index])][:2].tolist()
+        counts = self.loop_counts[loop_start:loop_start + loop_count]
+        return np.split(self.points(index), np.cumsum(counts)[:-1])
+
+    def baselines(self, index):
+        """(origin, direction, offset, dashes) per pattern line of a hatch row"""
+        line_start, line_count = self.hatch_ranges[int(self.aux[index])][2:].tolist()
+        baselines = []
+        for line in range(line_start, line_start + line_count):
+            x, y, dx, dy, ox, oy = self.hatch_lines[line].tolist()
+            dash_start, dash_count = self.dash_ranges[line].tolist()
+            baselines.append(((x, y), (dx, dy), (ox, oy),
+                              self.dashes[dash_start:dash_start + dash_count].tolist()))
+        return baselines
+
+    def pattern_spacing(self, index):
+        """Smallest line distance of a hatch pattern in world units, 0 without pattern"""
+        line_start, line_count = self.hatch_ranges[int(self.aux[index])][2:].tolist()
+        if not line_count:
+            return 0.0
+        lines = self.hatch_lines[line_start:line_start + line_count]
+        return float(np.abs(lines[:, 2] * lines[:, 5] - lines[:, 3] * lines[:, 4]).min())
+
+    def pattern(self, index):
+        """
+        Cached (n, 4) pattern segments of a hatch row. None if the pattern is
+        too dense to expand in full, such hatches are hatched per view.
+        """
+        lines = self._patterns.get(index)
+        if lines is None:
+            baselines = self.baselines(index)
+            if estimate_segments(self.bboxes[index], baselines) > MAX_PATTERN_SEGMENTS:
+                return None
+            lines = pattern_lines(self.loops(index), baselines)
+            with self._lock:
+                # Another thread may have expanded the same hatch meanwhile
+                previous = self._patterns.pop(index, None)
+                if previous is not None:
+                    self._pattern_size -= len(previous)
+                if self._pattern_size + len(lines) > PATTERN_CACHE_SIZE:
+                    self._patterns.clear()
+                    self._pattern_size = 0
+                self._patterns[index] = lines
+                self._pattern_size += len(lines)
+        return lines
+
+    def curve(self, index):
+        """Curve of a curve row, built from its stored parameters"""
+        flags = int(self.flags[index])
+        aux = int(self.aux[index])
+        closed = bool(flags & FLAG_CLOSED)
+        if flags & FLAG_BULGE:
+            bulge_start, width_start = self.polyline_ranges[aux].tolist()
+            count = int(self.counts[index])
+            return BulgePolyline(
+                self.points(index),
+                self.bulges[bulge_start:bulge_start + count],
+                self.widths[width_start:width_start + count] if flags & FLAG_WIDE else None,
+                closed
+            )
+        if not flags & FLAG_SPLINE:
+            cx, cy, mx, my, ratio, start, sweep = self.arcs[aux].tolist()
+            return EllipticalArc((cx, cy), (mx, my), ratio, start, sweep)
+
+        (degree, knot_start, knot_count, control_start, control_count,
+         sample_start, sample_count) = self.spline_ranges[aux].tolist()
+        control_end = control_start + control_count
+        return SplineCurve(
+            degree,
+            self.knots[knot_start:knot_start + knot_count],
+            self.control[control_start:control_end],
+            self.weights[control_start:control_end] if flags & FLAG_RATIONAL else None,
+            closed,
+            self.samples[sample_start:sample_start + sample_count],
+            float(self.spline_bends[aux])
+        )
+
+    def geometry(self, index):
+        """Cached drawing geometry: QLineF, QPainterPath, QPointF, QTransform or Curve"""
+        geometry = self._geometry.get(index)
+        if geometry is None:
+            geometry = self._build(index)
+            with self._lock:
+                if len(self._geometry) >= GEOMETRY_CACHE_SIZE:
+                    # Drop the older half, dicts keep insertion order
+                    for key in list(self._geometry)[:GEOMETRY_CACHE_SIZE // 2]:
+                        self._geometry.pop(key, None)
+                self._geometry[index] = geometry
+        return geometry
+
+    def geometries(self, indices):
+        """Cached drawing geometry of a list of indices"""
+        cache = self._geometry
+        result = [cache.get(index) for index in indices]
+        if None in result:
+            missing = [index for index, geometry in zip(indices, result) if geometry is None]
+            self._build_lines(missing)
+            result = [geometry if geometry is not None else self.geometry(index)
+                      for index, geometry in zip(indices, result)]
+        return result
+
+    def _build_lines(self, indices):
+        """Cache QLineFs of many line rows at once, other kinds are skipped"""
+        indices = np.asarray(indices, dtype=np.int64)
+        indices = indices[self.kinds[indices] == KIND_LINE]
+        if not len(indices) or len(indices) > GEOMETRY_CACHE_SIZE // 2:
+            return
+        starts = self.starts[indices]
+        x0, y0 = self.coords[starts].T.tolist()
+        x1, y1 = self.coords[starts + 1].T.tolist()
+        lines = list(zip(indices.tolist(), map(QLineF, x0, y0, x1, y1)))
+        with self._lock:
+            if len(self._geometry) + len(lines) > GEOMETRY_CACHE_SIZE:
+                self._geometry.clear()
+            self._geometry.update(lines)
+
+    def _build(self, index):
+        kind = int(self.kinds[index])
+        if kind == KIND_CURVE:
+            return self.curve(index)
+        points = self.points(index)
+        if kind == KIND_LINE:
+            (x0, y0), (x1, y1) = points.tolist()
+            return QLineF(x0, y0, x1, y1)
+        if kind == KIND_PATH:
+            return points_path(points, bool(self.flags[index] & FLAG_CLOSED))
+        if kind == KIND_HATCH:
+            # Odd-even filled, inner loops are holes
+            path = QPainterPath()
+            for loop in self.loops(index):
+                path.addPath(points_path(loop, True))
+            return path
+        x, y = points[0].tolist()
+        if kind == KIND_TEXT:
+            # Places the glyph outlines of the text
+            params = self.text_params[int(self.aux[index])].tolist()
+            height, rotation, width_factor, _, _, dx, dy, _, _ = params
+            return text_transform(x, y, height, rotation, width_factor, dx, dy)
+        return QPointF(x, y)
+
+    def outlines(self, index):
+        """Polylines tracing the drawn outline of a row, one per hatch loop"""
+        if self.kinds[index] == KIND_HATCH:
+            return [np.vstack([loop, loop[:1]]) for loop in self.loops(index)]
+        return [self.outline(index)]
+
+    def outline(self, index):
+        """(n, 2) polyline tracing the drawn outline of a row"""
+        if self.kinds[index] == KIND_CURVE:
+            # Curves use their finest level of detail
+            curve = self.geometry(index)
+            points = curve.points(FINE_LEVEL)
+            closed = curve.closed
+        else:
+            points = self.points(index)
+            closed = bool(self.flags[index] & FLAG_CLOSED)
+        if closed:
+            points = np.vstack([points, points[:1]])
+        return points
+
+    @property
+    def nbytes(self):
+        """Bytes used by the arrays, without texts and cached geometry"""
+        self.freeze()
+        return sum(getattr(self, name).nbytes for name in {**ENTITY_COLUMNS, **TABLE_COLUMNS})
+
+    def memory_per_entity(self):
+        """Average bytes per row used by the arrays"""
+        return self.nbytes / max(len(self), 1)
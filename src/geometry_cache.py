@@ -0,0 +1,215 @@
+"""
+Geometry cache module for DXF Viewer application.
+Compiled scenes are stored as uncompressed NumPy arrays plus a small JSON
+header in a per-user cache directory, keyed by a fingerprint of the DXF
+file. Reopening a cached file memory-maps the arrays instead of parsing
+the DXF; the ezdxf document is only parsed when an edit needs it.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from PyQt6.QtCore import QStandardPaths
+from dxf_document import DXFDocument, PHASE_READ
+from scene import Scene
+from entity_store import EntityStore
+from blocks import Block, BlockTable
+
+# Bumped whenever the stored layout changes
+FORMAT_VERSION = 7
+
+# Default disk budget of the cache in bytes
+DEFAULT_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+META_FILE = "meta.json"
+
+
+def default_cache_dir():
+    """Per-user cache directory for compiled geometry"""
+    base = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".cache", "dxf-viewer")
+    return os.path.join(base, "geometry")
+
+
+def fingerprint(filepath):
+    """Cache key of a file, changes whenever the file is saved"""
+    stat = os.stat(filepath)
+    text = f"{FORMAT_VERSION}|{os.path.abspath(filepath)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(text.encode('utf-8', 'surrogateescape')).hexdigest()
+
+
+class GeometryCache:
+    """Directory of cached scenes with least recently used eviction"""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _entry(self, filepath):
+        return os.path.join(self.directory, fingerprint(filepath))
+
+    def load(self, filepath):
+        """Cached DXFDocument of a file or None"""
+        entry = self._entry(filepath)
+        meta_path = os.path.join(entry, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            # Plain views of copy-on-write maps, memmap slicing is slow and
+            # edits must not reach the file
+            arrays = {name: np.asarray(np.load(os.path.join(entry, f"{name}.npy"), mmap_mode='c'))
+                      for name in meta['arrays']}
+            document = _restore(filepath, meta, arrays)
+            # Access time for eviction
+            os.utime(meta_path)
+            return document
+        except Exception as e:
+            print(f"Geometry cache error: {str(e)}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+    def store(self, document):
+        """Write the compiled scene of a freshly parsed document"""
+        entry = self._entry(document.filepath)
+        if os.path.exists(entry):
+            return
+        temp = f"{entry}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(temp, exist_ok=True)
+            meta, arrays = _serialize(document)
+            for name, array in arrays.items():
+                np.save(os.path.join(temp, f"{name}.npy"), array)
+            meta['arrays'] = list(arrays)
+            with open(os.path.join(temp, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            # Readers only ever see complete entries
+            os.replace(temp, entry)
+        except Exception as e:
+            print(f"Geometry cache error: {str(e)}")
+            shutil.rmtree(temp, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits its budget"""
+        entries = []
+        total = 0
+        try:
+            scanned = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in scanned:
+            if entry.name.endswith('.tmp'):
+                continue
+            meta_path = os.path.join(entry.path, META_FILE)
+            try:
+                if not entry.is_dir():
+                    continue
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                used = os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0
+            except OSError:
+                # Removed by another viewer evicting at the same time
+                continue
+            entries.append((used, size, entry.path))
+            total += size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def load_document(filepath, progress=None, cache=None, streaming=False):
+    """
+    DXFDocument from the geometry cache, parsed and cached if missing.
+    Without a cache every file is parsed. With streaming, files are read
+    entity by entity into a view-only document.
+    """
+    if progress:
+        progress(PHASE_READ, 0, 0)
+    document = cache.load(filepath) if cache is not None else None
+    if document is None:
+        if streaming:
+            document = DXFDocument.stream(filepath, progress)
+        else:
+            document = DXFDocument.load(filepath, progress)
+        # Streamed scenes skip block references, only full parses are reused
+        if cache is not None and not document.read_only:
+            cache.store(document)
+    # A view-only document never parses the whole file
+    document.read_only = document.read_only or streaming
+    return document
+
+
+def _serialize(document):
+    """JSON header and named arrays of a document's compiled scene"""
+    scene = document.scene
+    meta, arrays = _serialize_scene(scene)
+    # Blocks in id order, their arrays are prefixed with the block id
+    meta['blocks'] = []
+    for block_id, block in enumerate(scene.blocks.blocks):
+        block_meta, block_arrays = _serialize_scene(block.scene)
+        block_meta['name'] = block.name
+        meta['blocks'].append(block_meta)
+        arrays.update((f"b{block_id}.{name}", array) for name, array in block_arrays.items())
+    meta.update({
+        'version': FORMAT_VERSION,
+        'entity_counts': document.entity_counts,
+        'skipped': document.skipped,
+        'layers': document.layers,
+        'layer_colors': {name: list(rgb) for name, rgb in document.layer_colors.items()},
+    })
+    return meta, arrays
+
+
+def _serialize_scene(scene):
+    """JSON header and named arrays of a scene or block scene"""
+    store = scene.store
+    meta = {
+        'type_names': store.type_names,
+        'layer_names': store.layer_names,
+        'texts': store.texts,
+        'style_keys': [list(key) for key in scene.style_keys],
+        'styles': [[list(rgb), linetype] for rgb, linetype in scene.styles],
+    }
+    return meta, store.arrays()
+
+
+def _restore(filepath, meta, arrays):
+    """DXFDocument without an ezdxf document over the stored arrays"""
+    # Blocks only reference blocks with lower ids
+    blocks = BlockTable()
+    for block_id, block_meta in enumerate(meta['blocks']):
+        prefix = f"b{block_id}."
+        block_arrays = {name[len(prefix):]: array for name, array in arrays.items()
+                        if name.startswith(prefix)}
+        blocks.add(Block(block_meta['name'], _restore_scene(block_meta, block_arrays, blocks)))
+    scene = _restore_scene(meta, arrays, blocks)
+
+    document = DXFDocument(filepath, None, scene)
+    document.entity_counts = meta['entity_counts']
+    document.skipped = meta['skipped']
+    document.layers = meta['layers']
+    document.layer_colors = {name: tuple(rgb) for name, rgb in meta['layer_colors'].items()}
+    return document
+
+
+def _restore_scene(meta, arrays, blocks):
+    """Scene with its index over stored arrays"""
+    store = EntityStore.from_arrays(arrays, meta['texts'], meta['type_names'],
+                                    meta['layer_names'])
+    scene = Scene(None, store, blocks)
+    scene.set_styles([_style_key(key) for key in meta['style_keys']],
+                     [(tuple(rgb), linetype) for rgb, linetype in meta['styles']])
+    scene.build_index()
+    return scene
+
+
+def _style_key(key):
+    layer, color, true_color, linetype = key
+    return (layer, color, tuple(true_color) if true_color is not None else None, linetype)
@@ -0,0 +1,103 @@
+"""
+Hatch module for DXF Viewer application.
+HATCH, SOLID and TRACE entities are compiled into flattened boundary
+loops plus the pattern baselines of the hatch. Pattern lines are only
+expanded when a hatch is first drawn with a visible pattern.
+"""
+
+import math
+import numpy as np
+from ezdxf import path as ezdxf_path
+from ezdxf.math import Vec2, Vec3
+from ezdxf.render import hatching
+from tessellation import TOLERANCE_PX, FINE_LEVEL
+
+# Patterns whose lines are closer than this in pixels are drawn as a solid fill
+MIN_PATTERN_SPACING_PX = 3.0
+
+# Hatches estimated to need more segments are hatched per view instead of
+# being expanded and cached in full
+MAX_PATTERN_SEGMENTS = 100000
+
+
+def hatch_loops(entity):
+    """Boundary loops of a HATCH as (n, 2) arrays in WCS"""
+    paths = list(ezdxf_path.from_hatch(entity))
+    if not paths:
+        return []
+    bbox = ezdxf_path.bbox(paths)
+    if not bbox.has_data:
+        return []
+    size = max(bbox.size.x, bbox.size.y)
+    # Boundary arcs are flattened once, as fine as curves at FINE_LEVEL
+    distance = max(size * TOLERANCE_PX / (1 << FINE_LEVEL), 1e-9)
+    loops = []
+    for boundary in paths:
+        loop = _loop([(v.x, v.y) for v in boundary.flattening(distance)])
+        if loop is not None:
+            loops.append(loop)
+    return loops
+
+
+def solid_loops(entity):
+    """Single boundary loop of a SOLID or TRACE"""
+    loop = _loop([(v.x, v.y) for v in entity.wcs_vertices()])
+    return [loop] if loop is not None else []
+
+
+def _loop(points):
+    points = np.array(points, dtype=float).reshape(-1, 2)
+    # Loops are closed implicitly
+    if len(points) > 1 and np.array_equal(points[0], points[-1]):
+        points = points[:-1]
+    return points if len(points) >= 3 else None
+
+
+def pattern_baselines(entity):
+    """(origin, direction, offset, dashes) per pattern line of a HATCH in WCS"""
+    if entity.dxf.solid_fill or not entity.pattern:
+        return []
+    ocs = entity.ocs()
+    baselines = []
+    for line in entity.pattern.lines:
+        # Pattern lines are already scaled and rotated, only the OCS is left
+        direction = Vec2.from_deg_angle(line.angle)
+        origin = ocs.to_wcs(Vec3(line.base_point))
+        direction = ocs.to_wcs(Vec3(direction))
+        offset = ocs.to_wcs(Vec3(line.offset))
+        baselines.append(((origin.x, origin.y), (direction.x, direction.y),
+                          (offset.x, offset.y), list(line.dash_length_items)))
+    return baselines
+
+
+def normal_distance(direction, offset):
+    """Distance between neighbouring lines of a pattern baseline"""
+    return abs(direction[0] * offset[1] - direction[1] * offset[0])
+
+
+def estimate_segments(bbox, baselines):
+    """Rough number of segments a pattern produces inside a bounding box"""
+    diagonal = math.hypot(bbox[2] - bbox[0], bbox[3] - bbox[1])
+    total = 0.0
+    for _, direction, offset, dashes in baselines:
+        lines = diagonal / max(normal_distance(direction, offset), 1e-12) + 1
+        length = sum(abs(dash) for dash in dashes)
+        # Dashed lines break into one segment per dash
+        per_line = max(1.0, diagonal / length * len(dashes)) if length > 0 else 1.0
+        total += lines * per_line
+    return total
+
+
+def pattern_lines(loops, baselines):
+    """(n, 4) pattern segments (x0, y0, x1, y1) inside the boundary loops"""
+    polygons = [Vec2.list(loop.tolist()) for loop in loops]
+    segments = []
+    for origin, direction, offset, dashes in baselines:
+        try:
+            baseline = hatching.HatchBaseLine(Vec2(origin), Vec2(direction), Vec2(offset),
+                                              list(dashes))
+            for line in hatching.hatch_polygons(baseline, polygons):
+                segments.append((line.start.x, line.start.y, line.end.x, line.end.y))
+        except hatching.HatchingError as e:
+            print(f"Hatch pattern error: {str(e)}")
+    return np.array(segments, dtype=float).reshape(-1, 4)
@@ -0,0 +1,126 @@
+"""
+Layer image module for DXF Viewer application.
+Single layers are rendered into transparent images at the current view,
+so showing a few layers is composing cached images. Once the view stays
+still, the shown layers and the ones next to them in the navigation order
+are rendered ahead on a thread pool, which makes flipping through layers
+instant.
+"""
+
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter
+from renderer import setup_view
+from tile_cache import TileCache, MARGIN_PX
+
+# Views showing more layers than this are drawn directly
+MAX_COMPOSED_LAYERS = 4
+
+# Default memory budget of the layer images in bytes
+DEFAULT_BUDGET = 64 * 1024 * 1024
+
+
+def render_layer(scene_renderer, layer, view, fill_mode):
+    """Render one layer into a new transparent image of a view (pan_x, pan_y, scale, w, h, dpr)"""
+    pan_x, pan_y, scale, width, height, ratio = view
+    image = QImage(round(width * ratio), round(height * ratio),
+                   QImage.Format.Format_ARGB32_Premultiplied)
+    image.setDevicePixelRatio(ratio)
+    image.fill(Qt.GlobalColor.transparent)
+
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    setup_view(painter, pan_x, pan_y, scale)
+    margin = MARGIN_PX / scale
+    world_rect = (-pan_x / scale - margin, (pan_y - height) / scale - margin,
+                  (width - pan_x) / scale + margin, pan_y / scale + margin)
+    hidden = set(scene_renderer.scene.store.layer_ids) - {layer}
+    scene_renderer.draw(painter, world_rect, scale, hidden, fill_mode)
+    painter.end()
+    return image
+
+
+class _LayerSignals(QObject):
+    ready = pyqtSignal(str, int, QImage)  # layer, generation, image
+
+
+class _LayerJob(QRunnable):
+    def __init__(self, images, layer, generation, view, fill_mode):
+        super().__init__()
+        self.images = images
+        self.layer = layer
+        self.generation = generation
+        self.view = view
+        self.fill_mode = fill_mode
+
+    def run(self):
+        if self.generation != self.images.generation:
+            self.images.discard(self.layer)
+            return
+        try:
+            image = render_layer(self.images.scene_renderer, self.layer, self.view,
+                                 self.fill_mode)
+        except Exception as e:
+            # Geometry changed while rendering, the layer is rendered again on demand
+            print(f"Layer rendering error: {str(e)}")
+            self.images.discard(self.layer)
+            return
+        self.images.signals.ready.emit(self.layer, self.generation, image)
+
+
+class LayerImages(QObject):
+    """Cached images of single layers for one view, rendered on demand or ahead"""
+
+    def __init__(self, scene_renderer, budget=DEFAULT_BUDGET, parent=None):
+        super().__init__(parent)
+        self.scene_renderer = scene_renderer
+        self.cache = TileCache(budget)
+        self.generation = 0
+        self._key = None
+        self._pending = set()
+        self.signals = _LayerSignals()
+        self.signals.ready.connect(self._on_ready)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+
+    def set_renderer(self, scene_renderer):
+        """Render another scene, e.g. after a new document was loaded"""
+        self.invalidate()
+        self.scene_renderer = scene_renderer
+
+    def set_view(self, view, fill_mode):
+        """Images of another view, fill mode or style state are dropped"""
+        key = (view, fill_mode, self.scene_renderer.scene.style_version)
+        if key != self._key:
+            self.invalidate()
+            self._key = key
+
+    def invalidate(self):
+        """Drop all images, e.g. after the geometry changed"""
+        self.generation += 1
+        self._key = None
+        self.cache.clear()
+        self.pool.clear()
+        self._pending.clear()
+
+    def discard(self, layer):
+        self._pending.discard(layer)
+
+    def image(self, layer):
+        """Image of a layer already rendered for the current view, None if missing"""
+        return self.cache.get(layer) if self._key is not None else None
+
+    def prefetch(self, layers):
+        """Render missing layers of the current view in the background"""
+        if self._key is None:
+            return
+        view, fill_mode, _ = self._key
+        for layer in layers:
+            if layer in self._pending or self.cache.peek(layer) is not None:
+                continue
+            self._pending.add(layer)
+            self.pool.start(_LayerJob(self, layer, self.generation, view, fill_mode))
+
+    def _on_ready(self, layer, generation, image):
+        self._pending.discard(layer)
+        if generation == self.generation:
+            self.cache.put(layer, image)
@@ -0,0 +1,165 @@
+"""
+Headless rendering module for DXF Viewer application.
+Renders DXF files to PNG previews without a window, using the same
+scene and renderer as the canvas. Files are rendered in a process pool.
+
+Usage:
+    python src/render_cli.py drawings/ -o previews/ --size 1024x768 --workers 4
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# No display is needed, must be set before Qt is loaded
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtGui import QGuiApplication
+from dxf_document import DXFDocument
+from renderer import render_image
+
+_app = None
+
+
+def _init_worker():
+    """Each worker process needs its own Qt application for fonts and images"""
+    global _app
+    if QGuiApplication.instance() is None:
+        _app = QGuiApplication([])
+
+
+def collect_files(inputs, recursive=False):
+    """
+    (path, relative path) of DXF files named directly or found in the given
+    directories, relative to the directory they were found in
+    """
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            if recursive:
+                for root, _, names in os.walk(path):
+                    files.extend((os.path.join(root, name),
+                                  os.path.relpath(os.path.join(root, name), path))
+                                 for name in sorted(names) if name.lower().endswith('.dxf'))
+            else:
+                files.extend((os.path.join(path, name), name) for name in sorted(os.listdir(path))
+                             if name.lower().endswith('.dxf'))
+        else:
+            files.append((path, os.path.basename(path)))
+    return files
+
+
+def output_path(filepath, output_dir, relative=None):
+    """
+    PNG path for a DXF file, next to it unless output_dir is given. Under
+    output_dir the file's relative path is mirrored.
+    """
+    if not output_dir:
+        return os.path.splitext(filepath)[0] + '.png'
+    relative = relative or os.path.basename(filepath)
+    return os.path.join(output_dir, os.path.splitext(relative)[0] + '.png')
+
+
+def unique_targets(targets):
+    """Targets with a number appended to repeated paths, so no image overwrites another"""
+    seen = set()
+    result = []
+    for target in targets:
+        base, ext = os.path.splitext(target)
+        number = 1
+        while os.path.normcase(target) in seen:
+            number += 1
+            target = f"{base}-{number}{ext}"
+        seen.add(os.path.normcase(target))
+        result.append(target)
+    return result
+
+
+def render_file(filepath, target, width, height, fill_mode=False):
+    """Render one file, returns (filepath, target, load seconds, render seconds, error)"""
+    _init_worker()
+    try:
+        start = time.perf_counter()
+        document = DXFDocument.load(filepath)
+        loaded = time.perf_counter()
+        image = render_image(document.scene, width, height, fill_mode)
+        if not image.save(target):
+            raise OSError(f"Could not write {target}")
+        return filepath, target, loaded - start, time.perf_counter() - loaded, None
+    except Exception as e:
+        return filepath, target, 0.0, 0.0, str(e).strip()
+
+
+def _parse_size(text):
+    try:
+        width, height = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size: {text} (expected WIDTHxHEIGHT)")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid size: {text}")
+    return width, height
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render DXF files to PNG images without a window")
+    parser.add_argument("inputs", nargs='+', help="DXF files or directories")
+    parser.add_argument("-o", "--output", help="Output directory (default: next to each file)")
+    parser.add_argument("-s", "--size", type=_parse_size, default=(1024, 768),
+                        help="Image size as WIDTHxHEIGHT (default: 1024x768)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="Search directories recursively")
+    parser.add_argument("--fill", action="store_true", help="Render with fill mode")
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.inputs, args.recursive)
+    if not files:
+        print("No DXF files found")
+        return 1
+    targets = unique_targets([output_path(path, args.output, relative)
+                              for path, relative in files])
+    if args.output:
+        for directory in {os.path.dirname(target) for target in targets}:
+            os.makedirs(directory, exist_ok=True)
+
+    width, height = args.size
+    jobs = [(path, target, width, height, args.fill)
+            for (path, _), target in zip(files, targets)]
+    workers = max(1, min(args.workers, len(jobs)))
+    failures = 0
+    start = time.perf_counter()
+
+    if workers == 1:
+        results = (render_file(*job) for job in jobs)
+        failures = _report(results)
+    else:
+        # Spawned workers do not inherit any Qt state from this process
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker) as pool:
+            futures = [pool.submit(render_file, *job) for job in jobs]
+            failures = _report(future.result() for future in as_completed(futures))
+
+    print(f"{len(jobs) - failures}/{len(jobs)} files rendered in "
+          f"{time.perf_counter() - start:.2f}s with {workers} worker(s)")
+    return 1 if failures else 0
+
+
+def _report(results):
+    """Print one timing line per file, returns the number of failures"""
+    failures = 0
+    for filepath, target, load_time, render_time, error in results:
+        if error:
+            failures += 1
+            print(f"FAILED {filepath}: {error}")
+        else:
+            print(f"{filepath}: load {load_time:.2f}s, render {render_time:.2f}s -> {target}")
+        sys.stdout.flush()
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,518 @@
+"""
+Scene rendering module for DXF Viewer application.
+Draws a compiled scene with any QPainter, used by the canvas widget and
+by offscreen tile rendering.
+"""
+
+import threading
+import numpy as np
+from PyQt6.QtCore import Qt, QLineF, QRectF
+from PyQt6.QtGui import QPen, QColor, QBrush, QPainterPath, QImage, QPainter, QTransform
+from entity_store import (KIND_LINE, KIND_PATH, KIND_POINT, KIND_TEXT, KIND_CURVE,
+                          KIND_INSERT, KIND_HATCH, FLAG_FILLABLE, FLAG_SOLID, FLAG_WIDE)
+from blocks import MAX_BLOCK_DEPTH, insert_offsets, transform_bbox, insert_scale
+from hatching import pattern_lines, MIN_PATTERN_SPACING_PX
+from text_layout import text_path, MIN_TEXT_PX, GREEK_TEXT_PX
+from tessellation import lod_level, LOD_CACHE_SIZE
+
+# Highlight color for selected entities
+HIGHLIGHT_COLOR = QColor(52, 152, 219, 100)  # Modern blue color
+
+# Highlight pen width, in world units since the pen is not cosmetic
+HIGHLIGHT_WIDTH = 3
+
+# Canvas background color
+BACKGROUND_COLOR = QColor(248, 249, 250)
+
+# Polylines narrower than this in pixels are drawn as a centerline
+MIN_WIDTH_PX = 1.0
+
+# Padding around the drawing when fitting it into a view (15% of drawing area)
+FIT_PADDING = 0.15
+
+# Merged block paths are shared by the tile and layer render threads
+_lock = threading.Lock()
+
+
+def setup_view(painter, pan_x, pan_y, scale):
+    """Map world coordinates (Y up) onto the painter's device"""
+    painter.translate(pan_x, pan_y)
+    painter.scale(scale, -scale)
+
+
+def fit_view(bounds, width, height):
+    """(scale, pan_x, pan_y) showing bounds centered in a width x height view"""
+    # Calculate drawing bounds
+    dx = bounds[2] - bounds[0]
+    dy = bounds[3] - bounds[1]
+
+    # Padded total dimensions
+    total_width = dx * (1 + 2 * FIT_PADDING)
+    total_height = dy * (1 + 2 * FIT_PADDING)
+
+    # Use smallest scale (best fit)
+    scale_x = width / total_width if total_width != 0 else 1
+    scale_y = height / total_height if total_height != 0 else 1
+    scale = max(min(scale_x, scale_y), 0.0001)
+
+    # Drawing center goes to the viewport center, Y axis is inverted
+    pan_x = width / 2 - (bounds[0] + dx / 2) * scale
+    pan_y = height / 2 + (bounds[1] + dy / 2) * scale
+    return scale, pan_x, pan_y
+
+
+def render_image(scene, width, height, fill_mode=False, hidden_layers=()):
+    """Offscreen image of the whole scene fitted to width x height"""
+    image = QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(BACKGROUND_COLOR)
+    bounds = scene.bounds()
+    if bounds is None:
+        return image
+
+    scale, pan_x, pan_y = fit_view(bounds, width, height)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    setup_view(painter, pan_x, pan_y, scale)
+    margin = 6 / scale
+    world_rect = (-pan_x / scale - margin, (pan_y - height) / scale - margin,
+                  (width - pan_x) / scale + margin, pan_y / scale + margin)
+    SceneRenderer(scene).draw(painter, world_rect, scale, hidden_layers, fill_mode)
+    painter.end()
+    return image
+
+
+class SceneRenderer:
+    def __init__(self, scene):
+        self.scene = scene
+        # Pens per (scene style id, selected) and brushes per style id
+        self._pens = {}
+        self._brushes = {}
+        self._style_version = scene.style_version
+
+    def draw(self, painter, world_rect, scale, hidden_layers=(), fill_mode=False):
+        """Draw all visible entities intersecting world_rect, batched by style"""
+        self._check_styles()
+        scene = self.scene
+        indices = scene.query_visible(world_rect, hidden_layers)
+        if not len(indices):
+            return
+        draw_pass = _DrawPass(painter, hidden_layers, fill_mode)
+        self._draw_rows(draw_pass, scene.store, indices, scene.style_ids[indices],
+                        world_rect, scale, 0)
+
+    def _draw_rows(self, draw_pass, store, indices, styles, rect, scale, depth):
+        """Draw rows of a store with their scene style ids, grouped by style"""
+        kinds = store.kinds[indices]
+        fills = kinds == KIND_HATCH
+        if fills.any():
+            # Fills go first so they never cover outlines of another style
+            order = np.lexsort((styles, ~fills))
+        else:
+            # Group by style so the pen changes once per style, not per entity
+            order = np.argsort(styles, kind='stable')
+        indices = indices[order]
+        styles = styles[order]
+        kinds = kinds[order]
+        fills = fills[order]
+        bounds = np.flatnonzero((styles[1:] != styles[:-1]) | (fills[1:] != fills[:-1])) + 1
+        starts = [0] + bounds.tolist()
+        ends = bounds.tolist() + [len(indices)]
+
+        painter = draw_pass.painter
+        for start, end in zip(starts, ends):
+            style = int(styles[start])
+            painter.setPen(draw_pass.pen or self._pen(style))
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            self._draw_batch(draw_pass, store, indices[start:end], kinds[start:end],
+                             style, rect, scale, depth)
+
+    def _draw_batch(self, draw_pass, store, indices, kinds, style, rect, scale, depth):
+        """Draw rows sharing one style with as few calls as possible"""
+        painter = draw_pass.painter
+
+        for index in indices[kinds == KIND_HATCH].tolist():
+            self._draw_hatch(draw_pass, store, index, style, rect, scale)
+
+        # All lines in one call
+        lines = indices[kinds == KIND_LINE]
+        if len(lines):
+            painter.drawLines(store.geometries(lines.tolist()))
+
+        # Outlines merged into one path, filled ones drawn separately
+        shapes = indices[(kinds == KIND_PATH) | (kinds == KIND_CURVE)]
+        if draw_pass.pen is None:
+            # Wide polylines are filled, zero width segments still need the outline
+            for index in shapes[self._wide(store, shapes, scale)].tolist():
+                painter.fillPath(store.geometry(index).outline_path(scale),
+                                 self._brush(style, True))
+        if draw_pass.fill_mode and draw_pass.pen is None:
+            filled = self._fillable(store, shapes)
+        else:
+            filled = np.zeros(len(shapes), dtype=bool)
+        outline = QPainterPath()
+        for geometry in store.geometries(shapes[~filled].tolist()):
+            outline.addPath(self._path(geometry, scale))
+        if not outline.isEmpty():
+            painter.drawPath(outline)
+
+        for index in shapes[filled].tolist():
+            self._draw_entity(painter, store, index, style, scale, True)
+
+        texts = indices[kinds == KIND_TEXT]
+        if len(texts):
+            self._draw_texts(draw_pass, store, texts, style, scale)
+
+        # Points are few, drawn one by one
+        for index in indices[kinds == KIND_POINT].tolist():
+            self._draw_entity(painter, store, index, style, scale, False)
+
+        for index in indices[kinds == KIND_INSERT].tolist():
+            self._draw_insert(draw_pass, store, index, style, rect, scale, depth)
+
+    @staticmethod
+    def _fillable(store, indices):
+        """Mask of rows filled in fill mode, everything except layer 0"""
+        mask = (store.flags[indices] & FLAG_FILLABLE) != 0
+        layer_zero = store.layer_ids.get("0")
+        if layer_zero is not None:
+            mask &= store.layers[indices] != layer_zero
+        return mask
+
+    @staticmethod
+    def _wide(store, indices, scale):
+        """Mask of polyline rows whose width is visible at this scale"""
+        mask = (store.flags[indices] & FLAG_WIDE) != 0
+        for i in np.flatnonzero(mask).tolist():
+            mask[i] = store.geometry(int(indices[i])).max_width * scale >= MIN_WIDTH_PX
+        return mask
+
+    @staticmethod
+    def _path(geometry, scale):
+        # Curves are flattened for the current zoom
+        return geometry if isinstance(geometry, QPainterPath) else geometry.path(scale)
+
+    def _draw_insert(self, draw_pass, store, index, style, rect, scale, depth):
+        """Draw the block of an INSERT row once per visible MINSERT copy"""
+        if depth >= MAX_BLOCK_DEPTH:
+            return
+        block_id, params = store.insert(index)
+        block = self.scene.blocks[block_id]
+        m11, m12, m21, m22, dx, dy = params[:6].tolist()
+
+        # Cull copies by the transformed block bounds
+        offsets = insert_offsets(params)
+        if rect is not None:
+            min_x, min_y, max_x, max_y = transform_bbox(block.bbox, params)
+            visible = ((offsets[:, 0] + min_x <= rect[2]) & (offsets[:, 0] + max_x >= rect[0]) &
+                       (offsets[:, 1] + min_y <= rect[3]) & (offsets[:, 1] + max_y >= rect[1]))
+            offsets = offsets[visible]
+
+        painter = draw_pass.painter
+        block_scale = scale * insert_scale(params)
+        for offset_x, offset_y in offsets.tolist():
+            transform = QTransform(m11, m12, m21, m22, dx + offset_x, dy + offset_y)
+            local_rect = None
+            if rect is not None:
+                inverse, invertible = transform.inverted()
+                if not invertible:
+                    continue
+                local = inverse.mapRect(QRectF(rect[0], rect[1], rect[2] - rect[0], rect[3] - rect[1]))
+                local_rect = (local.left(), local.top(), local.right(), local.bottom())
+            painter.save()
+            painter.setTransform(transform, True)
+            self._draw_block(draw_pass, block_id, style, local_rect, block_scale, depth + 1)
+            painter.restore()
+
+    def _draw_block(self, draw_pass, block_id, insert_style, rect, scale, depth):
+        """Draw block content in block coordinates, rect None draws everything"""
+        block = self.scene.blocks[block_id]
+        scene = block.scene
+        store = scene.store
+        styles = self.scene.block_styles(block_id, insert_style)
+        hidden = self._hidden_styles(draw_pass, styles)
+
+        bbox = block.bbox
+        if rect is None or (rect[0] <= bbox[0] and rect[1] <= bbox[1] and
+                            rect[2] >= bbox[2] and rect[3] >= bbox[3]):
+            # Whole block visible, draw the cached outlines per style
+            self._draw_block_cached(draw_pass, block, styles, hidden, scale, depth)
+            return
+
+        indices = scene.query(rect)
+        row_styles = styles[store.styles[indices]]
+        if hidden is not None:
+            keep = ~hidden[store.styles[indices]]
+            indices, row_styles = indices[keep], row_styles[keep]
+        if len(indices):
+            self._draw_rows(draw_pass, store, indices, row_styles, rect, scale, depth)
+
+    def _draw_block_cached(self, draw_pass, block, styles, hidden, scale, depth):
+        painter = draw_pass.painter
+        level = lod_level(block.size * scale)
+        outlines, others = self._block_paths(block, level, draw_pass.fill_mode and
+                                             draw_pass.pen is None)
+        store = block.scene.store
+        fills = store.kinds[others] == KIND_HATCH
+        # Hatches below the outlines
+        self._draw_block_rows(draw_pass, store, others[fills], styles, hidden, scale, depth)
+        for block_style, path in outlines:
+            if hidden is not None and hidden[block_style]:
+                continue
+            painter.setPen(draw_pass.pen or self._pen(int(styles[block_style])))
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawPath(path)
+
+        # Text, points, filled shapes and nested blocks
+        self._draw_block_rows(draw_pass, store, others[~fills], styles, hidden, scale, depth)
+
+    def _draw_block_rows(self, draw_pass, store, indices, styles, hidden, scale, depth):
+        """Draw whole block rows one by one, skipping hidden styles"""
+        row_styles = store.styles[indices]
+        if hidden is not None:
+            keep = ~hidden[row_styles]
+            indices, row_styles = indices[keep], row_styles[keep]
+        if len(indices):
+            self._draw_rows(draw_pass, store, indices, styles[row_styles], None, scale, depth)
+
+    def _block_paths(self, block, level, fill_mode):
+        """
+        Outlines of a block merged into one path per block style at a level
+        of detail, plus the rows that are drawn one by one
+        """
+        key = (level, fill_mode)
+        with _lock:
+            cached = block.paths.pop(key, None)
+            if cached is not None:
+                block.paths[key] = cached
+                return cached
+
+        store = block.scene.store
+        indices = np.flatnonzero(store.kinds >= 0)
+        kinds = store.kinds[indices]
+        outlined = (kinds == KIND_LINE) | (kinds == KIND_PATH) | (kinds == KIND_CURVE)
+        if fill_mode:
+            outlined &= ~self._fillable(store, indices)
+
+        # Curves are flattened for the largest size of this level
+        scale = (1 << level) / max(block.size, 1e-12)
+        paths = {}
+        rows = indices[outlined]
+        for block_style, geometry in zip(store.styles[rows].tolist(),
+                                         store.geometries(rows.tolist())):
+            path = paths.get(block_style)
+            if path is None:
+                path = paths[block_style] = QPainterPath()
+            if isinstance(geometry, QLineF):
+                path.moveTo(geometry.p1())
+                path.lineTo(geometry.p2())
+            else:
+                path.addPath(self._path(geometry, scale))
+        # Wide polylines are also drawn one by one for their fill
+        others = ~outlined | ((store.flags[indices] & FLAG_WIDE) != 0)
+        cached = (sorted(paths.items()), indices[others])
+        with _lock:
+            if len(block.paths) >= LOD_CACHE_SIZE:
+                # Drop the least recently used level
+                block.paths.pop(next(iter(block.paths)), None)
+            block.paths[key] = cached
+        return cached
+
+    def _hidden_styles(self, draw_pass, styles):
+        """Mask of block styles whose effective layer is hidden, None if none are"""
+        if not draw_pass.hidden_layers:
+            return None
+        style_keys = self.scene.style_keys
+        mask = draw_pass.hidden_styles
+        if mask is None or len(mask) < len(style_keys):
+            # Scene styles on hidden layers, block styles add scene styles on first use
+            mask = np.array([key[0] in draw_pass.hidden_layers for key in style_keys], dtype=bool)
+            draw_pass.hidden_styles = mask
+        hidden = mask[styles]
+        return hidden if hidden.any() else None
+
+    def draw_highlight(self, painter, indices, scale, hidden_layers=()):
+        """Draw entities at indices with the selection highlight"""
+        self._check_styles()
+        scene = self.scene
+        store = scene.store
+        indices = np.fromiter(indices, dtype=np.int64, count=len(indices))
+        indices = scene.visible(indices[scene.kinds[indices] >= 0], hidden_layers)
+        for index in indices.tolist():
+            style = int(scene.style_ids[index])
+            pen = self._pen(style, True)
+            painter.setPen(pen)
+            kind = scene.kinds[index]
+            if kind == KIND_POINT:
+                self._draw_point(painter, store, index, scale, HIGHLIGHT_COLOR)
+            elif kind == KIND_TEXT:
+                self._draw_text(painter, store, index, QBrush(HIGHLIGHT_COLOR))
+            elif kind == KIND_INSERT:
+                self._draw_insert(_DrawPass(painter, hidden_layers, False, pen),
+                                  store, index, style, None, scale, 0)
+            else:
+                self._draw_entity(painter, store, index, style, scale, False)
+
+    def _draw_texts(self, draw_pass, store, indices, style, scale):
+        """Draw text rows from cached glyph outlines, tiny text as lines or not at all"""
+        painter = draw_pass.painter
+        heights = store.text_heights(indices) * scale
+        greeked = indices[(heights >= MIN_TEXT_PX) & (heights < GREEK_TEXT_PX)]
+        glyphs = indices[heights >= GREEK_TEXT_PX]
+        if draw_pass.pen is not None:
+            brush = QBrush(HIGHLIGHT_COLOR)
+        else:
+            brush = self._brush(style, True)
+
+        if len(greeked):
+            # Unreadable anyway, a light line per text shows where it is
+            pen = QPen(brush.color() if draw_pass.pen is not None else self._brush(style).color())
+            pen.setWidth(2)
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+            painter.drawLines(list(map(QLineF, *store.text_midlines(greeked).T.tolist())))
+            painter.setPen(draw_pass.pen or self._pen(style))
+
+        if len(glyphs):
+            # Outlines are laid out once per string, placing them is a transform
+            base = painter.transform()
+            for index in glyphs.tolist():
+                painter.setTransform(store.geometry(index) * base)
+                painter.fillPath(text_path(*store.text(index)), brush)
+            painter.setTransform(base)
+
+    def _draw_hatch(self, draw_pass, store, index, style, rect, scale):
+        """Draw a hatch as a solid fill or with its pattern lines"""
+        painter = draw_pass.painter
+        path = store.geometry(index)
+        if draw_pass.pen is not None:
+            # Highlight traces the boundary
+            painter.drawPath(path)
+            return
+        if store.flags[index] & FLAG_SOLID:
+            painter.fillPath(path, self._brush(style, True))
+            return
+        if store.pattern_spacing(index) * scale < MIN_PATTERN_SPACING_PX:
+            # Sub-pixel pattern, a light solid fill looks the same
+            painter.fillPath(path, self._brush(style))
+            return
+
+        lines = store.pattern(index)
+        if lines is None:
+            lines = self._view_pattern(store, index, path, rect)
+        elif rect is not None:
+            x0, y0, x1, y1 = lines.T
+            visible = ((np.minimum(x0, x1) <= rect[2]) & (np.maximum(x0, x1) >= rect[0]) &
+                       (np.minimum(y0, y1) <= rect[3]) & (np.maximum(y0, y1) >= rect[1]))
+            lines = lines[visible]
+        if len(lines):
+            painter.drawLines(list(map(QLineF, *lines.T.tolist())))
+
+    @staticmethod
+    def _view_pattern(store, index, path, rect):
+        """Pattern segments of a dense hatch, only for the part inside rect"""
+        loops = store.loops(index)
+        if rect is not None:
+            clip = QPainterPath()
+            clip.addRect(QRectF(rect[0], rect[1], rect[2] - rect[0], rect[3] - rect[1]))
+            loops = [np.array([(point.x(), point.y()) for point in polygon]).reshape(-1, 2)
+                     for polygon in path.intersected(clip).toSubpathPolygons()]
+        return pattern_lines([loop for loop in loops if len(loop) >= 3], store.baselines(index))
+
+    def _draw_entity(self, painter, store, index, style, scale, fill):
+        # Fill settings
+        if fill:
+            painter.setBrush(self._brush(style))
+        else:
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+
+        # Draw based on kind
+        kind = store.kinds[index]
+        if kind == KIND_LINE:
+            painter.drawLine(store.geometry(index))
+        elif kind == KIND_PATH or kind == KIND_CURVE:
+            painter.drawPath(self._path(store.geometry(index), scale))
+        elif kind == KIND_TEXT:
+            self._draw_text(painter, store, index, self._brush(style, True))
+        elif kind == KIND_POINT:
+            self._draw_point(painter, store, index, scale, None)
+        elif kind == KIND_HATCH:
+            painter.drawPath(store.geometry(index))
+
+    def _check_styles(self):
+        # Resolved styles changed, e.g. after a layer color edit
+        if self._style_version != self.scene.style_version:
+            self._pens.clear()
+            self._brushes.clear()
+            self._style_version = self.scene.style_version
+
+    def _pen(self, style_id, selected=False):
+        """Cached pen for a scene style, selected pens use the highlight color"""
+        key = (style_id, selected)
+        pen = self._pens.get(key)
+        if pen is None:
+            rgb, linetype = self.scene.styles[style_id]
+            if selected:
+                pen = QPen(HIGHLIGHT_COLOR)
+                pen.setWidth(HIGHLIGHT_WIDTH)
+            else:
+                pen = QPen(QColor(*rgb))
+                pen.setWidth(0)
+            apply_linetype(pen, linetype)
+            self._pens[key] = pen
+        return pen
+
+    def _brush(self, style_id, opaque=False):
+        """Cached fill brush for a scene style, semi-transparent unless opaque"""
+        key = (style_id, opaque)
+        brush = self._brushes.get(key)
+        if brush is None:
+            brush_color = QColor(*self.scene.styles[style_id][0])
+            if not opaque:
+                brush_color.setAlpha(100)  # Semi-transparent fill
+            brush = QBrush(brush_color)
+            self._brushes[key] = brush
+        return brush
+
+    def _draw_text(self, painter, store, index, brush):
+        # Glyph outlines already have the world's Y axis direction
+        base = painter.transform()
+        painter.setTransform(store.geometry(index) * base)
+        painter.fillPath(text_path(*store.text(index)), brush)
+        painter.setTransform(base)
+
+    def _draw_point(self, painter, store, index, scale, color):
+        size = 5 / scale  # Fixed screen size
+
+        painter.save()
+        painter.setPen(Qt.PenStyle.NoPen)
+        if color is not None:
+            painter.setBrush(color)
+        painter.drawEllipse(store.geometry(index), size, size)
+        painter.restore()
+
+
+class _DrawPass:
+    """Settings shared by everything drawn in one draw call"""
+    __slots__ = ('painter', 'hidden_layers', 'fill_mode', 'pen', 'hidden_styles')
+
+    def __init__(self, painter, hidden_layers, fill_mode, pen=None):
+        self.painter = painter
+        self.hidden_layers = hidden_layers
+        self.fill_mode = fill_mode
+        # Pen for everything, e.g. the selection highlight
+        self.pen = pen
+        # Scene style id -> on a hidden layer, built on first use
+        self.hidden_styles = None
+
+
+def apply_linetype(pen, linetype_name):
+    if linetype_name == 'CONTINUOUS':
+        pen.setStyle(Qt.PenStyle.SolidLine)
+    elif linetype_name == 'DASHED':
+        pen.setStyle(Qt.PenStyle.DashLine)
+    elif linetype_name == 'DOTTED':
+        pen.setStyle(Qt.PenStyle.DotLine)
+    elif linetype_name == 'DASHDOT':
+        pen.setStyle(Qt.PenStyle.DashDotLine)
+    else:
+        pen.setStyle(Qt.PenStyle.SolidLine)
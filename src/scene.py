@@ -0,0 +1,392 @@
+"""
+Compiled scene module for DXF Viewer application.
+Turns modelspace entities into compact columnar geometry at load time so
+painting never has to touch ezdxf entities.
+"""
+
+import math
+import numpy as np
+from spatial_index import GridIndex, LayerIndex
+from bounds import LayerBounds
+from colors import style_key, block_style_key, resolve_color
+from entity_store import (EntityStore, KIND_LINE, KIND_PATH, KIND_POINT, KIND_TEXT,
+                          KIND_CURVE, KIND_INSERT, KIND_HATCH)
+from blocks import BlockTable, MAX_BLOCK_DEPTH, insert_params, insert_bbox
+from hatching import hatch_loops, solid_loops, pattern_baselines
+from text_layout import (text_placement, wrap_text, LINE_SPACING, VALIGN_MIDDLE, VALIGN_TOP,
+                         VALIGN_BOTTOM)
+from tessellation import EllipticalArc, SplineCurve, BulgePolyline
+
+# Entity types whose closed outline is filled in fill mode
+FILLABLE_TYPES = {'CIRCLE', 'LWPOLYLINE', 'POLYLINE', 'SPLINE', 'ELLIPSE'}
+
+# TEXT halign -> fraction of the text width left of the alignment point,
+# aligned (3) and fit (5) text start at the insertion point
+TEXT_HALIGN = {1: 0.5, 2: 1.0, 4: 0.5}
+
+# MTEXT attachment point row -> vertical alignment
+MTEXT_VALIGN = (VALIGN_TOP, VALIGN_MIDDLE, VALIGN_BOTTOM)
+
+
+class Primitive:
+    """Compiled data of a single entity on its way into the entity store"""
+    __slots__ = ('handle', 'dxftype', 'layer', 'kind', 'style', 'curve', 'insert', 'hatch',
+                 'points', 'closed', 'bbox', 'fillable', 'solid', 'text', 'text_params')
+
+    def __init__(self, handle, dxftype, layer, kind, points, bbox, curve=None):
+        self.handle = handle
+        self.dxftype = dxftype
+        self.layer = layer
+        self.kind = kind
+        self.style = None
+        self.curve = curve        # Curve of KIND_CURVE primitives
+        self.insert = None        # (block id, insert_params) of KIND_INSERT primitives
+        self.hatch = None         # (loop sizes, pattern baselines) of KIND_HATCH primitives
+        self.points = points      # (n, 2) vertex array
+        self.closed = False
+        self.bbox = bbox          # (min_x, min_y, max_x, max_y)
+        self.fillable = self.dxftype in FILLABLE_TYPES
+        self.solid = False        # Hatch drawn as a solid fill
+        self.text = None
+        self.text_params = None   # text_params row of KIND_TEXT primitives
+
+
+class Scene:
+    """All compiled entities of a document plus their resolved styles"""
+
+    def __init__(self, layer_table, store=None, blocks=None):
+        self.layer_table = layer_table
+        self.store = store if store is not None else EntityStore()
+        # Compiled blocks referenced by INSERT rows, shared with block scenes
+        self.blocks = blocks if blocks is not None else BlockTable()
+        # Style id -> resolved (rgb, linetype)
+        self.styles = []
+        # Style id -> raw (layer, color, true color, linetype)
+        self.style_keys = []
+        self._style_ids = {}
+        # (block id, INSERT style key) -> scene style id per block style
+        self._block_styles = {}
+        # Bumped whenever resolved styles change
+        self.style_version = 0
+        self.index = None
+        self.layer_index = None
+        self.extents = None
+
+    def add(self, entity):
+        """Compile an entity and append it, returns its index or None"""
+        primitive = self._compile(entity)
+        if primitive is None:
+            return None
+        return self.store.append(primitive)
+
+    def recompile(self, index, entity):
+        """Rebuild the row at index after its entity was edited"""
+        self._replace(index, self._compile(entity))
+
+    def remove(self, index):
+        """Drop a row, indices of the others stay valid"""
+        self._replace(index, None)
+
+    def _replace(self, index, primitive):
+        store = self.store
+        old_bbox = tuple(store.bboxes[index].tolist()) if store.kinds[index] >= 0 else None
+        old_layer = int(store.layers[index])
+        store.set(index, primitive)
+        if self.index is None:
+            return
+        self.index.update(index, primitive.bbox if primitive is not None else None)
+        self.layer_index.update()
+        self.extents.update(index, old_bbox, old_layer)
+
+    def build_index(self):
+        """Build the spatial index and layer extents over all bounding boxes"""
+        store = self.store
+        store.freeze()
+        # Index and extents share the store's box and layer columns
+        self.index = GridIndex(store.bboxes)
+        self.layer_index = LayerIndex(self.index, store.layers, store.layer_ids)
+        self.extents = LayerBounds(store.bboxes, store.layers, store.layer_ids)
+
+    @property
+    def kinds(self):
+        """Kind per row, -1 for removed rows"""
+        return self.store.kinds
+
+    @property
+    def style_ids(self):
+        """Style id per row, -1 for removed rows"""
+        return self.store.styles
+
+    def handle(self, index):
+        """DXF handle of the entity at index, the bridge back to ezdxf"""
+        return self.store.handle(index)
+
+    def bboxes(self, indices):
+        """(n, 4) world boxes of the rows at indices, removed rows are left out"""
+        indices = np.fromiter(indices, dtype=np.int64)
+        return self.store.bboxes[indices[self.store.kinds[indices] >= 0]]
+
+    def query(self, rect):
+        """Indices of entities whose bounding box intersects a world rect"""
+        if self.index is None:
+            self.build_index()
+        return self.index.query(rect)
+
+    def query_visible(self, rect, hidden_layers=()):
+        """
+        Indices of entities on visible layers whose bounding box intersects
+        a world rect. Only visible layers are searched when they are few.
+        """
+        if not hidden_layers:
+            return self.query(rect)
+        if self.index is None:
+            self.build_index()
+        return self.layer_index.query(rect, self.layer_index.visible_mask(hidden_layers))
+
+    def visible(self, indices, hidden_layers):
+        """Subset of an index array whose entities are not on hidden layers"""
+        if not hidden_layers:
+            return indices
+        if self.index is None:
+            self.build_index()
+        return indices[self.layer_index.visible_mask(hidden_layers)[self.store.layers[indices]]]
+
+    def layer_counts(self):
+        """Layer name -> number of entities"""
+        if self.index is None:
+            self.build_index()
+        counts = self.layer_index.counts().tolist()
+        return {name: counts[layer_id] if layer_id < len(counts) else 0
+                for name, layer_id in self.store.layer_ids.items()}
+
+    def bounds(self, layers=None):
+        """Union of the bounding boxes on the given layers (all by default)"""
+        if self.index is None:
+            self.build_index()
+        return self.extents.union(layers)
+
+    def layer_bounds(self, layer):
+        """Extents of a single layer, None if it has no geometry"""
+        if self.index is None:
+            self.build_index()
+        return self.extents.layer(layer)
+
+    def _compile(self, entity):
+        try:
+            if entity.dxftype() == 'INSERT':
+                primitive = self._compile_insert(entity)
+            else:
+                primitive = compile_entity(entity)
+        except Exception as e:
+            print(f"Entity compile error ({entity.dxftype()}): {str(e)}")
+            return None
+        if primitive is not None:
+            primitive.style = self._style_id(style_key(entity))
+            if primitive.kind == KIND_INSERT:
+                # Resolved now, cached documents have no layer table later on
+                self._resolve_block_styles(primitive.insert[0], primitive.style, 0)
+        return primitive
+
+    def _compile_insert(self, entity):
+        # Blocks need the document, streamed entities have none
+        if entity.doc is None:
+            return None
+        layout = entity.block()
+        if layout is None:
+            return None
+        block_id = self.blocks.compile(layout, self.layer_table, Scene)
+        if block_id is None:
+            return None
+        params = insert_params(entity)
+        primitive = Primitive(entity.dxf.handle, entity.dxftype(), entity.dxf.layer,
+                              KIND_INSERT, None, insert_bbox(self.blocks[block_id].bbox, params))
+        primitive.insert = (block_id, params)
+        primitive.fillable = False
+        return primitive
+
+    def block_styles(self, block_id, insert_style):
+        """Scene style id per block style for a block drawn by an INSERT of insert_style"""
+        key = (block_id, self.style_keys[insert_style])
+        styles = self._block_styles.get(key)
+        if styles is None:
+            # Layer 0 and BYBLOCK attributes come from the INSERT
+            styles = np.array([self._style_id(block_style_key(block_key, key[1]))
+                               for block_key in self.blocks[block_id].scene.style_keys],
+                              dtype=np.int64)
+            self._block_styles[key] = styles
+        return styles
+
+    def _resolve_block_styles(self, block_id, insert_style, depth):
+        """Add the styles of a block and its nested blocks drawn with insert_style"""
+        key = (block_id, self.style_keys[insert_style])
+        if depth >= MAX_BLOCK_DEPTH or key in self._block_styles:
+            return
+        styles = self.block_styles(block_id, insert_style)
+        store = self.blocks[block_id].scene.store
+        for index in np.flatnonzero(store.kinds == KIND_INSERT).tolist():
+            nested_id = store.insert(index)[0]
+            self._resolve_block_styles(nested_id, int(styles[store.styles[index]]), depth + 1)
+
+    def _style_id(self, key):
+        """Style id of raw style attributes, resolved once per distinct key"""
+        style_id = self._style_ids.get(key)
+        if style_id is None:
+            style_id = len(self.styles)
+            self.styles.append(self._resolve(key))
+            self.style_keys.append(key)
+            self._style_ids[key] = style_id
+        return style_id
+
+    def _resolve(self, key):
+        layer, color, true_color, linetype = key
+        return (resolve_color(self.layer_table, layer, color, true_color), linetype)
+
+    def set_styles(self, style_keys, styles):
+        """Use already resolved styles, e.g. restored from the geometry cache"""
+        self.style_keys = list(style_keys)
+        self.styles = list(styles)
+        self._style_ids = {key: i for i, key in enumerate(self.style_keys)}
+        self._block_styles = {}
+        self.style_version += 1
+
+
+def compile_entity(entity):
+    """Compiled primitive for a supported entity, None otherwise"""
+    entity_type = entity.dxftype()
+
+    if entity_type == 'LINE':
+        start = entity.dxf.start
+        end = entity.dxf.end
+        points = np.array([(start[0], start[1]), (end[0], end[1])])
+        return _primitive(entity, KIND_LINE, points)
+
+    elif entity_type == 'CIRCLE':
+        radius = entity.dxf.radius
+        return _curve_primitive(entity, EllipticalArc(
+            entity.dxf.center, (radius, 0), 1.0, 0.0, 2 * math.pi))
+
+    elif entity_type == 'ARC':
+        radius = entity.dxf.radius
+        start_angle = entity.dxf.start_angle
+        sweep = (entity.dxf.end_angle - start_angle) % 360 or 360
+        return _curve_primitive(entity, EllipticalArc(
+            entity.dxf.center, (radius, 0), 1.0,
+            math.radians(start_angle), math.radians(sweep)))
+
+    elif entity_type in ('LWPOLYLINE', 'POLYLINE'):
+        # x, y, start width, end width, bulge per vertex
+        if entity_type == 'LWPOLYLINE':
+            vertices = np.array(list(entity.get_points('xyseb')), dtype=float).reshape(-1, 5)
+            is_closed = entity.closed
+            const_width = entity.dxf.get('const_width', 0.0)
+            if const_width and not vertices[:, 2:4].any():
+                vertices[:, 2:4] = const_width
+        else:
+            start_width = entity.dxf.get('default_start_width', 0.0)
+            end_width = entity.dxf.get('default_end_width', 0.0)
+            vertices = np.array([(v.dxf.location[0], v.dxf.location[1],
+                                  v.dxf.get('start_width', start_width),
+                                  v.dxf.get('end_width', end_width), v.dxf.get('bulge', 0.0))
+                                 for v in entity.vertices], dtype=float).reshape(-1, 5)
+            is_closed = entity.is_closed
+        if len(vertices) < 2:
+            return None
+        points = np.ascontiguousarray(vertices[:, :2])
+        widths = vertices[:, 2:4]
+        bulges = vertices[:, 4]
+        if bulges.any() or widths.any():
+            # Arc segments and widths are tessellated per level of detail
+            return _curve_primitive(entity, BulgePolyline(
+                points, bulges.copy(), widths.copy() if widths.any() else None,
+                bool(is_closed)))
+        primitive = _primitive(entity, KIND_PATH, points)
+        primitive.closed = bool(is_closed)
+        return primitive
+
+    elif entity_type == 'SPLINE':
+        return _curve_primitive(entity, SplineCurve.from_bspline(
+            entity.construction_tool(), bool(entity.closed)))
+
+    elif entity_type == 'ELLIPSE':
+        start = entity.dxf.start_param
+        sweep = (entity.dxf.end_param - start) % (2 * math.pi) or 2 * math.pi
+        return _curve_primitive(entity, EllipticalArc(
+            entity.dxf.center, entity.dxf.major_axis, entity.dxf.ratio, start, sweep))
+
+    elif entity_type == 'TEXT':
+        dxf = entity.dxf
+        halign = dxf.get('halign', 0)
+        valign = dxf.get('valign', 0)
+        pos = dxf.insert
+        if halign in TEXT_HALIGN or valign:
+            pos = dxf.get('align_point', pos)
+        if halign == 4:
+            valign = VALIGN_MIDDLE
+        return _text_primitive(entity, entity.plain_text(), pos, dxf.height, dxf.rotation,
+                               dxf.get('width', 1.0), TEXT_HALIGN.get(halign, 0.0), valign,
+                               LINE_SPACING)
+
+    elif entity_type == 'MTEXT':
+        dxf = entity.dxf
+        height = dxf.char_height
+        text = entity.plain_text()
+        if dxf.get('width', 0) > 0 and height > 0:
+            text = wrap_text(text, dxf.width / height)
+        row, column = divmod(min(max(dxf.get('attachment_point', 1), 1), 9) - 1, 3)
+        spacing = LINE_SPACING * dxf.get('line_spacing_factor', 1.0)
+        return _text_primitive(entity, text, dxf.insert, height, entity.get_rotation(), 1.0,
+                               column / 2, MTEXT_VALIGN[row], spacing)
+
+    elif entity_type == 'HATCH':
+        # Gradients are drawn as a solid fill in the entity color
+        return _hatch_primitive(entity, hatch_loops(entity), pattern_baselines(entity),
+                                bool(entity.dxf.solid_fill))
+
+    elif entity_type in ('SOLID', 'TRACE'):
+        return _hatch_primitive(entity, solid_loops(entity), [], True)
+
+    elif entity_type == 'POINT':
+        pos = entity.dxf.location
+        points = np.array([(pos[0], pos[1])])
+        return _primitive(entity, KIND_POINT, points)
+
+    return None
+
+
+def _primitive(entity, kind, points):
+    return Primitive(entity.dxf.handle, entity.dxftype(), entity.dxf.layer,
+                     kind, points, _points_bbox(points))
+
+
+def _curve_primitive(entity, curve):
+    primitive = Primitive(entity.dxf.handle, entity.dxftype(), entity.dxf.layer,
+                          KIND_CURVE, None, curve.bbox(), curve)
+    primitive.closed = curve.closed
+    return primitive
+
+
+def _text_primitive(entity, text, pos, height, rotation, width_factor, halign, valign, spacing):
+    dx, dy, width, depth, bbox = text_placement(text, pos[0], pos[1], height, rotation,
+                                                width_factor, halign, valign, spacing)
+    primitive = Primitive(entity.dxf.handle, entity.dxftype(), entity.dxf.layer,
+                          KIND_TEXT, np.array([(pos[0], pos[1])]), bbox)
+    primitive.text = text
+    primitive.text_params = (height, rotation, width_factor, halign, spacing, dx, dy, width, depth)
+    return primitive
+
+
+def _hatch_primitive(entity, loops, baselines, solid):
+    if not loops:
+        return None
+    primitive = _primitive(entity, KIND_HATCH, np.concatenate(loops))
+    primitive.hatch = ([len(loop) for loop in loops], baselines)
+    primitive.closed = True
+    primitive.fillable = False
+    primitive.solid = solid
+    return primitive
+
+
+def _points_bbox(points):
+    mins = points.min(axis=0)
+    maxs = points.max(axis=0)
+    return (float(mins[0]), float(mins[1]), float(maxs[0]), float(maxs[1]))
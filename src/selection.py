@@ -0,0 +1,450 @@
+"""
+Selection geometry module for DXF Viewer application.
+Exact, vectorized tests between compiled entities and selection
+rectangles with window (fully inside) and crossing (touching) semantics,
+and picking of the entity nearest to a point.
+"""
+
+import numpy as np
+from PyQt6.QtCore import QPointF
+from entity_store import (KIND_LINE, KIND_POINT, KIND_TEXT, KIND_INSERT, KIND_HATCH,
+                          FLAG_WIDE)
+from blocks import MAX_BLOCK_DEPTH, insert_offsets
+
+
+def select_in_rect(scene, rect, crossing, hidden_layers=()):
+    """
+    Indices of entities selected by a world rect (min_x, min_y, max_x, max_y).
+    Window selection takes entities fully inside the rect, crossing
+    selection also takes entities touching it.
+    """
+    min_x, min_y, max_x, max_y = rect
+    store = scene.store
+    candidates = scene.query_visible(rect, hidden_layers)
+    if not len(candidates):
+        return []
+
+    boxes = scene.index.bboxes[candidates]
+    inside = ((boxes[:, 0] >= min_x) & (boxes[:, 2] <= max_x) &
+              (boxes[:, 1] >= min_y) & (boxes[:, 3] <= max_y))
+    selected = candidates[inside].tolist()
+    if not crossing:
+        return selected
+
+    # Boxes straddle the rect border, the geometry decides
+    straddling = candidates[~inside]
+    kinds = store.kinds[straddling]
+    # Text is selected by its box
+    texts = kinds == KIND_TEXT
+    selected.extend(straddling[texts].tolist())
+    # Block references by the content of their block
+    inserts = kinds == KIND_INSERT
+    if inserts.any():
+        crossing_pass = _CrossPass(scene, rect, hidden_layers)
+        selected.extend(i for i in straddling[inserts].tolist()
+                        if crossing_pass.insert_crosses(store, i))
+    rest = ~texts & ~inserts
+    is_circle = store.is_circle(straddling) & rest
+    circles = straddling[is_circle].tolist()
+    outlines = straddling[~is_circle & rest].tolist()
+
+    if circles:
+        boxes = scene.index.bboxes[circles]
+        hits = circles_cross_rect(
+            (boxes[:, 0] + boxes[:, 2]) / 2,
+            (boxes[:, 1] + boxes[:, 3]) / 2,
+            (boxes[:, 2] - boxes[:, 0]) / 2,
+            rect
+        )
+        selected.extend(i for i, hit in zip(circles, hits.tolist()) if hit)
+
+    if outlines:
+        hits = outlines_cross_rect([store.outlines(i) for i in outlines], rect)
+        selected.extend(i for i, hit in zip(outlines, hits.tolist()) if hit)
+
+    return selected
+
+
+def pick(scene, point, tolerance, hidden_layers=()):
+    """
+    Index of the visible entity nearest to a world point (x, y) within
+    tolerance, None if there is none. Entities hit by their geometry win
+    over text hit by its box; of box hits the smallest box wins, of equally
+    near geometry the later row.
+    """
+    x, y = point
+    candidates = scene.query_visible((x - tolerance, y - tolerance,
+                                      x + tolerance, y + tolerance), hidden_layers)
+    if not len(candidates):
+        return None
+    distances, boxed = entity_distances(scene, candidates, point, tolerance, hidden_layers)
+    near = distances <= tolerance
+    exact = near & ~boxed
+    if exact.any():
+        distances = distances[exact]
+        return int(candidates[exact][distances == distances.min()].max())
+    if not near.any():
+        return None
+    # Only text boxes were hit, the most specific one wins
+    hits = candidates[near]
+    boxes = scene.store.bboxes[hits]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return int(hits[np.lexsort((-hits, areas, distances[near]))[0]])
+
+
+def entity_distances(scene, indices, point, tolerance=0.0, hidden_layers=()):
+    """
+    (distance, box hit) per scene row from a world point to its drawn
+    geometry. Text is measured to its box, zero inside, and flagged as a box
+    hit. Block references are measured to the content of their block, which
+    is searched within tolerance of the point.
+    """
+    return _PickPass(scene, point, tolerance, hidden_layers).distances(
+        scene.store, np.asarray(indices, dtype=np.int64))
+
+
+class _BlockPass:
+    """Scene state shared while descending into the blocks of INSERT rows"""
+
+    def __init__(self, scene, hidden_layers):
+        self.scene = scene
+        self.hidden_layers = hidden_layers
+        self.hidden_styles = None
+
+    def _reference(self, store, index, styles):
+        """(block, scene style per block style, insert_params) of an INSERT row"""
+        block_id, params = store.insert(index)
+        style = int(store.styles[index]) if styles is None else int(styles[store.styles[index]])
+        return self.scene.blocks[block_id], self.scene.block_styles(block_id, style), params
+
+    def _block_rows(self, block, block_styles, rect):
+        """Rows of a block whose box intersects a local rect, without hidden ones"""
+        rows = block.scene.query(rect)
+        return rows[~self._hidden(block_styles[block.scene.store.styles[rows]])]
+
+    def _hidden(self, styles):
+        """Mask of scene styles on hidden layers"""
+        if not self.hidden_layers:
+            return np.zeros(len(styles), dtype=bool)
+        style_keys = self.scene.style_keys
+        if self.hidden_styles is None or len(self.hidden_styles) < len(style_keys):
+            # Block styles add scene styles on first use
+            self.hidden_styles = np.array([key[0] in self.hidden_layers for key in style_keys],
+                                          dtype=bool)
+        return self.hidden_styles[styles]
+
+
+class _PickPass(_BlockPass):
+    """State of one pick through the scene and the blocks it references"""
+
+    def __init__(self, scene, point, tolerance, hidden_layers):
+        super().__init__(scene, hidden_layers)
+        self.point = np.asarray(point, dtype=float)
+        self.tolerance = tolerance
+        x, y = self.point.tolist()
+        self.rect = (x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+
+    def distances(self, store, indices, placement=None, styles=None, depth=0):
+        """
+        Distances of store rows, placed into the world by placement
+        (None for scene rows) with scene styles per store style
+        """
+        point = self.point
+        distances = np.full(len(indices), np.inf)
+        boxed = np.zeros(len(indices), dtype=bool)
+        kinds = store.kinds[indices]
+        boxes = store.bboxes[indices]
+
+        texts = kinds == KIND_TEXT
+        if texts.any():
+            distances[texts] = quad_distances(_place(placement, _box_corners(boxes[texts])),
+                                              point)
+            boxed[texts] = True
+
+        inserts = np.flatnonzero(kinds == KIND_INSERT)
+        for position, index in zip(inserts.tolist(), indices[inserts].tolist()):
+            distances[position], boxed[position] = self._insert(store, index, placement,
+                                                                styles, depth)
+
+        rest = ~texts & (kinds != KIND_INSERT)
+        if placement is None:
+            # Scene rows, lines are the bulk of most drawings and measured in one pass
+            lines = rest & (kinds == KIND_LINE)
+            if lines.any():
+                starts = store.starts[indices[lines]]
+                distances[lines] = segment_distances(store.coords[starts],
+                                                     store.coords[starts + 1], point)
+
+            points = rest & (kinds == KIND_POINT)
+            if points.any():
+                anchors = store.coords[store.starts[indices[points]]]
+                distances[points] = np.hypot(*(anchors - point).T)
+
+            circles = rest & store.is_circle(indices)
+            if circles.any():
+                centers = (boxes[circles, :2] + boxes[circles, 2:]) / 2
+                radius = (boxes[circles, 2] - boxes[circles, 0]) / 2
+                distances[circles] = np.abs(np.hypot(*(centers - point).T) - radius)
+            rest &= ~(lines | points | circles)
+
+        rest = np.flatnonzero(rest)
+        if len(rest):
+            rows = indices[rest].tolist()
+            outlines = [[_place(placement, points) for points in store.outlines(i)]
+                        for i in rows]
+            distances[rest] = outline_distances(outlines, point)
+            local = QPointF(*_to_local(placement, point).tolist())
+            scale = _min_scale(placement)
+            for position, index in zip(rest.tolist(), rows):
+                kind = store.kinds[index]
+                if kind == KIND_HATCH:
+                    # Loops are odd-even filled, inner loops are holes
+                    if store.geometry(index).contains(local):
+                        distances[position] = 0.0
+                elif store.flags[index] & FLAG_WIDE:
+                    # Wide polylines are hit within half their widest segment
+                    distances[position] = max(
+                        distances[position] - store.geometry(index).max_width / 2 * scale, 0.0)
+        return distances, boxed
+
+    def _insert(self, store, index, placement, styles, depth):
+        """(distance, box hit) of the nearest content of an INSERT row over its copies"""
+        if depth >= MAX_BLOCK_DEPTH:
+            return np.inf, False
+        block, block_styles, params = self._reference(store, index, styles)
+
+        distances = []
+        boxed = []
+        for copy in _block_copies(block, params, placement, self.rect):
+            scale = _min_scale(copy)
+            if scale <= 0:
+                continue
+            x, y = _to_local(copy, self.point).tolist()
+            margin = self.tolerance / scale
+            rows = self._block_rows(block, block_styles,
+                                    (x - margin, y - margin, x + margin, y + margin))
+            if len(rows):
+                row_distances, row_boxed = self.distances(block.scene.store, rows, copy,
+                                                          block_styles, depth + 1)
+                distances.append(row_distances)
+                boxed.append(row_boxed)
+        if not distances:
+            return np.inf, False
+        return _nearest(np.concatenate(distances), np.concatenate(boxed), self.tolerance)
+
+
+class _CrossPass(_BlockPass):
+    """State of one crossing selection through the blocks of INSERT rows"""
+
+    def __init__(self, scene, rect, hidden_layers):
+        super().__init__(scene, hidden_layers)
+        self.rect = rect
+        min_x, min_y, max_x, max_y = rect
+        self.corners = np.array([[min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y]],
+                                dtype=float)
+
+    def insert_crosses(self, store, index, placement=None, styles=None, depth=0):
+        """True if the visible content of an INSERT row touches the rect"""
+        if depth >= MAX_BLOCK_DEPTH:
+            return False
+        block, block_styles, params = self._reference(store, index, styles)
+        for copy in _block_copies(block, params, placement, self.rect):
+            if _min_scale(copy) <= 0:
+                continue
+            # The rect is a parallelogram in block coordinates, its box is searched
+            corners = _to_local(copy, self.corners)
+            rect = (*corners.min(axis=0).tolist(), *corners.max(axis=0).tolist())
+            rows = self._block_rows(block, block_styles, rect)
+            if len(rows) and self._rows_cross(block.scene.store, rows, copy, block_styles,
+                                              depth + 1):
+                return True
+        return False
+
+    def _rows_cross(self, store, indices, placement, styles, depth):
+        """True if any of the placed block rows touches the rect"""
+        kinds = store.kinds[indices]
+        texts = kinds == KIND_TEXT
+        if texts.any():
+            quads = _place(placement, _box_corners(store.bboxes[indices[texts]]))
+            if quads_cross_rect(quads, self.rect).any():
+                return True
+        inserts = kinds == KIND_INSERT
+        rows = indices[~texts & ~inserts].tolist()
+        if rows:
+            outlines = [[_place(placement, points) for points in store.outlines(i)]
+                        for i in rows]
+            if outlines_cross_rect(outlines, self.rect).any():
+                return True
+        return any(self.insert_crosses(store, i, placement, styles, depth)
+                   for i in indices[inserts].tolist())
+
+
+def _nearest(distances, boxed, tolerance):
+    """(distance, box hit) of the best hit, geometry within tolerance before boxes"""
+    exact = distances[~boxed]
+    if len(exact) and exact.min() <= tolerance:
+        return float(exact.min()), False
+    best = int(np.argmin(distances))
+    return float(distances[best]), bool(boxed[best])
+
+
+def _placement(params, offset=(0.0, 0.0)):
+    """
+    (matrix, translation) of an insert_params transform plus a MINSERT copy
+    offset, points are placed as points @ matrix + translation
+    """
+    m11, m12, m21, m22, dx, dy = np.asarray(params[:6], dtype=float).tolist()
+    return np.array([[m11, m12], [m21, m22]]), np.array([dx + offset[0], dy + offset[1]])
+
+
+def _compose(inner, outer):
+    """Placement applying inner first, then outer (None is the identity)"""
+    if outer is None:
+        return inner
+    return inner[0] @ outer[0], inner[1] @ outer[0] + outer[1]
+
+
+def _place(placement, points):
+    if placement is None:
+        return points
+    return points @ placement[0] + placement[1]
+
+
+def _to_local(placement, points):
+    """World point (2,) or points (n, 2) in the coordinates of a placement"""
+    if placement is None:
+        return points
+    matrix, translation = placement
+    if abs(np.linalg.det(matrix)) < 1e-300:
+        return np.full(np.shape(points), np.nan)
+    return np.linalg.solve(matrix.T, (points - translation).T).T
+
+
+def _min_scale(placement):
+    """Smallest stretch of a placement, local distances times it never exceed world ones"""
+    if placement is None:
+        return 1.0
+    return float(np.linalg.svd(placement[0], compute_uv=False).min())
+
+
+def _box_corners(boxes):
+    """(n, 4, 2) corners of (n, 4) boxes in order around the box"""
+    return np.stack([boxes[:, [0, 1]], boxes[:, [2, 1]], boxes[:, [2, 3]], boxes[:, [0, 3]]],
+                    axis=1)
+
+
+def _block_copies(block, params, placement, rect):
+    """Placements of the MINSERT copies whose placed block box intersects a world rect"""
+    offsets = insert_offsets(params)
+    base = _compose(_placement(params), placement)
+    corners = _place(base, _box_corners(np.array([block.bbox]))[0])
+    shifts = offsets if placement is None else offsets @ placement[0]
+    low = corners.min(axis=0) + shifts
+    high = corners.max(axis=0) + shifts
+    near = ((low <= rect[2:]) & (high >= rect[:2])).all(axis=1)
+    return [(base[0], base[1] + shift) for shift in shifts[near]]
+
+
+def outline_distances(outlines, point):
+    """Per outline list: distance from a point to the nearest of its polylines"""
+    result = np.full(len(outlines), np.inf)
+    segments = _segments(outlines)
+    if segments is not None:
+        starts, ends, owners = segments
+        np.minimum.at(result, owners, segment_distances(starts, ends, point))
+    return result
+
+
+def segment_distances(starts, ends, point):
+    """Distance from a point to each segment of (n, 2) start and end arrays"""
+    direction = ends - starts
+    length_sq = (direction * direction).sum(axis=1)
+    # Projection of the point onto each segment, zero length segments use their start
+    t = ((point - starts) * direction).sum(axis=1) / np.where(length_sq > 0, length_sq, 1.0)
+    nearest = starts + np.clip(t, 0.0, 1.0)[:, None] * direction
+    return np.hypot(*(nearest - point).T)
+
+
+def quad_distances(quads, point):
+    """Distance from a point to (n, 4, 2) convex quadrilaterals, zero inside"""
+    starts = quads.reshape(-1, 2)
+    ends = np.roll(quads, -1, axis=1).reshape(-1, 2)
+    distances = segment_distances(starts, ends, point).reshape(-1, 4).min(axis=1)
+    # Inside if the point is on the same side of all edges
+    edges = ends - starts
+    sides = (edges[:, 0] * (point[1] - starts[:, 1]) -
+             edges[:, 1] * (point[0] - starts[:, 0])).reshape(-1, 4)
+    inside = (sides >= 0).all(axis=1) | (sides <= 0).all(axis=1)
+    distances[inside] = 0.0
+    return distances
+
+
+def quads_cross_rect(quads, rect):
+    """Per (4, 2) convex quadrilateral of (n, 4, 2) quads: True if it touches the rect"""
+    starts = quads.reshape(-1, 2)
+    ends = np.roll(quads, -1, axis=1).reshape(-1, 2)
+    edges = segments_intersect_rect(starts, ends, rect).reshape(-1, 4).any(axis=1)
+    # A rect inside a quad touches none of its edges
+    return edges | (quad_distances(quads, np.array(rect[:2], dtype=float)) == 0)
+
+
+def outlines_cross_rect(outlines, rect):
+    """Per outline list: True if any of its polylines touches the rect"""
+    result = np.zeros(len(outlines), dtype=bool)
+    segments = _segments(outlines)
+    if segments is not None:
+        starts, ends, owners = segments
+        result[owners[segments_intersect_rect(starts, ends, rect)]] = True
+    return result
+
+
+def _segments(outlines):
+    """(starts, ends, owner per segment) of outline lists, None without segments"""
+    starts = []
+    ends = []
+    owners = []
+    for owner, polylines in enumerate(outlines):
+        for points in polylines:
+            if len(points) == 1:
+                # A single point is a zero length segment
+                points = np.vstack([points, points])
+            starts.append(points[:-1])
+            ends.append(points[1:])
+            owners.append(np.full(len(points) - 1, owner))
+
+    if not starts:
+        return None
+    return np.concatenate(starts), np.concatenate(ends), np.concatenate(owners)
+
+
+def segments_intersect_rect(starts, ends, rect):
+    """Exact segment/rectangle intersection test for (n, 2) start and end arrays"""
+    min_x, min_y, max_x, max_y = rect
+    x0, y0 = starts[:, 0], starts[:, 1]
+    x1, y1 = ends[:, 0], ends[:, 1]
+
+    # Bounding boxes must overlap
+    overlap = ((np.minimum(x0, x1) <= max_x) & (np.maximum(x0, x1) >= min_x) &
+               (np.minimum(y0, y1) <= max_y) & (np.maximum(y0, y1) >= min_y))
+
+    # The segment's line must separate the rect corners (or touch one)
+    dx = x1 - x0
+    dy = y1 - y0
+    sides = np.stack([
+        dx * (corner_y - y0) - dy * (corner_x - x0)
+        for corner_x, corner_y in ((min_x, min_y), (max_x, min_y), (min_x, max_y), (max_x, max_y))
+    ])
+    straddle = (sides.min(axis=0) <= 0) & (sides.max(axis=0) >= 0)
+    return overlap & straddle
+
+
+def circles_cross_rect(cx, cy, radius, rect):
+    """Exact test whether circle outlines touch a rect"""
+    min_x, min_y, max_x, max_y = rect
+    # Nearest point of the rect must be inside, farthest corner outside
+    near_x = np.clip(cx, min_x, max_x) - cx
+    near_y = np.clip(cy, min_y, max_y) - cy
+    far_x = np.maximum(np.abs(cx - min_x), np.abs(cx - max_x))
+    far_y = np.maximum(np.abs(cy - min_y), np.abs(cy - max_y))
+    radius_sq = radius * radius
+    return (near_x ** 2 + near_y ** 2 <= radius_sq) & (far_x ** 2 + far_y ** 2 >= radius_sq)
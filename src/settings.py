@@ -11,6 +11,11 @@ class Settings:
     # Default settings
     DEFAULT_SETTINGS = {
         "language": Translations.DEFAULT_LANGUAGE,
+        "tiled_rendering": False,
+        "streaming_load": False,
+        # Disk cache of compiled drawings and its budget in megabytes
+        "geometry_cache": True,
+        "geometry_cache_mb": 2048,
         "window_state": {
             "maximized": True,
             "width": 1200,
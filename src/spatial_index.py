@@ -0,0 +1,203 @@
+"""
+Spatial index module for DXF Viewer application.
+Uniform grid over entity bounding boxes used to find the entities that
+intersect a world rectangle without scanning the whole drawing, plus a
+partition of the rows by layer so hidden layers cost nothing to skip.
+"""
+
+import numpy as np
+
+# Entities covering more cells than this are kept in a separate list
+MAX_CELL_SPAN = 16
+
+# Upper limit for the number of grid cells
+MAX_CELLS = 1 << 20
+
+# Queries covering more than this share of the grid scan all boxes
+FULL_SCAN_RATIO = 0.25
+
+# Visible layers are queried one by one up to this many layers
+MAX_LAYER_QUERIES = 32
+
+# ... and while they hold less than this share of all rows
+LAYER_QUERY_RATIO = 0.25
+
+
+class GridIndex:
+    def __init__(self, bboxes, ids=None):
+        """
+        bboxes: (n, 4) array of (min_x, min_y, max_x, max_y), NaN rows are ignored.
+        A float array is shared with its owner, not copied.
+        ids: rows to index, all by default.
+        """
+        self.bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+        self.ids = ids
+        # Entities edited since the grid was built, always tested
+        self._extra = set()
+        self._build()
+
+    def __len__(self):
+        return len(self.bboxes)
+
+    def _build(self):
+        rows = np.arange(len(self.bboxes)) if self.ids is None else self.ids
+        boxes = self.bboxes if self.ids is None else self.bboxes[rows]
+        valid = ~np.isnan(boxes).any(axis=1)
+        count = int(valid.sum())
+
+        if count:
+            self.origin = (boxes[valid, 0].min(), boxes[valid, 1].min())
+            width = boxes[valid, 2].max() - self.origin[0]
+            height = boxes[valid, 3].max() - self.origin[1]
+        else:
+            self.origin = (0.0, 0.0)
+            width = height = 0.0
+
+        # About one entity per cell, cells roughly square
+        cells = min(max(count, 1), MAX_CELLS)
+        extent = max(width, height, 1e-9)
+        self.cell_size = max(
+            np.sqrt(max(width, 1e-9 * extent) * max(height, 1e-9 * extent) / cells),
+            extent / np.sqrt(MAX_CELLS)
+        )
+        self.nx = int(width / self.cell_size) + 1
+        self.ny = int(height / self.cell_size) + 1
+
+        ids = rows[valid]
+        ix0, iy0, ix1, iy1 = self._cell_range(boxes[valid])
+        span_x = ix1 - ix0 + 1
+        span_y = iy1 - iy0 + 1
+
+        # Entities spanning many cells are tested separately
+        large = span_x * span_y > MAX_CELL_SPAN
+        self._large = ids[large]
+        ids, ix0, iy0 = ids[~large], ix0[~large], iy0[~large]
+        span_x, span_y = span_x[~large], span_y[~large]
+
+        keys = []
+        members = []
+        for dy in range(int(span_y.max()) if len(ids) else 0):
+            for dx in range(int(span_x.max())):
+                mask = (dx < span_x) & (dy < span_y)
+                if not mask.any():
+                    continue
+                keys.append((iy0[mask] + dy) * self.nx + ix0[mask] + dx)
+                members.append(ids[mask])
+
+        keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+        members = np.concatenate(members) if members else np.empty(0, dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        self._cell_members = members[order]
+        # Cells are stored row by row, so a row of cells is one slice
+        self._cell_starts = np.searchsorted(keys[order], np.arange(self.nx * self.ny + 1))
+
+    def _cell_range(self, boxes):
+        """Clamped cell index ranges (ix0, iy0, ix1, iy1) covered by boxes"""
+        cell = self.cell_size
+        ix0 = np.clip(((boxes[:, 0] - self.origin[0]) // cell).astype(np.int64), 0, self.nx - 1)
+        iy0 = np.clip(((boxes[:, 1] - self.origin[1]) // cell).astype(np.int64), 0, self.ny - 1)
+        ix1 = np.clip(((boxes[:, 2] - self.origin[0]) // cell).astype(np.int64), 0, self.nx - 1)
+        iy1 = np.clip(((boxes[:, 3] - self.origin[1]) // cell).astype(np.int64), 0, self.ny - 1)
+        return ix0, iy0, ix1, iy1
+
+    def query(self, rect):
+        """Sorted ids of entities whose box intersects rect (min_x, min_y, max_x, max_y)"""
+        min_x, min_y, max_x, max_y = rect
+        ix0, iy0, ix1, iy1 = (int(v[0]) for v in self._cell_range(np.array([rect], dtype=float)))
+
+        if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > FULL_SCAN_RATIO * self.nx * self.ny:
+            candidates = self.ids
+        else:
+            parts = [self._large, np.fromiter(self._extra, dtype=np.int64, count=len(self._extra))]
+            starts = self._cell_starts
+            for row in range(iy0, iy1 + 1):
+                first = row * self.nx
+                parts.append(self._cell_members[starts[first + ix0]:starts[first + ix1 + 1]])
+            candidates = np.unique(np.concatenate(parts))
+
+        boxes = self.bboxes if candidates is None else self.bboxes[candidates]
+        hits = ((boxes[:, 0] <= max_x) & (boxes[:, 2] >= min_x) &
+                (boxes[:, 1] <= max_y) & (boxes[:, 3] >= min_y))
+        hits = np.nonzero(hits)[0]
+        return hits if candidates is None else candidates[hits]
+
+    def update(self, index, bbox):
+        """Change the box of an entity, None removes it"""
+        self.bboxes[index] = bbox if bbox is not None else np.nan
+        self._extra.add(index)
+        # Rebuild once edits make up a noticeable share of the grid
+        if len(self._extra) > max(1024, len(self.bboxes) // 8):
+            self._extra = set()
+            self._build()
+
+
+class LayerIndex:
+    """Rows partitioned by layer id, each partition with its own grid built on demand"""
+
+    def __init__(self, grid, codes, layer_ids):
+        """
+        grid: GridIndex over all rows, codes: layer id per row,
+        layer_ids: layer name -> id. Codes and ids are shared with their owner.
+        """
+        self.grid = grid
+        self.codes = codes
+        self.layer_ids = layer_ids
+        # (rows sorted by layer, start per layer id, layer id -> GridIndex),
+        # replaced as a whole so drawing threads never see a mix
+        self._partition = None
+
+    def _current(self):
+        partition = self._partition
+        if partition is None:
+            live = ~np.isnan(self.grid.bboxes).any(axis=1)
+            order = np.argsort(self.codes, kind='stable')
+            order = order[live[order]]
+            starts = np.searchsorted(self.codes[order], np.arange(len(self.layer_ids) + 1))
+            partition = self._partition = (order, starts, {})
+        return partition
+
+    def rows(self, layer_id):
+        """Indices of the live rows on a layer"""
+        order, starts, _ = self._current()
+        if layer_id + 1 >= len(starts):
+            return np.empty(0, dtype=np.int64)
+        return order[starts[layer_id]:starts[layer_id + 1]]
+
+    def counts(self):
+        """Live rows per layer id"""
+        _, starts, _ = self._current()
+        return np.diff(starts)
+
+    def visible_mask(self, hidden_layers):
+        """Boolean per layer id, False for the hidden layers"""
+        mask = np.ones(len(self.layer_ids), dtype=bool)
+        layer_ids = self.layer_ids
+        mask[[layer_ids[name] for name in hidden_layers if name in layer_ids]] = False
+        return mask
+
+    def query(self, rect, visible):
+        """
+        Sorted ids of rows on visible layers whose box intersects rect,
+        visible is a mask from visible_mask()
+        """
+        order, starts, grids = self._current()
+        counts = np.diff(starts)
+        layers = np.flatnonzero(visible[:len(counts)])
+        layers = layers[counts[layers] > 0]
+        if (len(layers) <= MAX_LAYER_QUERIES and
+                counts[layers].sum() <= LAYER_QUERY_RATIO * len(order)):
+            # Few visible rows, only their layers are searched
+            parts = []
+            for layer in layers.tolist():
+                grid = grids.get(layer)
+                if grid is None:
+                    grid = grids[layer] = GridIndex(self.grid.bboxes,
+                                                    order[starts[layer]:starts[layer + 1]])
+                parts.append(grid.query(rect))
+            return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        hits = self.grid.query(rect)
+        return hits[visible[self.codes[hits]]]
+
+    def update(self):
+        """Rows were edited, moved to other layers or removed, partition again on next use"""
+        self._partition = None
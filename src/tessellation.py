@@ -0,0 +1,359 @@
+"""
+Curve tessellation module for DXF Viewer application.
+Curves are flattened into polylines whose chord error stays below a
+fraction of a pixel at the current zoom. Each curve keeps a few recently
+used levels of detail so repaints at a similar zoom reuse them.
+"""
+
+import math
+import threading
+import numpy as np
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPainterPath, QPolygonF
+
+# Maximum chord error in pixels
+TOLERANCE_PX = 0.25
+
+# Level of detail L is meant for curves about 2**L pixels in size
+MAX_LEVEL = 16
+
+# Level used for selection and picking geometry
+FINE_LEVEL = 12
+
+# Tessellated levels kept per curve
+LOD_CACHE_SIZE = 3
+
+# Upper limit of stored samples per spline
+MAX_SPLINE_SAMPLES = 4096
+
+# Curves are shared by the tile and layer render threads
+_lock = threading.Lock()
+
+
+def lod_level(size_px):
+    """Level of detail for a curve spanning size_px pixels"""
+    if size_px <= 1:
+        return 0
+    return min(MAX_LEVEL, math.ceil(math.log2(size_px)))
+
+
+class Curve:
+    """Base class for curves with cached levels of detail"""
+    __slots__ = ('size', 'closed', '_paths')
+
+    def __init__(self, size, closed):
+        self.size = size        # Largest world extent, sets the level
+        self.closed = closed
+        self._paths = {}
+
+    def level(self, scale):
+        return lod_level(self.size * scale)
+
+    def path(self, scale):
+        """QPainterPath flattened for the given world-to-screen scale"""
+        level = self.level(scale)
+        return _cached_level(self._paths, level,
+                             lambda: points_path(self.points(level), self.closed))
+
+    def tolerance(self, level):
+        """Chord error in world units allowed at a level"""
+        return max(self.size, 1e-12) * TOLERANCE_PX / (1 << level)
+
+    def points(self, level):
+        """(n, 2) vertex array flattened for a level"""
+        raise NotImplementedError
+
+
+class EllipticalArc(Curve):
+    """Circle, arc, ellipse or elliptical arc"""
+    __slots__ = ('center', 'major', 'minor', 'ratio', 'start', 'sweep')
+
+    def __init__(self, center, major_axis, ratio, start, sweep):
+        """Parameters and sweep in radians, counter-clockwise"""
+        self.center = (center[0], center[1])
+        self.major = (major_axis[0], major_axis[1])
+        self.ratio = ratio
+        # Minor axis is the major axis rotated by 90 degrees
+        self.minor = (-major_axis[1] * ratio, major_axis[0] * ratio)
+        self.start = start
+        self.sweep = sweep
+        radius = math.hypot(*self.major)
+        super().__init__(2 * radius, sweep >= 2 * math.pi)
+
+    def points(self, level):
+        radius = self.size / 2
+        tolerance = self.tolerance(level)
+        if tolerance >= radius:
+            step = math.pi / 2
+        else:
+            step = 2 * math.acos(1 - tolerance / radius)
+        count = max(2 if not self.closed else 4, math.ceil(self.sweep / step))
+        params = self.start + np.linspace(0, self.sweep, count + 1)
+        if self.closed:
+            params = params[:-1]
+        return self._at(params)
+
+    def _at(self, params):
+        cos_t = np.cos(params)
+        sin_t = np.sin(params)
+        return np.column_stack([
+            self.center[0] + cos_t * self.major[0] + sin_t * self.minor[0],
+            self.center[1] + cos_t * self.major[1] + sin_t * self.minor[1]
+        ])
+
+    def bbox(self):
+        """Exact bounding box from the extreme points inside the sweep"""
+        params = [self.start, self.start + self.sweep]
+        for axis in (0, 1):
+            base = math.atan2(self.minor[axis], self.major[axis])
+            for extreme in (base, base + math.pi):
+                if (extreme - self.start) % (2 * math.pi) <= self.sweep:
+                    params.append(extreme)
+        points = self._at(np.array(params))
+        mins = points.min(axis=0)
+        maxs = points.max(axis=0)
+        return (float(mins[0]), float(mins[1]), float(maxs[0]), float(maxs[1]))
+
+
+class SplineCurve(Curve):
+    """(Rational) B-spline evaluated with NumPy"""
+    __slots__ = ('degree', 'knots', 'control', 'weights', '_samples', 'bend')
+
+    def __init__(self, degree, knots, control, weights, closed, samples=None, bend=None):
+        """Knots, (n, 2) control points and weights (None if not rational) as arrays"""
+        self.degree = degree
+        self.knots = knots
+        self.control = control
+        self.weights = weights
+        super().__init__(float((control.max(axis=0) - control.min(axis=0)).max()), closed)
+        if samples is None:
+            # Dense samples, uniform in the parameter, subsampled per level
+            count = min(MAX_SPLINE_SAMPLES, max(64, 32 * (len(control) - degree)))
+            samples = self._at(count)
+        self._samples = samples
+        self.bend = _max_bend(samples) if bend is None else bend
+
+    @classmethod
+    def from_bspline(cls, bspline, closed):
+        """Curve of an ezdxf BSpline construction tool"""
+        return cls(
+            bspline.degree,
+            np.array(bspline.knots(), dtype=float),
+            np.array([(p.x, p.y) for p in bspline.control_points], dtype=float),
+            np.array(bspline.weights(), dtype=float) if bspline.is_rational else None,
+            closed
+        )
+
+    @property
+    def samples(self):
+        """Dense (n, 2) sample array all levels are derived from"""
+        return self._samples
+
+    def points(self, level):
+        # Chord error of every k-th sample is about k**2 * bend / 8
+        tolerance = self.tolerance(level)
+        samples = self._samples
+        if self.bend <= 0:
+            return samples[[0, -1]]
+        stride = math.sqrt(8 * tolerance / self.bend)
+        if stride >= 1:
+            stride = int(stride)
+            indices = np.arange(0, len(samples), stride)
+            if indices[-1] != len(samples) - 1:
+                indices = np.append(indices, len(samples) - 1)
+            return samples[indices]
+        # Finer than the stored samples (deep zoom)
+        return self._at(min(MAX_SPLINE_SAMPLES * 16, math.ceil((len(samples) - 1) / stride) + 1))
+
+    def _at(self, count):
+        params = np.linspace(self.knots[self.degree], self.knots[len(self.control)], count)
+        return bspline_points(self.degree, self.knots, self.control, self.weights, params)
+
+    def bbox(self):
+        mins = self._samples.min(axis=0)
+        maxs = self._samples.max(axis=0)
+        return (float(mins[0]), float(mins[1]), float(maxs[0]), float(maxs[1]))
+
+
+class BulgePolyline(Curve):
+    """Polyline with arc segments (bulges) and optional start and end widths"""
+    __slots__ = ('vertices', 'bulges', 'widths', 'max_width', '_outlines')
+
+    def __init__(self, vertices, bulges, widths, closed):
+        """(n, 2) vertices, bulge per vertex, (n, 2) widths per vertex or None"""
+        self.vertices = vertices
+        self.bulges = bulges
+        self.widths = widths
+        self.max_width = float(widths.max()) if widths is not None else 0.0
+        super().__init__(float((vertices.max(axis=0) - vertices.min(axis=0)).max()), closed)
+        # Level -> filled outline of a wide polyline
+        self._outlines = {}
+
+    def points(self, level):
+        points, _, _ = self._samples(level)
+        if not self.closed:
+            points = np.vstack([points, self.vertices[-1:]])
+        return points
+
+    def _samples(self, level):
+        """
+        Points along all segments without the end of the last one, plus the
+        segment index and the segment parameter of each point
+        """
+        vertices = self.vertices
+        count = len(vertices)
+        segments = count if self.closed else count - 1
+        start = vertices[:segments]
+        chord = vertices[(np.arange(segments) + 1) % count] - start
+        bulge = self.bulges[:segments]
+        arc = np.abs(bulge) > 1e-12
+
+        # Arc through both ends: sweep 4 * atan(bulge), center left of the chord
+        safe = np.where(arc, bulge, 1.0)
+        sweep = 4 * np.arctan(bulge)
+        center = start + chord / 2 + np.column_stack([-chord[:, 1], chord[:, 0]]) * \
+            ((1 - safe ** 2) / (4 * safe))[:, None]
+        radius = np.hypot(*(start - center).T)
+        start_angle = np.arctan2(*(start - center).T[::-1])
+
+        steps = np.ones(segments, dtype=np.int64)
+        if arc.any():
+            tolerance = self.tolerance(level)
+            ratio = np.clip(1 - tolerance / np.maximum(radius[arc], 1e-12), -1.0, 1.0)
+            step = np.maximum(2 * np.arccos(ratio), 1e-3)
+            steps[arc] = np.maximum(1, np.ceil(np.abs(sweep[arc]) / step))
+
+        segment = np.repeat(np.arange(segments), steps)
+        t = (np.arange(len(segment)) - np.repeat(np.cumsum(steps) - steps, steps)) / steps[segment]
+        points = start[segment] + chord[segment] * t[:, None]
+        on_arc = arc[segment]
+        if on_arc.any():
+            angle = start_angle[segment[on_arc]] + sweep[segment[on_arc]] * t[on_arc]
+            points[on_arc] = center[segment[on_arc]] + \
+                radius[segment[on_arc], None] * np.column_stack([np.cos(angle), np.sin(angle)])
+        return points, segment, t
+
+    def outline_path(self, scale):
+        """Filled outline of a polyline with widths, segments joined by bevels"""
+        level = self.level(scale)
+        return _cached_level(self._outlines, level, lambda: self._outline(level))
+
+    def _outline(self, level):
+        points, segment, t = self._samples(level)
+        vertices = self.vertices
+        segments = len(vertices) if self.closed else len(vertices) - 1
+        bounds = np.searchsorted(segment, np.arange(segments + 1)).tolist()
+        path = QPainterPath()
+        path.setFillRule(Qt.FillRule.WindingFill)
+        # (start, start left, start right, end left, end right) per segment
+        ends = []
+        for i in range(segments):
+            first, last = bounds[i], bounds[i + 1]
+            centre = np.vstack([points[first:last], vertices[(i + 1) % len(vertices)]])
+            start_width, end_width = self.widths[i]
+            width = start_width + (end_width - start_width) * np.append(t[first:last], 1.0)
+            left, right = _offsets(centre, width / 2)
+            _add_polygon(path, np.vstack([left, right[::-1]]))
+            ends.append((centre[0], left[0], right[0], left[-1], right[-1]))
+
+        # Bevel joins between neighbouring segments
+        joins = list(zip(ends[:-1], ends[1:]))
+        if self.closed:
+            joins.append((ends[-1], ends[0]))
+        for before, after in joins:
+            _add_polygon(path, np.array([after[0], before[3], after[1]]))
+            _add_polygon(path, np.array([after[0], before[4], after[2]]))
+        return path
+
+    def bbox(self):
+        points = self.points(FINE_LEVEL)
+        margin = self.max_width / 2
+        mins = points.min(axis=0) - margin
+        maxs = points.max(axis=0) + margin
+        return (float(mins[0]), float(mins[1]), float(maxs[0]), float(maxs[1]))
+
+
+def _offsets(points, half_widths):
+    """Points moved left and right of a polyline by half_widths"""
+    direction = np.gradient(points, axis=0) if len(points) > 2 else \
+        np.repeat(points[-1:] - points[:1], len(points), axis=0)
+    length = np.maximum(np.hypot(*direction.T), 1e-300)
+    normal = np.column_stack([-direction[:, 1], direction[:, 0]]) / length[:, None]
+    offset = normal * half_widths[:, None]
+    return points + offset, points - offset
+
+
+def _add_polygon(path, points):
+    # Same orientation for all parts, so the winding fill is their union
+    x, y = points.T
+    if np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y) < 0:
+        points = points[::-1]
+    path.addPath(points_path(points, True))
+
+
+def _cached_level(cache, level, build):
+    """Least recently used cache of a few levels of detail"""
+    with _lock:
+        value = cache.pop(level, None)
+        if value is not None:
+            cache[level] = value
+            return value
+    value = build()
+    with _lock:
+        if len(cache) >= LOD_CACHE_SIZE:
+            # Drop the least recently used level
+            cache.pop(next(iter(cache)), None)
+        cache[level] = value
+    return value
+
+
+def bspline_points(degree, knots, control, weights, params):
+    """Vectorized (rational) B-spline evaluation at an array of parameters"""
+    last = len(control) - 1
+    span = np.clip(np.searchsorted(knots, params, side='right') - 1, degree, last)
+
+    # Cox-de Boor recursion for the non-zero basis functions of each span
+    basis = np.zeros((len(params), degree + 1))
+    basis[:, 0] = 1.0
+    left = np.zeros((len(params), degree + 1))
+    right = np.zeros((len(params), degree + 1))
+    for j in range(1, degree + 1):
+        left[:, j] = params - knots[span + 1 - j]
+        right[:, j] = knots[span + j] - params
+        saved = np.zeros(len(params))
+        for r in range(j):
+            denominator = right[:, r + 1] + left[:, j - r]
+            temp = np.divide(basis[:, r], denominator,
+                             out=np.zeros(len(params)), where=denominator != 0)
+            basis[:, r] = saved + right[:, r + 1] * temp
+            saved = left[:, j - r] * temp
+        basis[:, j] = saved
+
+    indices = span[:, None] - degree + np.arange(degree + 1)
+    if weights is not None:
+        basis = basis * weights[indices]
+        basis /= basis.sum(axis=1, keepdims=True)
+    return np.einsum('ij,ijk->ik', basis, control[indices])
+
+
+def _max_bend(samples):
+    """Largest second difference of consecutive samples"""
+    if len(samples) < 3:
+        return 0.0
+    second = samples[2:] - 2 * samples[1:-1] + samples[:-2]
+    return float(np.sqrt((second ** 2).sum(axis=1)).max())
+
+
+def points_path(points, closed):
+    """Polyline QPainterPath through (n, 2) points"""
+    polygon = QPolygonF()
+    polygon.resize(len(points))
+    # Fill the point buffer directly instead of creating QPointF objects
+    buffer = polygon.data()
+    buffer.setsize(len(points) * 16)
+    np.frombuffer(buffer, dtype=float).reshape(-1, 2)[:] = points
+    path = QPainterPath()
+    path.addPolygon(polygon)
+    if closed:
+        path.closeSubpath()
+    return path
@@ -0,0 +1,138 @@
+"""
+Text layout module for DXF Viewer application.
+Strings are laid out once into glyph outlines with a cap height of one
+and kept in a bounded cache. Drawing a TEXT or MTEXT entity is a
+transform plus a path fill instead of a font change and a layout per
+entity and frame.
+"""
+
+import threading
+from PyQt6.QtCore import QPointF, QRectF
+from PyQt6.QtGui import QFont, QFontMetricsF, QPainterPath, QTransform
+
+# Laid out strings kept for drawing
+TEXT_CACHE_SIZE = 4096
+
+# Text lower than this many pixels is not drawn
+MIN_TEXT_PX = 1.0
+
+# Text lower than this many pixels is drawn as a line instead of glyphs
+GREEK_TEXT_PX = 4.0
+
+# MTEXT line distance in text heights at a line spacing factor of 1
+LINE_SPACING = 5 / 3
+
+# Font pixel size the outlines are laid out with
+LAYOUT_PIXEL_SIZE = 100
+
+# Vertical alignment, TEXT valign values
+VALIGN_BASELINE = 0
+VALIGN_BOTTOM = 1
+VALIGN_MIDDLE = 2
+VALIGN_TOP = 3
+
+_font = None
+_metrics = None
+_paths = {}
+_lock = threading.Lock()
+
+
+def _layout_metrics():
+    global _font, _metrics
+    if _metrics is None:
+        font = QFont()
+        font.setPixelSize(LAYOUT_PIXEL_SIZE)
+        _font, _metrics = font, QFontMetricsF(font)
+    return _font, _metrics
+
+
+def _unit(metrics):
+    # Cap height is the DXF text height
+    return metrics.capHeight() or metrics.ascent()
+
+
+def wrap_text(text, width):
+    """Break lines of a string into lines no wider than width text heights"""
+    _, metrics = _layout_metrics()
+    limit = width * _unit(metrics)
+    lines = []
+    for paragraph in text.split('\n'):
+        line = ''
+        for word in paragraph.split(' '):
+            candidate = f"{line} {word}" if line else word
+            if line and metrics.horizontalAdvance(candidate) > limit:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def text_extent(text):
+    """(widest line width in text heights, line count, descent) of a string"""
+    _, metrics = _layout_metrics()
+    unit = _unit(metrics)
+    lines = text.split('\n')
+    width = max(metrics.horizontalAdvance(line) for line in lines)
+    return width / unit, len(lines), metrics.descent() / unit
+
+
+def text_transform(x, y, height, rotation, width_factor, dx, dy):
+    """Transform from layout units to world coordinates"""
+    transform = QTransform()
+    transform.translate(x, y)
+    transform.rotate(rotation)
+    transform.scale(height * width_factor, height)
+    transform.translate(dx, dy)
+    return transform
+
+
+def text_placement(text, x, y, height, rotation, width_factor, halign, valign, spacing):
+    """
+    (dx, dy, width, depth, bbox) of a string. The offset in text heights
+    moves its alignment point onto x, y. Width and depth below the first
+    baseline are in text heights, bbox is the world box of the placed text.
+    """
+    width, lines, descent = text_extent(text)
+    dx = -halign * width
+    below = (lines - 1) * spacing
+    if valign == VALIGN_BOTTOM:
+        dy = below + descent
+    elif valign == VALIGN_MIDDLE:
+        dy = (below - 1) / 2
+    elif valign == VALIGN_TOP:
+        dy = -1.0
+    else:
+        dy = 0.0
+    depth = below + descent
+    transform = text_transform(x, y, height, rotation, width_factor, dx, dy)
+    rect = transform.mapRect(QRectF(0, -depth, max(width, 1e-6), 1 + depth))
+    return dx, dy, width, depth, (rect.left(), rect.top(), rect.right(), rect.bottom())
+
+
+def text_path(text, halign, spacing):
+    """
+    Cached glyph outlines of a string, Y up with the first baseline at 0.
+    Lines are aligned by halign within the widest one.
+    """
+    key = (text, halign, spacing)
+    path = _paths.get(key)
+    if path is None:
+        font, metrics = _layout_metrics()
+        unit = _unit(metrics)
+        lines = text.split('\n')
+        widths = [metrics.horizontalAdvance(line) for line in lines]
+        width = max(widths)
+        path = QPainterPath()
+        for i, (line, line_width) in enumerate(zip(lines, widths)):
+            path.addText(QPointF((width - line_width) * halign, i * spacing * unit), font, line)
+        # Cap height one, Y axis up like the world
+        path = QTransform.fromScale(1 / unit, -1 / unit).map(path)
+        with _lock:
+            if len(_paths) >= TEXT_CACHE_SIZE:
+                # Drop the older half, dicts keep insertion order
+                for old in list(_paths)[:TEXT_CACHE_SIZE // 2]:
+                    _paths.pop(old, None)
+            _paths[key] = path
+    return path
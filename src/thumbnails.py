@@ -0,0 +1,231 @@
+"""
+Thumbnail module for DXF Viewer application.
+Small previews of DXF files rendered with the canvas renderer and kept in
+an on-disk cache. Cache entries are addressed by a hash of the file
+content; a (path, size, mtime) index avoids hashing unchanged files again.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QStandardPaths, pyqtSignal
+from PyQt6.QtGui import QImage
+from dxf_document import DXFDocument
+from renderer import render_image
+
+# Thumbnail size in pixels
+THUMBNAIL_WIDTH = 256
+THUMBNAIL_HEIGHT = 192
+
+# Default disk budget of the cache in bytes
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# Block size for content hashing
+HASH_BLOCK_SIZE = 1024 * 1024
+
+INDEX_FILE = "index.json"
+
+
+def default_cache_dir():
+    """Per-user cache directory for thumbnails"""
+    base = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".cache", "dxf-viewer")
+    return os.path.join(base, "thumbnails")
+
+
+def file_hash(filepath):
+    """SHA-1 of a file's content"""
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def render_thumbnail(filepath, width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT):
+    """Parse a DXF file and render its whole drawing into a small image"""
+    document = DXFDocument.load(filepath)
+    return render_image(document.scene, width, height)
+
+
+class ThumbnailCache:
+    """On-disk thumbnail store with least recently used eviction"""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = self._load_index()
+        self._index_changed = False
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        self._index_changed = False
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), 'w', encoding='utf-8') as f:
+                json.dump(self._index, f)
+        except OSError as e:
+            print(f"Thumbnail index error: {str(e)}")
+
+    def known_key(self, filepath):
+        """Indexed content hash of a file, None if unknown or the file changed"""
+        stat = os.stat(filepath)
+        with self._lock:
+            entry = self._index.get(os.path.abspath(filepath))
+        if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+        return None
+
+    def key(self, filepath):
+        """Content hash of a file, recomputed only when its size or mtime changed"""
+        digest = self.known_key(filepath)
+        if digest is None:
+            stat = os.stat(filepath)
+            digest = file_hash(filepath)
+            with self._lock:
+                self._index[os.path.abspath(filepath)] = [stat.st_size, stat.st_mtime_ns, digest]
+                self._index_changed = True
+        return digest
+
+    def _image_path(self, key, width, height):
+        return os.path.join(self.directory, f"{key}_{width}x{height}.png")
+
+    def get(self, filepath, width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT):
+        """Cached thumbnail or None"""
+        return self._load(self.key(filepath), width, height)
+
+    def peek(self, filepath, width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT):
+        """Cached thumbnail of an already indexed file, never hashes the file"""
+        key = self.known_key(filepath)
+        return self._load(key, width, height) if key else None
+
+    def _load(self, key, width, height):
+        image_path = self._image_path(key, width, height)
+        image = QImage(image_path)
+        if image.isNull():
+            return None
+        try:
+            # Access time for eviction, atime is unreliable on many systems
+            os.utime(image_path)
+        except OSError:
+            pass
+        return image
+
+    def put(self, filepath, image, width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT):
+        image_path = self._image_path(self.key(filepath), width, height)
+        # Write under a temporary name so readers never see partial files
+        temp_path = f"{image_path}.{threading.get_ident()}.tmp"
+        if image.save(temp_path, "PNG"):
+            os.replace(temp_path, image_path)
+        with self._lock:
+            if self._index_changed:
+                self._save_index()
+        self.evict()
+
+    def thumbnail(self, filepath, width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT):
+        """Cached thumbnail, rendered and stored first if missing"""
+        image = self.get(filepath, width, height)
+        if image is None:
+            image = render_thumbnail(filepath, width, height)
+            self.put(filepath, image, width, height)
+        return image
+
+    def evict(self):
+        """Delete least recently used thumbnails until the cache fits its budget"""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.png'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+            # Forget files that no longer exist
+            self._index = {path: entry for path, entry in self._index.items()
+                           if os.path.exists(path)}
+            self._save_index()
+
+    @property
+    def size(self):
+        """Bytes used by cached thumbnails"""
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory)
+                   if entry.name.endswith('.png'))
+
+
+class _ThumbnailSignals(QObject):
+    done = pyqtSignal(str, QImage, str)  # path, image, error
+
+
+class _ThumbnailJob(QRunnable):
+    def __init__(self, cache, filepath, signals):
+        super().__init__()
+        self.cache = cache
+        self.filepath = filepath
+        self.signals = signals
+
+    def run(self):
+        try:
+            image = self.cache.thumbnail(self.filepath)
+            self.signals.done.emit(self.filepath, image, "")
+        except Exception as e:
+            self.signals.done.emit(self.filepath, QImage(), str(e))
+
+
+class ThumbnailService(QObject):
+    """Serves cached thumbnails immediately and renders missing ones in the background"""
+    thumbnail_ready = pyqtSignal(str, QImage)  # path, image
+    thumbnail_failed = pyqtSignal(str, str)    # path, error
+
+    def __init__(self, cache=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache or ThumbnailCache()
+        self._pending = set()
+        self._signals = _ThumbnailSignals()
+        self._signals.done.connect(self._on_done)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+
+    def request(self, filepath):
+        """Cached thumbnail or None, in which case thumbnail_ready follows later"""
+        try:
+            # Hashing new files is left to the worker threads
+            image = self.cache.peek(filepath)
+        except OSError as e:
+            self.thumbnail_failed.emit(filepath, str(e))
+            return None
+        if image is None and filepath not in self._pending:
+            self._pending.add(filepath)
+            self.pool.start(_ThumbnailJob(self.cache, filepath, self._signals))
+        return image
+
+    def cancel_pending(self):
+        """Drop queued requests that have not started yet"""
+        self.pool.clear()
+        self._pending.clear()
+
+    def _on_done(self, filepath, image, error):
+        self._pending.discard(filepath)
+        if error:
+            self.thumbnail_failed.emit(filepath, error)
+        else:
+            self.thumbnail_ready.emit(filepath, image)
@@ -0,0 +1,255 @@
+"""
+Tile cache module for DXF Viewer application.
+The drawing is rendered into fixed-size image tiles per zoom level. Tiles
+are kept in an LRU cache with a memory budget and missing tiles are
+rendered on a thread pool.
+"""
+
+import math
+from collections import OrderedDict
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QRectF, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter
+from renderer import setup_view
+
+# Tile edge in pixels
+TILE_SIZE = 256
+
+# Zoom levels per doubling of the scale
+LEVELS_PER_OCTAVE = 2
+
+# Default memory budget of the cache in bytes
+DEFAULT_BUDGET = 256 * 1024 * 1024
+
+# Margin in pixels around a tile for pen widths and fixed-size point markers
+MARGIN_PX = 6
+
+# Levels above and below searched for stand-ins while a tile renders
+FALLBACK_LEVELS = 4
+
+
+def zoom_level(scale):
+    """Tile zoom level closest to a world-to-screen scale"""
+    return round(math.log2(scale) * LEVELS_PER_OCTAVE)
+
+
+def level_scale(level):
+    """World-to-pixel scale tiles of a level are rendered at"""
+    return 2.0 ** (level / LEVELS_PER_OCTAVE)
+
+
+def tile_world_rect(key):
+    """World (min_x, min_y, max_x, max_y) covered by a tile key (level, tx, ty)"""
+    level, tx, ty = key
+    size = TILE_SIZE / level_scale(level)
+    return (tx * size, ty * size, (tx + 1) * size, (ty + 1) * size)
+
+
+def tiles_in_rect(level, world_rect):
+    """Tile keys of a level covering a world rect"""
+    size = TILE_SIZE / level_scale(level)
+    tx0 = math.floor(world_rect[0] / size)
+    ty0 = math.floor(world_rect[1] / size)
+    tx1 = math.floor(world_rect[2] / size)
+    ty1 = math.floor(world_rect[3] / size)
+    return [(level, tx, ty) for ty in range(ty1, ty0 - 1, -1) for tx in range(tx0, tx1 + 1)]
+
+
+def _touches(key, world_rect):
+    """Whether a tile, including its margin, overlaps a world rect"""
+    min_x, min_y, max_x, max_y = tile_world_rect(key)
+    margin = MARGIN_PX / level_scale(key[0])
+    return (min_x - margin <= world_rect[2] and max_x + margin >= world_rect[0] and
+            min_y - margin <= world_rect[3] and max_y + margin >= world_rect[1])
+
+
+class TileCache:
+    """LRU cache of tile images bounded by a memory budget"""
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self._tiles = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        image = self._tiles.get(key)
+        if image is not None:
+            self._tiles.move_to_end(key)
+        return image
+
+    def peek(self, key):
+        """Cached image without touching the LRU order"""
+        return self._tiles.get(key)
+
+    def put(self, key, image):
+        old = self._tiles.pop(key, None)
+        if old is not None:
+            self._bytes -= old.sizeInBytes()
+        self._tiles[key] = image
+        self._bytes += image.sizeInBytes()
+        while self._bytes > self.budget and len(self._tiles) > 1:
+            _, evicted = self._tiles.popitem(last=False)
+            self._bytes -= evicted.sizeInBytes()
+
+    def remove(self, keys):
+        for key in keys:
+            image = self._tiles.pop(key, None)
+            if image is not None:
+                self._bytes -= image.sizeInBytes()
+
+    def keys(self):
+        return list(self._tiles)
+
+    def clear(self):
+        self._tiles.clear()
+        self._bytes = 0
+
+    @property
+    def memory(self):
+        return self._bytes
+
+
+class _TileSignals(QObject):
+    ready = pyqtSignal(object, int, QImage)  # key, generation, image
+
+
+class _TileJob(QRunnable):
+    def __init__(self, renderer, key, generation, options):
+        super().__init__()
+        self.renderer = renderer
+        self.key = key
+        self.generation = generation
+        self.options = options
+
+    def run(self):
+        if not self.renderer.is_wanted(self.key, self.generation):
+            self.renderer.discard(self.key)
+            return
+        try:
+            image = render_tile(self.renderer.scene_renderer, self.key, *self.options)
+        except Exception as e:
+            # Geometry changed while rendering, the tile will be requested again
+            print(f"Tile rendering error: {str(e)}")
+            self.renderer.discard(self.key)
+            return
+        self.renderer.signals.ready.emit(self.key, self.generation, image)
+
+
+def render_tile(scene_renderer, key, hidden_layers, fill_mode):
+    """Render one tile into a new transparent image"""
+    level, tx, ty = key
+    scale = level_scale(level)
+    image = QImage(TILE_SIZE, TILE_SIZE, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    # Tile pixel (0, 0) is the top left corner of its world square
+    setup_view(painter, -tx * TILE_SIZE, (ty + 1) * TILE_SIZE, scale)
+    min_x, min_y, max_x, max_y = tile_world_rect(key)
+    margin = MARGIN_PX / scale
+    scene_renderer.draw(painter, (min_x - margin, min_y - margin, max_x + margin, max_y + margin),
+                        scale, hidden_layers, fill_mode)
+    painter.end()
+    return image
+
+
+class TileRenderer(QObject):
+    """Composes cached tiles and renders missing ones in the background"""
+    tile_ready = pyqtSignal(object)  # key
+
+    def __init__(self, scene_renderer, budget=DEFAULT_BUDGET, parent=None):
+        super().__init__(parent)
+        self.scene_renderer = scene_renderer
+        self.cache = TileCache(budget)
+        self.generation = 0
+        self._options = (frozenset(), False)
+        self._pending = set()
+        self._wanted = set()
+        self.signals = _TileSignals()
+        self.signals.ready.connect(self._on_ready)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, min(4, QThreadPool.globalInstance().maxThreadCount() - 1)))
+
+    def set_renderer(self, scene_renderer):
+        """Render another scene, e.g. after a new document was loaded"""
+        self.invalidate()
+        self.scene_renderer = scene_renderer
+
+    def invalidate(self, hidden_layers=(), fill_mode=False):
+        """Drop all tiles, e.g. after geometry or visibility changed"""
+        self.generation += 1
+        self._options = (frozenset(hidden_layers), fill_mode)
+        self.cache.clear()
+        self.pool.clear()
+        self._pending.clear()
+
+    def invalidate_rect(self, world_rect):
+        """Drop the tiles of all levels overlapping a world rect, e.g. after an edit"""
+        # Tiles in flight may show the old geometry
+        self.generation += 1
+        self.pool.clear()
+        self._pending.clear()
+        self.cache.remove([key for key in self.cache.keys() if _touches(key, world_rect)])
+
+    def is_wanted(self, key, generation):
+        return generation == self.generation and key in self._wanted
+
+    def discard(self, key):
+        self._pending.discard(key)
+
+    def compose(self, painter, pan_x, pan_y, scale, world_rect):
+        """Draw the tiles covering world_rect, returns True if all were cached"""
+        level = zoom_level(scale)
+        keys = tiles_in_rect(level, world_rect)
+        self._wanted = set(keys)
+        complete = True
+
+        for key in keys:
+            image = self.cache.get(key)
+            if image is None:
+                complete = False
+                self._request(key)
+                self._draw_fallback(painter, pan_x, pan_y, scale, key)
+            else:
+                painter.drawImage(self.screen_rect(key, pan_x, pan_y, scale), image)
+        return complete
+
+    def _request(self, key):
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        self.pool.start(_TileJob(self, key, self.generation, self._options))
+
+    def _draw_fallback(self, painter, pan_x, pan_y, scale, key):
+        """Stand in for a missing tile with cached tiles of a nearby level"""
+        level = key[0]
+        min_x, min_y, max_x, max_y = tile_world_rect(key)
+        # Stay clear of the edges so neighbouring tiles are not included
+        inset = (max_x - min_x) * 1e-6
+        world = (min_x + inset, min_y + inset, max_x - inset, max_y - inset)
+        nearby = list(range(level - 1, level - 1 - FALLBACK_LEVELS, -1))
+        nearby += list(range(level + 1, level + 1 + FALLBACK_LEVELS))
+
+        for other in nearby:
+            stand_ins = [(k, self.cache.peek(k)) for k in tiles_in_rect(other, world)]
+            if any(image is None for _, image in stand_ins):
+                continue
+            painter.save()
+            painter.setClipRect(self.screen_rect(key, pan_x, pan_y, scale))
+            for stand_in, image in stand_ins:
+                painter.drawImage(self.screen_rect(stand_in, pan_x, pan_y, scale), image)
+            painter.restore()
+            return
+
+    def screen_rect(self, key, pan_x, pan_y, scale):
+        """Widget rectangle a tile is drawn into"""
+        min_x, min_y, max_x, max_y = tile_world_rect(key)
+        return QRectF(pan_x + min_x * scale, pan_y - max_y * scale,
+                      (max_x - min_x) * scale, (max_y - min_y) * scale)
+
+    def _on_ready(self, key, generation, image):
+        self._pending.discard(key)
+        if generation != self.generation:
+            return
+        self.cache.put(key, image)
+        self.tile_ready.emit(key)
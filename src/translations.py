@@ -40,6 +40,22 @@ class Translations:
             ENGLISH: "Exit",
             TURKISH: "Çıkış"
         },
+        "menu_view": {
+            ENGLISH: "View",
+            TURKISH: "Görünüm"
+        },
+        "menu_tiled_rendering": {
+            ENGLISH: "Tiled Rendering",
+            TURKISH: "Döşemeli Çizim"
+        },
+        "menu_streaming_load": {
+            ENGLISH: "Low-Memory Loading (View Only)",
+            TURKISH: "Düşük Bellekle Yükleme (Salt Görüntüleme)"
+        },
+        "menu_geometry_cache": {
+            ENGLISH: "Cache Opened Drawings",
+            TURKISH: "Açılan Çizimleri Önbelleğe Al"
+        },
         "menu_language": {
             ENGLISH: "Language",
             TURKISH: "Dil"
@@ -78,6 +94,14 @@ class Translations:
             ENGLISH: "Layers",
             TURKISH: "Katmanlar"
         },
+        "entities": {
+            ENGLISH: "Entities",
+            TURKISH: "Nesneler"
+        },
+        "filter_layers": {
+            ENGLISH: "Filter layers...",
+            TURKISH: "Katmanları filtrele..."
+        },
         "prev": {
             ENGLISH: "Prev",
             TURKISH: "Önceki"
@@ -126,6 +150,18 @@ class Translations:
             ENGLISH: "DXF Files (*.dxf)",
             TURKISH: "DXF Dosyaları (*.dxf)"
         },
+        "preview": {
+            ENGLISH: "Preview",
+            TURKISH: "Önizleme"
+        },
+        "preview_loading": {
+            ENGLISH: "Generating preview...",
+            TURKISH: "Önizleme oluşturuluyor..."
+        },
+        "preview_unavailable": {
+            ENGLISH: "No preview available",
+            TURKISH: "Önizleme yok"
+        },
         
         # Info display
         "file": {
@@ -140,6 +176,14 @@ class Translations:
             ENGLISH: "Geometry Types",
             TURKISH: "Geometri Türleri"
         },
+        "skipped_types": {
+            ENGLISH: "Not Drawn",
+            TURKISH: "Çizilmeyenler"
+        },
+        "view_only": {
+            ENGLISH: "View only (low-memory loading)",
+            TURKISH: "Salt görüntüleme (düşük bellekle yükleme)"
+        },
         
         # Canvas context menu
         "edit_properties": {
@@ -222,6 +266,34 @@ class Translations:
             ENGLISH: "DXF loading error",
             TURKISH: "DXF yükleme hatası"
         },
+        "loading_read": {
+            ENGLISH: "Reading file",
+            TURKISH: "Dosya okunuyor"
+        },
+        "loading_count": {
+            ENGLISH: "Counting entities",
+            TURKISH: "Nesneler sayılıyor"
+        },
+        "loading_compile": {
+            ENGLISH: "Compiling geometry",
+            TURKISH: "Geometri derleniyor"
+        },
+        "loading_bounds": {
+            ENGLISH: "Calculating bounds",
+            TURKISH: "Sınırlar hesaplanıyor"
+        },
+        "loading_cancelled": {
+            ENGLISH: "Loading cancelled",
+            TURKISH: "Yükleme iptal edildi"
+        },
+        "cancel": {
+            ENGLISH: "Cancel",
+            TURKISH: "İptal"
+        },
+        "tooltip_cancel_loading": {
+            ENGLISH: "Cancel loading the DXF file",
+            TURKISH: "DXF dosyasının yüklenmesini iptal et"
+        },
         "color_conversion_error": {
             ENGLISH: "Color conversion error",
             TURKISH: "Renk dönüşüm hatası"
@@ -1,11 +1,12 @@
 from PyQt6.QtWidgets import (QMainWindow, QHBoxLayout, QWidget, QStatusBar, 
-                           QMenuBar, QMenu, QMessageBox)
+                           QMenuBar, QMenu, QMessageBox, QPushButton)
 from PyQt6.QtGui import QPalette, QColor, QIcon, QAction
 from PyQt6.QtCore import Qt, pyqtSignal
 from widgets.file_panel import FilePanel
 from widgets.canvas import DXFCanvas
 from translations import Translations
 from settings import Settings
+from geometry_cache import GeometryCache
 
 class DXFViewer(QMainWindow):
     # Signal to notify language change
@@ -61,19 +62,19 @@ class DXFViewer(QMainWindow):
             QPushButton:disabled {
                 background-color: #bdc3c7;
             }
-            QTreeWidget {
+            QTreeView {
                 border: 1px solid #bdc3c7;
                 border-radius: 4px;
                 padding: 5px;
             }
-            QTreeWidget::item {
+            QTreeView::item {
                 padding: 5px;
                 border-radius: 3px;
             }
-            QTreeWidget::item:hover {
+            QTreeView::item:hover {
                 background-color: #ecf0f1;
             }
-            QTreeWidget::item:selected {
+            QTreeView::item:selected {
                 background-color: #3498db;
                 color: white;
             }
@@ -158,8 +159,18 @@ class DXFViewer(QMainWindow):
         self.setStatusBar(self.status_bar)
         self._update_status_bar()
         
+        # Cancel button shown while a file is loading
+        self.cancel_load_btn = QPushButton(self._tr("cancel"))
+        self.cancel_load_btn.setToolTip(self._tr("tooltip_cancel_loading"))
+        self.cancel_load_btn.setFixedHeight(24)
+        self.cancel_load_btn.hide()
+        self.status_bar.addPermanentWidget(self.cancel_load_btn)
+        
         # Canvas reference to FilePanel
         self.file_panel.canvas = self.canvas
+        self.canvas.set_tiled_mode(self.settings.get("tiled_rendering", False))
+        self.file_panel.loader.streaming = self.settings.get("streaming_load", False)
+        self.file_panel.loader.cache = self._geometry_cache()
     
     def _create_menu(self):
         # Create menu bar
@@ -182,6 +193,30 @@ class DXFViewer(QMainWindow):
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
         
+        # View menu
+        view_menu = menu_bar.addMenu(self._tr("menu_view"))
+        
+        # Tiled rendering action
+        tiled_action = QAction(self._tr("menu_tiled_rendering"), self)
+        tiled_action.setCheckable(True)
+        tiled_action.setChecked(self.canvas.tiled_mode)
+        tiled_action.toggled.connect(self._set_tiled_rendering)
+        view_menu.addAction(tiled_action)
+        
+        # Streaming (low-memory, view only) loading action
+        streaming_action = QAction(self._tr("menu_streaming_load"), self)
+        streaming_action.setCheckable(True)
+        streaming_action.setChecked(self.file_panel.loader.streaming)
+        streaming_action.toggled.connect(self._set_streaming_load)
+        view_menu.addAction(streaming_action)
+        
+        # Geometry cache action
+        cache_action = QAction(self._tr("menu_geometry_cache"), self)
+        cache_action.setCheckable(True)
+        cache_action.setChecked(self.settings.get("geometry_cache", True))
+        cache_action.toggled.connect(self._set_geometry_cache)
+        view_menu.addAction(cache_action)
+        
         # Language menu
         language_menu = menu_bar.addMenu(self._tr("menu_language"))
         
@@ -219,6 +254,18 @@ class DXFViewer(QMainWindow):
         self.file_panel.layer_visibility_changed.connect(
             self.canvas.set_layer_visibility
         )
+        self.file_panel.visible_layers_changed.connect(self.canvas.set_visible_layers)
+        self.file_panel.layer_order_changed.connect(self.canvas.set_layer_order)
+        self.canvas.entities_changed.connect(self.file_panel.update_layer_counts)
+        
+        # Background loading progress
+        loader = self.file_panel.loader
+        loader.started.connect(self._on_load_started)
+        loader.progress.connect(self._on_load_progress)
+        loader.loaded.connect(self._on_load_finished)
+        loader.failed.connect(self._on_load_finished)
+        loader.cancelled.connect(self._on_load_cancelled)
+        self.cancel_load_btn.clicked.connect(self.file_panel.cancel_loading)
         
         # Connect language change signal
         self.language_changed.connect(self.file_panel.update_language)
@@ -236,6 +283,29 @@ class DXFViewer(QMainWindow):
         """Update status bar with current language"""
         self.status_bar.showMessage(self._tr("ready_status"))
     
+    def _on_load_started(self, filepath):
+        self.cancel_load_btn.show()
+        self._on_load_progress("read", -1)
+    
+    def _on_load_progress(self, phase, percent):
+        """Show the current load phase in the status bar"""
+        message = self._tr(f"loading_{phase}")
+        if percent >= 0:
+            message += f"... {percent}%"
+        else:
+            message += "..."
+        self.status_bar.showMessage(message)
+    
+    def _on_load_finished(self, *args):
+        if not self.file_panel.loader.is_loading():
+            self.cancel_load_btn.hide()
+            self._update_status_bar()
+    
+    def _on_load_cancelled(self):
+        if not self.file_panel.loader.is_loading():
+            self.cancel_load_btn.hide()
+            self.status_bar.showMessage(self._tr("loading_cancelled"))
+    
     def _change_language(self, language):
         """Change application language"""
         if language != self.current_language:
@@ -245,6 +315,8 @@ class DXFViewer(QMainWindow):
             # Update UI with new language
             self._update_window_title()
             self._update_status_bar()
+            self.cancel_load_btn.setText(self._tr("cancel"))
+            self.cancel_load_btn.setToolTip(self._tr("tooltip_cancel_loading"))
             
             # Update menu
             self._update_menu_language()
@@ -258,6 +330,28 @@ class DXFViewer(QMainWindow):
         self.menuBar().clear()
         self._create_menu()
     
+    def _set_tiled_rendering(self, enabled):
+        """Toggle tiled rendering and remember the choice"""
+        self.canvas.set_tiled_mode(enabled)
+        self.settings.set("tiled_rendering", enabled)
+    
+    def _set_streaming_load(self, enabled):
+        """Toggle streaming loading for files opened from now on"""
+        self.file_panel.loader.streaming = enabled
+        self.settings.set("streaming_load", enabled)
+    
+    def _geometry_cache(self):
+        """Geometry cache with the budget from the settings, None if turned off"""
+        max_bytes = int(self.settings.get("geometry_cache_mb", 2048)) * 1024 * 1024
+        if not self.settings.get("geometry_cache", True) or max_bytes <= 0:
+            return None
+        return GeometryCache(max_bytes=max_bytes)
+    
+    def _set_geometry_cache(self, enabled):
+        """Toggle the geometry cache for files opened from now on"""
+        self.settings.set("geometry_cache", enabled)
+        self.file_panel.loader.cache = self._geometry_cache()
+    
     def _show_about_dialog(self):
         """Show about dialog"""
         QMessageBox.about(
@@ -1,13 +1,32 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QRubberBand, QApplication,
                            QMenu, QDialog, QFormLayout, QLineEdit, QDialogButtonBox,
-                           QLabel, QColorDialog)
-from PyQt6.QtCore import Qt, QPointF, QRectF, QPoint, QRect
-from PyQt6.QtGui import QPainter, QPen, QColor, QBrush, QPainterPath
-import ezdxf
+                           QLabel, QColorDialog, QPushButton)
+from PyQt6.QtCore import Qt, QPointF, QPoint, QRect, QTimer, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QImage, QRegion
 from ezdxf.math import Vec2
 import math
 import numpy as np
 from translations import Translations
+from renderer import (SceneRenderer, HIGHLIGHT_COLOR, HIGHLIGHT_WIDTH, BACKGROUND_COLOR,
+                      setup_view, fit_view)
+from tile_cache import TileRenderer
+from layer_cache import LayerImages, MAX_COMPOSED_LAYERS
+from selection import select_in_rect, pick
+
+# Changes touching more entities than this repaint their combined bounds
+MAX_DIRTY_RECTS = 256
+
+# Margin in pixels around changed entities for pen widths and point markers
+DIRTY_MARGIN_PX = 6
+
+# Quiet time in milliseconds before adjacent layers are rendered ahead
+PREFETCH_DELAY_MS = 150
+
+# Distance in pixels within which a click or hover picks an entity
+PICK_TOLERANCE_PX = 5
+
+# Opacity of the hover highlight relative to the selection highlight
+HOVER_OPACITY = 0.5
 
 class EntityPropertiesDialog(QDialog):
     def __init__(self, entity, parent=None, language=Translations.DEFAULT_LANGUAGE):
@@ -126,9 +145,9 @@ class EntityPropertiesDialog(QDialog):
             layout.addRow(f"{self._tr('radius')}:", self.radius)
             
             if entity_type == 'ARC':
-                # Start and end angles
-                self.start_angle = QLineEdit(str(math.degrees(self.entity.dxf.start_angle)))
-                self.end_angle = QLineEdit(str(math.degrees(self.entity.dxf.end_angle)))
+                # Start and end angles, in degrees like ezdxf stores them
+                self.start_angle = QLineEdit(str(self.entity.dxf.start_angle))
+                self.end_angle = QLineEdit(str(self.entity.dxf.end_angle))
                 layout.addRow(f"{self._tr('start_angle')}:", self.start_angle)
                 layout.addRow(f"{self._tr('end_angle')}:", self.end_angle)
     
@@ -146,6 +165,8 @@ class EntityPropertiesDialog(QDialog):
         self.color_button.setText(self.current_color.name())
 
 class DXFCanvas(QWidget):
+    entities_changed = pyqtSignal()  # entities were edited or deleted
+    
     def __init__(self, language=Translations.DEFAULT_LANGUAGE):
         super().__init__()
         self.current_language = language
@@ -153,17 +174,41 @@ class DXFCanvas(QWidget):
         self.scale = 1.0
         self.pan_x = 0
         self.pan_y = 0
-        self.doc = None
-        self.entities = []
+        self.document = None
+        self.scene = None
+        self.renderer = None
         self.bounds = None
         self.hidden_layers = set()  # Track hidden layers
         
-        # Variables for selection
-        self.selected_entities = set()
+        # Tiled rendering caches the drawing as images per zoom level
+        self.tiled_mode = False
+        self.tiles = None
+        
+        # Drawing without highlights for the current view, edits only
+        # render their dirty rects again
+        self._base = None
+        self._base_view = None
+        self._base_dirty = []
+        
+        # Single layer images for flipping through layers in panel order
+        self.layer_images = None
+        self.layer_order = []
+        self._layer_counts = None  # Layer name -> entities, until the drawing changes
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.setInterval(PREFETCH_DELAY_MS)
+        self._prefetch_timer.timeout.connect(self._prefetch_layers)
+        
+        # Variables for selection (indices into the scene)
+        self.selected_indices = set()
         self.selection_mode = False
         self.rubber_band = None
         self.selection_start = None
-        self.highlight_color = QColor(52, 152, 219, 100)  # Modern blue color
+        self.highlight_color = HIGHLIGHT_COLOR
+        
+        # Entity under the mouse and where the last button press happened
+        self.hover_index = None
+        self.press_pos = None
         
         # Variable for fill mode
         self.fill_mode = False
@@ -197,482 +242,260 @@ class DXFCanvas(QWidget):
         self.setLayout(layout)
         self.setMouseTracking(True)  # Track mouse movements
         
-    def load_dxf(self, filepath):
+    def load_dxf(self, document):
+        """Show an already parsed DXFDocument"""
         try:
-            self.doc = ezdxf.readfile(filepath)
-            self.entities = list(self.doc.modelspace())
+            self.document = document
+            self.scene = document.scene
+            self.renderer = SceneRenderer(document.scene)
+            self.bounds = document.bounds
+            self.selected_indices.clear()
+            self.hover_index = None
+            self._layer_counts = None
             
-            # Print entity types and colors for debugging
-            for entity in self.entities:
-                color_info = ""
-                if hasattr(entity.dxf, 'color'):
-                    color_info = f"ACI: {entity.dxf.color}"
-                if hasattr(entity, 'rgb') and entity.rgb:
-                    color_info += f", RGB: {entity.rgb}"
-                
-                print(f"Entity: {entity.dxftype()}, "
-                      f"Layer: {entity.dxf.layer}, "
-                      f"Color: {color_info}")
+            # Tile and layer caches are reused, images of the previous document are dropped
+            if self.tiles is None:
+                self.tiles = TileRenderer(self.renderer, parent=self)
+                self.tiles.tile_ready.connect(self._on_tile_ready)
+                self.layer_images = LayerImages(self.renderer, parent=self)
+            else:
+                self.tiles.set_renderer(self.renderer)
+                self.layer_images.set_renderer(self.renderer)
+            self._invalidate_tiles()
             
-            self._calculate_bounds()
             self._center_view()
             self.update()
         except Exception as e:
             print(f"{self._tr('dxf_loading_error')}: {str(e)}")
     
-    def _calculate_bounds(self):
-        if not self.entities:
-            return
-        
-        min_x = min_y = float('inf')
-        max_x = max_y = float('-inf')
-        
-        for entity in self.entities:
-            points = []
-            entity_type = entity.dxftype()
-            
-            if entity_type == 'LINE':
-                points = [entity.dxf.start, entity.dxf.end]
-            elif entity_type == 'CIRCLE':
-                center = entity.dxf.center
-                radius = entity.dxf.radius
-                points = [
-                    (center[0] - radius, center[1] - radius),
-                    (center[0] + radius, center[1] + radius)
-                ]
-            elif entity_type == 'ARC':
-                center = entity.dxf.center
-                radius = entity.dxf.radius
-                points = [
-                    (center[0] - radius, center[1] - radius),
-                    (center[0] + radius, center[1] + radius)
-                ]
-            elif entity_type == 'LWPOLYLINE':
-                points = list(entity.get_points('xy'))
-            elif entity_type == 'POLYLINE':
-                points = [vertex.dxf.location for vertex in entity.vertices]
-            elif entity_type == 'SPLINE':
-                try:
-                    # Spline points
-                    spline_points = entity.construction_tool().get_points(100)
-                    points = [(p.x, p.y) for p in spline_points]
-                    
-                    # Also add control points
-                    points.extend(entity.control_points)
-                    
-                    # If fit points exist, add them too
-                    if hasattr(entity, 'fit_points') and entity.fit_points:
-                        points.extend(entity.fit_points)
-                        
-                except Exception as e:
-                    print(f"Spline bounds calculation error: {str(e)}")
-                    points = []
-            elif entity_type == 'ELLIPSE':
-                center = entity.dxf.center
-                major_axis = entity.dxf.major_axis
-                ratio = entity.dxf.ratio
-                major_radius = math.sqrt(major_axis[0]**2 + major_axis[1]**2)
-                minor_radius = major_radius * ratio
-                points = [
-                    (center[0] - major_radius, center[1] - minor_radius),
-                    (center[0] + major_radius, center[1] + minor_radius)
-                ]
-            elif entity_type == 'TEXT':
-                pos = entity.dxf.insert
-                height = entity.dxf.height
-                points = [pos, (pos[0] + len(entity.dxf.text) * height, pos[1] + height)]
-            elif entity_type == 'POINT':
-                pos = entity.dxf.location
-                points = [pos]
-            
-            for point in points:
-                min_x = min(min_x, point[0])
-                max_x = max(max_x, point[0])
-                min_y = min(min_y, point[1])
-                max_y = max(max_y, point[1])
-        
-        self.bounds = (min_x, min_y, max_x, max_y)
+    @property
+    def doc(self):
+        # Documents restored from the geometry cache parse the DXF on first access
+        return self.document.doc if self.document else None
     
     def _center_view(self):
         if not self.bounds:
             return
             
-        width = self.width()
-        height = self.height()
-        
-        # Calculate drawing bounds
-        dx = self.bounds[2] - self.bounds[0]
-        dy = self.bounds[3] - self.bounds[1]
-        
-        # Add padding (15% of drawing area)
-        padding_factor = 0.15
-        padding_x = dx * padding_factor
-        padding_y = dy * padding_factor
-        
-        # Padded total dimensions
-        total_width = dx + 2 * padding_x
-        total_height = dy + 2 * padding_y
-        
-        # Calculate scaling factor
-        scale_x = width / total_width if total_width != 0 else 1
-        scale_y = height / total_height if total_height != 0 else 1
-        
-        # Use smallest scale (best fit)
-        self.scale = max(min(scale_x, scale_y), 0.0001)
-        
-        # Calculate center points
-        world_center_x = self.bounds[0] + dx/2
-        world_center_y = self.bounds[1] + dy/2
-        
-        # Viewport center
-        viewport_center_x = width/2
-        viewport_center_y = height/2
-        
-        # Calculate pan values
-        self.pan_x = viewport_center_x - (world_center_x * self.scale)
-        self.pan_y = viewport_center_y + (world_center_y * self.scale)  # Y axis is inverted
+        self.scale, self.pan_x, self.pan_y = fit_view(self.bounds, self.width(), self.height())
         
         # Save minimum zoom level
         self.min_scale = self.scale * 0.5
     
     def paintEvent(self, event):
-        if not self.doc:
+        if not self.scene:
             return
             
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        # Set coordinate system
-        painter.translate(self.pan_x, self.pan_y)
-        painter.scale(self.scale, -self.scale)
-        
-        # Draw entities
-        for entity in self.entities:
-            self._draw_entity(painter, entity)
-    
-    def _draw_entity(self, painter, entity):
-        if entity.dxf.layer in self.hidden_layers:
-            return
-        
-        entity_type = entity.dxftype()
+        world_rect = self._visible_world_rect(event.rect())
         
-        # Color settings
-        color = self._get_entity_color(entity)
-        pen = QPen(color)
-        pen.setWidth(0)
-        if hasattr(entity.dxf, 'linetype'):
-            self._apply_linetype(pen, entity.dxf.linetype)
-        
-        # Highlight selected entities
-        if entity in self.selected_entities:
-            pen = QPen(self.highlight_color)
-            pen.setWidth(3)
-        
-        painter.setPen(pen)
-        
-        # Fill settings
-        if self.fill_mode and entity.dxf.layer != "0":
-            brush_color = QColor(color)
-            brush_color.setAlpha(100)  # Semi-transparent fill
-            painter.setBrush(QBrush(brush_color))
+        if self.tiled_mode:
+            # Compose cached tiles, missing ones render in the background
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            self.tiles.compose(painter, self.pan_x, self.pan_y, self.scale, world_rect)
         else:
-            painter.setBrush(Qt.BrushStyle.NoBrush)
-        
-        # Draw based on entity type
-        if entity_type == 'LINE':
-            self._draw_line(painter, entity)
-        elif entity_type == 'CIRCLE':
-            self._draw_circle_with_fill(painter, entity)
-        elif entity_type == 'ARC':
-            self._draw_arc(painter, entity)
-        elif entity_type == 'LWPOLYLINE':
-            self._draw_polyline_with_fill(painter, entity)
-        elif entity_type == 'POLYLINE':
-            self._draw_polyline_with_fill(painter, entity)
-        elif entity_type == 'SPLINE':
-            self._draw_spline_with_fill(painter, entity)
-        elif entity_type == 'ELLIPSE':
-            self._draw_ellipse(painter, entity)
-        elif entity_type == 'TEXT':
-            self._draw_text(painter, entity)
-        elif entity_type == 'POINT':
-            self._draw_point(painter, entity)
-    
-    def _draw_polyline_with_fill(self, painter, entity):
-        try:
-            # Get points based on entity type
-            if entity.dxftype() == 'LWPOLYLINE':
-                points = list(entity.get_points('xy'))
-                # Check for closed condition for LWPOLYLINE
-                is_closed = entity.dxf.flags & 1
-            else:  # POLYLINE
-                points = [(vertex.dxf.location[0], vertex.dxf.location[1]) 
-                         for vertex in entity.vertices]
-                # Check for closed condition for POLYLINE
-                is_closed = entity.is_closed
-            
-            if len(points) < 2:
-                return
-            
-            # Create drawing path
-            path = QPainterPath()
-            path.moveTo(points[0][0], points[0][1])
-            
-            for point in points[1:]:
-                path.lineTo(point[0], point[1])
-            
-            # Close path for closed polyline
-            if is_closed:
-                path.closeSubpath()
-            
-            # Draw
-            painter.drawPath(path)
-            
-        except Exception as e:
-            print(f"Polyline drawing error ({entity.dxftype()}): {str(e)}")
-    
-    def _draw_circle_with_fill(self, painter, entity):
-        center = entity.dxf.center
-        radius = entity.dxf.radius
-        painter.drawEllipse(
-            QPointF(center[0], center[1]),
-            radius, radius
-        )
-    
-    def _draw_spline_with_fill(self, painter, entity):
-        try:
-            spline_points = entity.construction_tool().get_points(100)
-            points = [(p.x, p.y) for p in spline_points]
-            
-            if len(points) < 2:
-                return
-            
-            path = QPainterPath()
-            path.moveTo(points[0][0], points[0][1])
-            
-            for point in points[1:]:
-                path.lineTo(point[0], point[1])
-            
-            # Close path if spline is closed
-            if entity.closed:
-                path.closeSubpath()
-            
-            painter.drawPath(path)
-            
-        except Exception as e:
-            print(f"Spline drawing error: {str(e)}")
-    
-    def _draw_regular_entity(self, painter, entity):
-        """Draw normal entities without fill"""
-        entity_type = entity.dxftype()
+            # Only the event region of the cached drawing is copied
+            self._render_base()
+            painter.drawImage(QPoint(0, 0), self._base)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        setup_view(painter, self.pan_x, self.pan_y, self.scale)
+        
+        # Selection is drawn on top of the drawing
+        self.renderer.draw_highlight(painter, self._selected_in(world_rect), self.scale,
+                                     self.hidden_layers)
+        
+        # Hovered entity in a lighter highlight, unless it is selected anyway
+        if self.hover_index is not None and self.hover_index not in self.selected_indices:
+            painter.setOpacity(HOVER_OPACITY)
+            self.renderer.draw_highlight(painter, [self.hover_index], self.scale,
+                                         self.hidden_layers)
+    
+    def _render_base(self):
+        """Bring the cached drawing up to date with the view and pending edits"""
+        ratio = self.devicePixelRatioF()
+        view = (self.pan_x, self.pan_y, self.scale, self.width(), self.height(), ratio)
+        if self._base is None or self._base_view != view:
+            self._base = QImage(round(self.width() * ratio), round(self.height() * ratio),
+                                QImage.Format.Format_ARGB32_Premultiplied)
+            self._base.setDevicePixelRatio(ratio)
+            self._base_view = view
+            self._base_dirty = [] if self._compose_layers(view) else [self.rect()]
+        if not self._base_dirty:
+            return
         
-        if entity_type == 'LINE':
-            self._draw_line(painter, entity)
-        elif entity_type == 'ARC':
-            self._draw_arc(painter, entity)
-        elif entity_type == 'ELLIPSE':
-            self._draw_ellipse(painter, entity)
-        elif entity_type == 'TEXT':
-            self._draw_text(painter, entity)
-        elif entity_type == 'POINT':
-            self._draw_point(painter, entity)
-    
-    def _draw_line(self, painter, entity):
-        start = entity.dxf.start
-        end = entity.dxf.end
-        painter.drawLine(
-            QPointF(start[0], start[1]),
-            QPointF(end[0], end[1])
+        painter = QPainter(self._base)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for rect in self._base_dirty:
+            painter.save()
+            painter.setClipRect(rect)
+            painter.fillRect(rect, BACKGROUND_COLOR)
+            setup_view(painter, self.pan_x, self.pan_y, self.scale)
+            self.renderer.draw(painter, self._visible_world_rect(rect), self.scale,
+                               self.hidden_layers, self.fill_mode)
+            painter.restore()
+        painter.end()
+        self._base_dirty = []
+    
+    def _shown_layers(self):
+        """Visible layers with entities in panel order, None if there are too many"""
+        if not self.hidden_layers:
+            return None
+        if self._layer_counts is None:
+            self._layer_counts = self.scene.layer_counts()
+        counts = self._layer_counts
+        shown = [name for name, count in counts.items()
+                 if count and name not in self.hidden_layers]
+        if len(shown) > MAX_COMPOSED_LAYERS:
+            return None
+        position = {name: i for i, name in enumerate(self.layer_order)}
+        return sorted(shown, key=lambda name: position.get(name, -1))
+    
+    def _compose_layers(self, view):
+        """
+        Build the base image from single layer images if few layers are shown
+        and all of them are rendered for this view. While the view changes
+        the drawing is rendered directly, layer images follow once it is still.
+        """
+        layers = self._shown_layers()
+        if layers is None:
+            return False
+        self.layer_images.set_view(view, self.fill_mode)
+        self._prefetch_timer.start()
+        images = [self.layer_images.image(layer) for layer in layers]
+        if None in images:
+            return False
+        painter = QPainter(self._base)
+        painter.fillRect(self.rect(), BACKGROUND_COLOR)
+        for image in images:
+            painter.drawImage(QPoint(0, 0), image)
+        painter.end()
+        return True
+    
+    def _prefetch_layers(self):
+        """Render the shown layers and the ones next to them in panel order ahead"""
+        layers = self._shown_layers()
+        if not layers or self.tiled_mode:
+            return
+        position = {name: i for i, name in enumerate(self.layer_order)}
+        adjacent = []
+        for layer in layers:
+            i = position.get(layer)
+            if i is None:
+                continue
+            adjacent.extend(self.layer_order[j] for j in (i + 1, i - 1)
+                            if 0 <= j < len(self.layer_order))
+        self.layer_images.prefetch(layers + [name for name in adjacent if name not in layers])
+    
+    def set_layer_order(self, layers):
+        """Layer names in the panel's navigation order"""
+        self.layer_order = list(layers)
+    
+    def _selected_in(self, world_rect):
+        """Selected indices whose highlight reaches into a world rect"""
+        if not self.selected_indices:
+            return []
+        indices = np.fromiter(self.selected_indices, dtype=np.int64)
+        indices = indices[self.scene.kinds[indices] >= 0]
+        boxes = self.scene.store.bboxes[indices]
+        # The highlight pen width is in world units
+        margin = HIGHLIGHT_WIDTH
+        keep = ((boxes[:, 0] - margin <= world_rect[2]) & (boxes[:, 2] + margin >= world_rect[0]) &
+                (boxes[:, 1] - margin <= world_rect[3]) & (boxes[:, 3] + margin >= world_rect[1]))
+        return indices[keep]
+    
+    def _screen_rects(self, boxes):
+        """Widget rectangles covering world boxes and their highlight"""
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        if len(boxes) > MAX_DIRTY_RECTS:
+            boxes = np.array([[*boxes[:, :2].min(axis=0), *boxes[:, 2:].max(axis=0)]])
+        margin = DIRTY_MARGIN_PX + HIGHLIGHT_WIDTH * self.scale
+        left = self.pan_x + boxes[:, 0] * self.scale - margin
+        top = self.pan_y - boxes[:, 3] * self.scale - margin
+        right = self.pan_x + boxes[:, 2] * self.scale + margin
+        bottom = self.pan_y - boxes[:, 1] * self.scale + margin
+        # Clamped to the widget, far away boxes would overflow QRect
+        left, right = (np.clip(v, -1, self.width() + 1) for v in (left, right))
+        top, bottom = (np.clip(v, -1, self.height() + 1) for v in (top, bottom))
+        rects = []
+        for x0, y0, x1, y1 in zip(left.tolist(), top.tolist(), right.tolist(), bottom.tolist()):
+            if x1 > x0 and y1 > y0:
+                rects.append(QRect(math.floor(x0), math.floor(y0),
+                                   math.ceil(x1 - x0) + 1, math.ceil(y1 - y0) + 1))
+        return rects
+    
+    def _repaint_rects(self, rects):
+        region = QRegion()
+        for rect in rects:
+            region += rect
+        if not region.isEmpty():
+            self.update(region)
+    
+    def _selection_changed(self, previous):
+        """Repaint only where entities were selected or deselected"""
+        changed = previous ^ self.selected_indices
+        if changed:
+            self._repaint_rects(self._screen_rects(self.scene.bboxes(changed)))
+    
+    def _set_hover(self, index):
+        """Move the hover highlight, repainting the old and new entity only"""
+        if index == self.hover_index:
+            return
+        changed = {i for i in (self.hover_index, index) if i is not None}
+        self.hover_index = index
+        self._repaint_rects(self._screen_rects(self.scene.bboxes(changed)))
+    
+    def _pick(self, pos):
+        """Index of the visible entity nearest to a widget position, None if none is close"""
+        wx, wy = self._screen_to_world(pos)
+        return pick(self.scene, (wx, -wy), PICK_TOLERANCE_PX / self.scale, self.hidden_layers)
+    
+    def _drawing_changed(self, boxes):
+        """Render the drawing again where entities were edited or deleted"""
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        if not len(boxes):
+            return
+        self._layer_counts = None
+        if self.layer_images:
+            self.layer_images.invalidate()
+        if self.tiles:
+            if len(boxes) > MAX_DIRTY_RECTS:
+                boxes = np.array([[*boxes[:, :2].min(axis=0), *boxes[:, 2:].max(axis=0)]])
+            for box in boxes.tolist():
+                self.tiles.invalidate_rect(box)
+        rects = self._screen_rects(boxes)
+        self._base_dirty.extend(rects)
+        self._repaint_rects(rects)
+        self.entities_changed.emit()
+    
+    def _visible_world_rect(self, rect=None):
+        """World (min_x, min_y, max_x, max_y) shown in a widget rectangle"""
+        if rect is None:
+            rect = self.rect()
+        # Margin for pen widths and fixed-size point markers
+        margin = 6 / self.scale
+        return (
+            (rect.left() - self.pan_x) / self.scale - margin,
+            (self.pan_y - rect.bottom() - 1) / self.scale - margin,
+            (rect.right() + 1 - self.pan_x) / self.scale + margin,
+            (self.pan_y - rect.top()) / self.scale + margin
         )
     
-    def _draw_arc(self, painter, entity):
-        center = entity.dxf.center
-        radius = entity.dxf.radius
-        start_angle = math.degrees(entity.dxf.start_angle)
-        end_angle = math.degrees(entity.dxf.end_angle)
-        
-        rect = QRectF(
-            center[0] - radius,
-            center[1] - radius,
-            radius * 2,
-            radius * 2
-        )
-        painter.drawArc(
-            rect,
-            int(-start_angle * 16),
-            int(-(end_angle - start_angle) * 16)
-        )
+    def set_tiled_mode(self, enabled):
+        """Switch between tile-cached and direct rendering"""
+        self.tiled_mode = enabled
+        self._invalidate_tiles()
+        self.update()
     
-    def _draw_ellipse(self, painter, entity):
-        center = entity.dxf.center
-        major_axis = entity.dxf.major_axis
-        ratio = entity.dxf.ratio
-        
-        # Calculate ellipse parameters
-        major_radius = math.sqrt(major_axis[0]**2 + major_axis[1]**2)
-        minor_radius = major_radius * ratio
-        
-        # Calculate rotation angle
-        rotation = math.degrees(math.atan2(major_axis[1], major_axis[0]))
-        
-        painter.save()
-        painter.translate(center[0], center[1])
-        painter.rotate(rotation)
-        painter.drawEllipse(QPointF(0, 0), major_radius, minor_radius)
-        painter.restore()
-    
-    def _draw_text(self, painter, entity):
-        pos = entity.dxf.insert
-        text = entity.dxf.text
-        height = entity.dxf.height
-        
-        # Font settings
-        font = painter.font()
-        font.setPointSizeF(height * self.scale)
-        painter.setFont(font)
-        
-        # Text alignment
-        flags = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignBottom
-        
-        painter.save()
-        painter.translate(pos[0], pos[1])
-        if hasattr(entity.dxf, 'rotation'):
-            painter.rotate(-entity.dxf.rotation)
-        painter.scale(1, -1)  # Correct text for inverted Y axis
-        painter.drawText(QPointF(0, 0), text)
-        painter.restore()
-    
-    def _draw_point(self, painter, entity):
-        pos = entity.dxf.location
-        size = 5 / self.scale  # Fixed screen size
-        
-        painter.save()
-        painter.setPen(Qt.PenStyle.NoPen)
-        if entity in self.selected_entities:
-            painter.setBrush(self.highlight_color)
-        painter.drawEllipse(QPointF(pos[0], pos[1]), size, size)
-        painter.restore()
-    
-    def _get_entity_color(self, entity):
-        try:
-            # First check entity's own color
-            if hasattr(entity.dxf, 'color') and entity.dxf.color is not None:
-                color_index = entity.dxf.color
-                
-                # If layer (256) or by block (0), use layer color
-                if color_index == 256 or color_index == 0:  
-                    layer = self.doc.layers.get(entity.dxf.layer)
-                    if layer and hasattr(layer.dxf, 'color'):
-                        color_index = layer.dxf.color
-                        # If layer has RGB value, use it
-                        if layer.rgb is not None:
-                            color = QColor(*layer.rgb)
-                            # Convert white to black
-                            if color.red() == 255 and color.green() == 255 and color.blue() == 255:
-                                return QColor(0, 0, 0)
-                            return color
-                
-                # If RGB value exists, use it
-                if hasattr(entity, 'rgb') and entity.rgb is not None:
-                    color = QColor(*entity.rgb)
-                    # Convert white to black
-                    if color.red() == 255 and color.green() == 255 and color.blue() == 255:
-                        return QColor(0, 0, 0)
-                    return color
-                # Convert ACI color code to RGB
-                elif color_index >= 0:
-                    color = self._aci_to_rgb(color_index)
-                    # Convert white to black
-                    if color.red() == 255 and color.green() == 255 and color.blue() == 255:
-                        return QColor(0, 0, 0)
-                    return color
-            
-            # Layer color
-            layer = self.doc.layers.get(entity.dxf.layer)
-            if layer:
-                if layer.rgb is not None:
-                    color = QColor(*layer.rgb)
-                    # Convert white to black
-                    if color.red() == 255 and color.green() == 255 and color.blue() == 255:
-                        return QColor(0, 0, 0)
-                    return color
-                elif hasattr(layer.dxf, 'color') and layer.dxf.color >= 0:
-                    color = self._aci_to_rgb(layer.dxf.color)
-                    # Convert white to black
-                    if color.red() == 255 and color.green() == 255 and color.blue() == 255:
-                        return QColor(0, 0, 0)
-                    return color
-        except Exception as e:
-            print(f"Color conversion error: {str(e)}")
-        
-        return QColor(0, 0, 0)  # Default color is now black
+    def _invalidate_tiles(self):
+        """Drop rendered tiles and the cached drawing after its appearance changed"""
+        self._base = None
+        if self.tiles:
+            self.tiles.invalidate(self.hidden_layers, self.fill_mode)
     
-    def _aci_to_rgb(self, color_index):
-        """
-        AutoCAD Color Index (ACI) color to RGB conversion
-        """
-        # AutoCAD standard color table
-        aci_colors = {
-            0: (0, 0, 0),       # ByBlock (Black)
-            1: (255, 0, 0),     # Red
-            2: (255, 255, 0),   # Yellow
-            3: (0, 255, 0),     # Green
-            4: (0, 255, 255),   # Cyan
-            5: (0, 0, 255),     # Blue
-            6: (255, 0, 255),   # Magenta
-            7: (0, 0, 0),       # White instead of Black
-            8: (128, 128, 128), # Dark Gray
-            9: (192, 192, 192), # Light Gray
-            256: (0, 0, 0),     # ByLayer (Black)
-        }
-        
-        # Color calculation for special index values
-        if color_index not in aci_colors:
-            if 0 <= color_index <= 255:
-                # More advanced color calculation algorithm
-                hue = (color_index % 6) * 60  # 0-360 HSV color tone
-                sat = 1.0  # Saturation
-                val = min(1.0, (color_index % 25) / 24.0)  # Brightness
-                
-                # HSV to RGB conversion
-                c = val * sat
-                x = c * (1 - abs((hue / 60) % 2 - 1))
-                m = val - c
-                
-                if 0 <= hue < 60:
-                    r, g, b = c, x, 0
-                elif 60 <= hue < 120:
-                    r, g, b = x, c, 0
-                elif 120 <= hue < 180:
-                    r, g, b = 0, c, x
-                elif 180 <= hue < 240:
-                    r, g, b = 0, x, c
-                elif 240 <= hue < 300:
-                    r, g, b = x, 0, c
-                else:
-                    r, g, b = c, 0, x
-                
-                return QColor(
-                    int((r + m) * 255),
-                    int((g + m) * 255),
-                    int((b + m) * 255)
-                )
-        
-        # Get color from standard color table
-        rgb = aci_colors.get(color_index, (0, 0, 0))
-        return QColor(*rgb)
-    
-    def _apply_linetype(self, pen, linetype_name):
-        if linetype_name == 'CONTINUOUS':
-            pen.setStyle(Qt.PenStyle.SolidLine)
-        elif linetype_name == 'DASHED':
-            pen.setStyle(Qt.PenStyle.DashLine)
-        elif linetype_name == 'DOTTED':
-            pen.setStyle(Qt.PenStyle.DotLine)
-        elif linetype_name == 'DASHDOT':
-            pen.setStyle(Qt.PenStyle.DashDotLine)
-        else:
-            pen.setStyle(Qt.PenStyle.SolidLine)
+    def _on_tile_ready(self, key):
+        if self.tiled_mode:
+            self.update(self.tiles.screen_rect(key, self.pan_x, self.pan_y, self.scale)
+                        .toAlignedRect())
     
     def wheelEvent(self, event):
         # Zoom based on mouse position
@@ -710,6 +533,7 @@ class DXFCanvas(QWidget):
         
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
+            self.press_pos = event.pos()
             if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
                 # Selection mode
                 self.selection_mode = True
@@ -737,21 +561,61 @@ class DXFCanvas(QWidget):
             self.pan_y += diff.y()
             self.last_pos = event.pos()
             self.update()
+        elif self.scene:
+            # Hover highlight follows the mouse
+            self._set_hover(self._pick(event.position()))
+    
+    def leaveEvent(self, event):
+        if self.scene:
+            self._set_hover(None)
+        super().leaveEvent(event)
+    
+    def _is_click(self, event):
+        """True if the mouse did not move far enough since the press to be a drag"""
+        if self.press_pos is None:
+            return False
+        moved = (event.pos() - self.press_pos).manhattanLength()
+        return moved < QApplication.startDragDistance()
     
     def mouseReleaseEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton and self.selection_mode:
+        if event.button() != Qt.MouseButton.LeftButton:
+            return
+        if self.scene and self._is_click(event):
+            if self.rubber_band:
+                self.rubber_band.hide()
+            # Ctrl+click toggles the picked entity, a plain click selects only it
+            self._pick_entity(self._pick(event.position()), self.selection_mode)
+            self.selection_mode = False
+            return
+        if self.selection_mode:
             if self.rubber_band:
                 # Get selection area
                 selection_rect = self.rubber_band.geometry()
                 self.rubber_band.hide()
                 
+                # Dragging right to left selects crossing entities,
+                # left to right only entities fully inside (window)
+                crossing = event.pos().x() < self.selection_start.x()
+                
                 # Find entities in selection area
-                self._select_entities_in_rect(selection_rect)
+                if self.scene:
+                    self._select_entities_in_rect(selection_rect, crossing)
                 
             self.selection_mode = False
-            self.update()
     
-    def _select_entities_in_rect(self, rect):
+    def _pick_entity(self, index, toggle=False):
+        """Select a picked entity, None clears the selection unless toggling"""
+        previous = set(self.selected_indices)
+        if toggle:
+            if index is not None:
+                self.selected_indices ^= {index}
+        else:
+            self.selected_indices.clear()
+            if index is not None:
+                self.selected_indices.add(index)
+        self._selection_changed(previous)
+    
+    def _select_entities_in_rect(self, rect, crossing=False):
         # Convert screen coordinates to world coordinates
         top_left = self._screen_to_world(QPointF(rect.left(), rect.top()))
         bottom_right = self._screen_to_world(QPointF(rect.right(), rect.bottom()))
@@ -763,66 +627,55 @@ class DXFCanvas(QWidget):
             max(-top_left[1], -bottom_right[1])   # Y coordinates are inverted
         )
         
+        previous = set(self.selected_indices)
+        
         # If CTRL key is not pressed, clear previous selection
         if not (QApplication.keyboardModifiers() & Qt.KeyboardModifier.ControlModifier):
-            self.selected_entities.clear()
+            self.selected_indices.clear()
         
         # Find entities in selection area
-        for entity in self.entities:
-            if self._entity_in_bounds(entity, selection_bounds):
-                self.selected_entities.add(entity)
-    
-    def _entity_in_bounds(self, entity, bounds):
-        entity_type = entity.dxftype()
-        
-        if entity_type == 'LINE':
-            start = entity.dxf.start
-            end = entity.dxf.end
-            return self._line_in_bounds(start, end, bounds)
-            
-        elif entity_type in ('CIRCLE', 'ARC'):
-            center = entity.dxf.center
-            radius = entity.dxf.radius
-            return self._circle_in_bounds(center, radius, bounds)
-            
-        elif entity_type in ('LWPOLYLINE', 'POLYLINE'):
-            points = list(entity.get_points('xy')) if entity_type == 'LWPOLYLINE' else \
-                    [vertex.dxf.location for vertex in entity.vertices]
-            return any(self._point_in_bounds(p, bounds) for p in points)
-        
-        return False
-    
-    def _line_in_bounds(self, start, end, bounds):
-        # Simple collision check - may need to be improved
-        return (self._point_in_bounds(start, bounds) or 
-                self._point_in_bounds(end, bounds))
-    
-    def _circle_in_bounds(self, center, radius, bounds):
-        return self._point_in_bounds(center, bounds)
+        self.selected_indices.update(
+            select_in_rect(self.scene, selection_bounds, crossing, self.hidden_layers)
+        )
+        self._selection_changed(previous)
     
-    def _point_in_bounds(self, point, bounds):
-        # Check if point is within bounds
-        x, y = point[0], point[1]
-        return (bounds[0] <= x <= bounds[2] and 
-                bounds[1] <= y <= bounds[3])
+    def _entity(self, index):
+        """ezdxf entity behind the scene row at index"""
+        return self.doc.entitydb.get(self.scene.handle(index))
     
     def set_layer_visibility(self, layer_name: str, visible: bool):
+        # Nothing to do if the layer already has this visibility
+        if visible == (layer_name not in self.hidden_layers):
+            return
         if not visible:
             self.hidden_layers.add(layer_name)
         else:
             self.hidden_layers.discard(layer_name)
+        self._invalidate_tiles()
         self.update() 
     
+    def set_visible_layers(self, visible):
+        """Show exactly the given layers, one repaint for any number of changes"""
+        layers = self.document.layers if self.document else ()
+        hidden = set(layers) - set(visible)
+        if hidden == self.hidden_layers:
+            return
+        self.hidden_layers = hidden
+        self._invalidate_tiles()
+        self.update()
+    
     def clear_selection(self):
         """Clear all selections"""
-        self.selected_entities.clear()
-        self.update() 
+        previous = set(self.selected_indices)
+        self.selected_indices.clear()
+        if self.scene:
+            self._selection_changed(previous)
     
     def _show_context_menu(self, position):
         menu = QMenu(self)
         
-        # If there are selected entities
-        if self.selected_entities:
+        # If there are selected entities, streamed documents are view only
+        if self.selected_indices and not self.document.read_only:
             edit_action = menu.addAction(self._tr("edit_properties"))
             edit_action.triggered.connect(self._edit_properties)
             
@@ -839,12 +692,18 @@ class DXFCanvas(QWidget):
     
     def _edit_properties(self):
         # Currently only single entity editing
-        if len(self.selected_entities) == 1:
-            entity = next(iter(self.selected_entities))
+        if len(self.selected_indices) == 1:
+            index = next(iter(self.selected_indices))
+            entity = self._entity(index)
             dialog = EntityPropertiesDialog(entity, self, self.current_language)
             if dialog.exec() == QDialog.DialogCode.Accepted:
+                old_boxes = self.scene.bboxes([index])
                 self._update_entity_properties(entity, dialog)
-                self.update()
+                # Rebuild the compiled geometry of the edited entity
+                self.scene.recompile(index, entity)
+                self.bounds = self.scene.bounds()
+                # Old and new geometry both need a repaint
+                self._drawing_changed(np.vstack([old_boxes, self.scene.bboxes([index])]))
     
     def _update_entity_properties(self, entity, dialog):
         # Update basic properties
@@ -875,20 +734,25 @@ class DXFCanvas(QWidget):
                                float(dialog.center_y.text()),
                                0)
             entity.dxf.radius = float(dialog.radius.text())
-            entity.dxf.start_angle = math.radians(float(dialog.start_angle.text()))
-            entity.dxf.end_angle = math.radians(float(dialog.end_angle.text()))
+            entity.dxf.start_angle = float(dialog.start_angle.text())
+            entity.dxf.end_angle = float(dialog.end_angle.text())
     
     def _delete_selected(self):
-        for entity in self.selected_entities:
-            self.entities.remove(entity)
+        boxes = self.scene.bboxes(self.selected_indices)
+        for index in self.selected_indices:
+            entity = self._entity(index)
+            self.scene.remove(index)
             # Also remove from DXF file
             if self.doc and self.doc.modelspace():
                 self.doc.modelspace().delete_entity(entity)
         
-        self.selected_entities.clear()
-        self.update() 
+        self.selected_indices.clear()
+        self.hover_index = None
+        self.bounds = self.scene.bounds()
+        self._drawing_changed(boxes)
     
     def toggle_fill_mode(self):
         """Toggle fill mode on/off"""
         self.fill_mode = not self.fill_mode
+        self._invalidate_tiles()
         self.update() 
\ No newline at end of file
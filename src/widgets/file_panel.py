@@ -1,27 +1,32 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QPushButton, 
-                           QLabel, QFileDialog, QTextEdit, QTreeWidget,
-                           QTreeWidgetItem, QCheckBox, QHBoxLayout, QToolBar, QFrame)
+                           QLabel, QTextEdit, QTreeView, QLineEdit,
+                           QHeaderView, QCheckBox, QHBoxLayout, QToolBar, QFrame)
 from PyQt6.QtCore import pyqtSignal, Qt
-from PyQt6.QtGui import QColor, QIcon, QAction, QFont
+from PyQt6.QtGui import QIcon, QAction, QFont
 from dxf_handler import DXFHandler
+from document_loader import DocumentLoader
 from translations import Translations
-
-class LayerItem(QTreeWidgetItem):
-    def __init__(self, layer_name, color):
-        super().__init__([layer_name])
-        self.layer_name = layer_name
-        self.color = color
-        self.setCheckState(0, Qt.CheckState.Checked)
+from thumbnails import ThumbnailService
+from widgets.open_dialog import DXFFileDialog
+from widgets.layer_model import LayerModel
 
 class FilePanel(QWidget):
-    file_loaded = pyqtSignal(str)
+    file_loaded = pyqtSignal(object)  # DXFDocument
     layer_visibility_changed = pyqtSignal(str, bool)  # layer_name, is_visible
+    visible_layers_changed = pyqtSignal(object)  # frozenset of visible layer names
+    layer_order_changed = pyqtSignal(list)  # layer names in navigation order
     
     def __init__(self, language=Translations.DEFAULT_LANGUAGE):
         super().__init__()
         self.dxf_handler = DXFHandler()
         self.current_language = language
+        self.thumbnails = None
         self._init_ui()
+        
+        # Files are parsed on a worker thread
+        self.loader = DocumentLoader(self)
+        self.loader.loaded.connect(self._on_document_loaded)
+        self.loader.failed.connect(self._on_load_failed)
     
     def _init_ui(self):
         layout = QVBoxLayout(self)
@@ -64,11 +69,30 @@ class FilePanel(QWidget):
         # Add control buttons to layout
         layout.addLayout(control_layout)
         
-        # Layer tree
-        self.layer_tree = QTreeWidget()
-        self.layer_tree.setHeaderLabel(self._tr("layers"))
-        self.layer_tree.setAnimated(True)
-        self.layer_tree.itemChanged.connect(self._on_layer_visibility_changed)
+        # Layer filter, narrows the list while typing
+        self.layer_filter = QLineEdit()
+        self.layer_filter.setPlaceholderText(self._tr("filter_layers"))
+        self.layer_filter.setClearButtonEnabled(True)
+        layout.addWidget(self.layer_filter)
+        
+        # Layer list, the model only builds the rows in view
+        self.layer_model = LayerModel(self)
+        self.layer_model.set_headers(self._tr("layers"), self._tr("entities"))
+        self.layer_model.visibility_changed.connect(self.layer_visibility_changed)
+        self.layer_filter.textChanged.connect(self.layer_model.set_filter)
+        self.layer_tree = QTreeView()
+        self.layer_tree.setModel(self.layer_model)
+        # Connected after the view so it runs once the view has reset its current index
+        self.layer_model.modelReset.connect(self._on_layer_rows_changed)
+        self.layer_tree.setRootIsDecorated(False)
+        self.layer_tree.setUniformRowHeights(True)
+        self.layer_tree.setSortingEnabled(True)
+        self.layer_tree.sortByColumn(LayerModel.COLUMN_NAME, Qt.SortOrder.AscendingOrder)
+        header = self.layer_tree.header()
+        header.setStretchLastSection(False)
+        header.setSectionResizeMode(LayerModel.COLUMN_NAME, QHeaderView.ResizeMode.Stretch)
+        # Sized from the largest count, fitting to contents would ask every row
+        header.setSectionResizeMode(LayerModel.COLUMN_COUNT, QHeaderView.ResizeMode.Fixed)
         self.layer_tree.setMinimumHeight(200)
         layout.addWidget(self.layer_tree)
         
@@ -221,11 +245,14 @@ class FilePanel(QWidget):
         self.next_layer_btn.setText(self._tr("next"))
         self.next_layer_btn.setToolTip(self._tr("tooltip_next"))
         
-        # Update layer tree header
-        self.layer_tree.setHeaderLabel(self._tr("layers"))
+        # Update layer list header and filter
+        self.layer_model.set_headers(self._tr("layers"), self._tr("entities"))
+        if self.dxf_handler.document:
+            self._fit_count_column(self.dxf_handler.document.scene.layer_counts())
+        self.layer_filter.setPlaceholderText(self._tr("filter_layers"))
         
         # Update info display if there's content
-        if self.dxf_handler.doc:
+        if self.dxf_handler.document:
             self._update_info_display_with_current_language()
     
     def _update_button_states(self, enabled=True):
@@ -238,214 +265,118 @@ class FilePanel(QWidget):
     
     def _select_all_layers(self):
         """Select all layers"""
-        root = self.layer_tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            item = root.child(i)
-            item.setCheckState(0, Qt.CheckState.Checked)
+        self._set_visible_layers(self.layer_model.names)
     
     def _clear_all_layers(self):
         """Clear all layer selections"""
-        root = self.layer_tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            item = root.child(i)
-            item.setCheckState(0, Qt.CheckState.Unchecked)
+        self._set_visible_layers(())
+    
+    def _set_visible_layers(self, visible):
+        """Check exactly the given layers with one signal instead of one per layer"""
+        visible = frozenset(visible)
+        self.layer_model.set_visible(visible)
+        self.visible_layers_changed.emit(visible)
     
     def _select_previous_layer(self):
         """Show previous layer, hide others"""
-        current_item = self.layer_tree.currentItem()
-        if not current_item:
-            return
-            
-        current_index = self.layer_tree.indexOfTopLevelItem(current_item)
-        if current_index > 0:
-            # Set current layer font to normal
-            self._set_normal_layer(current_item)
-            
-            # Hide all layers
-            self._hide_all_layers()
-            
-            # Show previous layer and make bold
-            prev_item = self.layer_tree.topLevelItem(current_index - 1)
-            self.layer_tree.setCurrentItem(prev_item)
-            prev_item.setCheckState(0, Qt.CheckState.Checked)
-            self._set_bold_layer(prev_item)
+        self._step_layer(-1)
     
     def _select_next_layer(self):
         """Show next layer, hide others"""
-        current_item = self.layer_tree.currentItem()
-        if not current_item:
+        self._step_layer(1)
+    
+    def _step_layer(self, step):
+        """Show only the layer step rows away from the current one and make it bold"""
+        current = self.layer_tree.currentIndex()
+        if not current.isValid():
+            return
+        row = current.row() + step
+        if not 0 <= row < self.layer_model.rowCount():
             return
-            
-        current_index = self.layer_tree.indexOfTopLevelItem(current_item)
-        if current_index < self.layer_tree.topLevelItemCount() - 1:
-            # Set current layer font to normal
-            self._set_normal_layer(current_item)
-            
-            # Hide all layers
-            self._hide_all_layers()
-            
-            # Show next layer and make bold
-            next_item = self.layer_tree.topLevelItem(current_index + 1)
-            self.layer_tree.setCurrentItem(next_item)
-            next_item.setCheckState(0, Qt.CheckState.Checked)
-            self._set_bold_layer(next_item)
+        name = self.layer_model.name_at(row)
+        self.layer_tree.setCurrentIndex(self.layer_model.index(row, LayerModel.COLUMN_NAME))
+        self.layer_model.set_current(name)
+        self._set_visible_layers([name])
+    
+    def _on_layer_rows_changed(self):
+        """Keep the current layer after filtering or sorting, tell listeners the new order"""
+        row = self.layer_model.row_of(self.layer_model.current)
+        if row >= 0:
+            index = self.layer_model.index(row, LayerModel.COLUMN_NAME)
+            self.layer_tree.setCurrentIndex(index)
+            self.layer_tree.scrollTo(index)
+        self.layer_order_changed.emit(self.layer_model.rows())
     
     def _select_file(self):
-        filepath, _ = QFileDialog.getOpenFileName(
-            self, self._tr("select_dxf_file"), "", self._tr("dxf_files")
-        )
-        if filepath:
-            try:
-                info = self.dxf_handler.load_file(filepath)
-                self._update_info_display(info)
-                self._update_layer_tree()
-                self.file_loaded.emit(filepath)
-            except Exception as e:
-                self.info_display.setText(f"{self._tr('error')}: {str(e)}")
+        # Thumbnail cache is opened on first use
+        if self.thumbnails is None:
+            self.thumbnails = ThumbnailService(parent=self)
+        dialog = DXFFileDialog(self, self.thumbnails, self.current_language)
+        accepted = dialog.exec()
+        files = dialog.selectedFiles()
+        dialog.deleteLater()
+        if accepted and files:
+            self._open_path(files[0])
+    
+    def _open_path(self, filepath):
+        """Start loading a DXF file in the background"""
+        self.loader.load(filepath)
+    
+    def cancel_loading(self):
+        """Cancel the running background load"""
+        self.loader.cancel()
+    
+    def _on_document_loaded(self, document):
+        info = self.dxf_handler.set_document(document)
+        self._update_info_display(info)
+        self._update_layer_tree()
+        self.file_loaded.emit(document)
+    
+    def _on_load_failed(self, message):
+        error_msg = self._tr("dxf_loading_error")
+        self.info_display.setText(f"{self._tr('error')}: {error_msg}: {message}")
     
     def _update_layer_tree(self):
-        self.layer_tree.clear()
-        if not self.dxf_handler.doc:
+        document = self.dxf_handler.document
+        if not document:
+            self.layer_model.set_layers([], {}, {})
             self._update_button_states(False)
             return
-            
-        # Get all layers except Defpoints and sort alphabetically
-        layers = [
-            layer for layer in self.dxf_handler.doc.layers 
-            if layer.dxf.name.lower() != 'defpoints'
-        ]
-        layers.sort(key=lambda x: x.dxf.name.lower())
-        
-        for layer in layers:
-            color = self._get_layer_color(layer)
-            item = LayerItem(layer.dxf.name, color)
-            item.setCheckState(0, Qt.CheckState.Checked)
-            self.layer_tree.addTopLevelItem(item)
+        
+        # Layers except Defpoints, colors become swatches when a row is shown
+        counts = document.scene.layer_counts()
+        self.layer_model.set_layers(document.layers, document.layer_colors, counts)
+        self._fit_count_column(counts)
         
         # Enable buttons when layers are loaded
         self._update_button_states(True)
         
         # Select first layer and make it bold
-        if self.layer_tree.topLevelItemCount() > 0:
-            first_item = self.layer_tree.topLevelItem(0)
-            self.layer_tree.setCurrentItem(first_item)
-            self._set_bold_layer(first_item)
+        if self.layer_model.rowCount() > 0:
+            self.layer_model.set_current(self.layer_model.name_at(0))
+            self._on_layer_rows_changed()
     
-    def _get_layer_color(self, layer):
-        try:
-            # First check RGB value
-            if layer.rgb is not None:
-                return QColor(*layer.rgb)
-            
-            # Check ACI color
-            if hasattr(layer.dxf, 'color'):
-                color_index = layer.dxf.color
-                if color_index >= 0:
-                    return self._aci_to_rgb(color_index)
-        except Exception as e:
-            print(f"{self._tr('color_conversion_error')}: {str(e)}")
-        
-        return QColor(255, 255, 255)  # Default white
-    
-    def _aci_to_rgb(self, color_index):
-        """Convert AutoCAD Color Index (ACI) to RGB"""
-        try:
-            # AutoCAD standard color table (extended)
-            aci_colors = {
-                0: (0, 0, 0),       # ByBlock (Black)
-                1: (255, 0, 0),     # Red
-                2: (255, 255, 0),   # Yellow
-                3: (0, 255, 0),     # Green
-                4: (0, 255, 255),   # Cyan
-                5: (0, 0, 255),     # Blue
-                6: (255, 0, 255),   # Magenta
-                7: (0, 0, 0),       # Black/White
-                8: (128, 128, 128), # Dark Gray
-                9: (192, 192, 192), # Light Gray
-                10: (255, 0, 0),    # Red
-                11: (255, 127, 127),
-                12: (204, 0, 0),
-                13: (204, 102, 102),
-                14: (153, 0, 0),
-                15: (153, 76, 76),
-                20: (255, 255, 0),  # Yellow
-                21: (255, 255, 127),
-                22: (204, 204, 0),
-                23: (204, 204, 102),
-                24: (153, 153, 0),
-                25: (153, 153, 76),
-                30: (0, 255, 0),    # Green
-                31: (127, 255, 127),
-                32: (0, 204, 0),
-                33: (102, 204, 102),
-                34: (0, 153, 0),
-                35: (76, 153, 76),
-                40: (0, 255, 255),  # Cyan
-                41: (127, 255, 255),
-                42: (0, 204, 204),
-                43: (102, 204, 204),
-                44: (0, 153, 153),
-                45: (76, 153, 153),
-                50: (0, 0, 255),    # Blue
-                51: (127, 127, 255),
-                52: (0, 0, 204),
-                53: (102, 102, 204),
-                54: (0, 0, 153),
-                55: (76, 76, 153),
-                60: (255, 0, 255),  # Magenta
-                61: (255, 127, 255),
-                62: (204, 0, 204),
-                63: (204, 102, 204),
-                64: (153, 0, 153),
-                65: (153, 76, 153),
-                250: (238, 238, 238),
-                251: (217, 217, 217),
-                252: (196, 196, 196),
-                253: (175, 175, 175),
-                254: (154, 154, 154),
-                255: (133, 133, 133),
-                256: (0, 0, 0),     # ByLayer (Black)
-            }
-            
-            # Use color from table if index exists
-            if color_index in aci_colors:
-                return QColor(*aci_colors[color_index])
-            
-            # Use AutoCAD's color algorithm if index not in table
-            if 0 <= color_index <= 255:
-                # AutoCAD color algorithm
-                base_index = (color_index - 1) // 10 * 10 + 1
-                if base_index in aci_colors:
-                    base_color = aci_colors[base_index]
-                    # Calculate tone variation
-                    factor = 1.0 - (0.1 * ((color_index - base_index) % 10))
-                    return QColor(
-                        int(base_color[0] * factor),
-                        int(base_color[1] * factor),
-                        int(base_color[2] * factor)
-                    )
-            
-            # Default color if no match found
-            return QColor(0, 0, 0)  # Default black
-            
-        except Exception as e:
-            print(f"{self._tr('color_conversion_error')} (ACI: {color_index}): {str(e)}")
-            return QColor(0, 0, 0)  # Black in case of error
+    def update_layer_counts(self):
+        """Show entity counts again after entities were deleted or edited"""
+        document = self.dxf_handler.document
+        if document:
+            counts = document.scene.layer_counts()
+            self.layer_model.set_counts(counts)
+            self._fit_count_column(counts)
     
-    def _on_layer_visibility_changed(self, item, column):
-        if isinstance(item, LayerItem):
-            is_visible = item.checkState(0) == Qt.CheckState.Checked
-            self.layer_visibility_changed.emit(item.layer_name, is_visible)
+    def _fit_count_column(self, counts):
+        """Size the count column for the widest count and its header"""
+        metrics = self.layer_tree.fontMetrics()
+        widest = str(max(counts.values(), default=0))
+        header = self.layer_tree.header()
+        width = max(metrics.horizontalAdvance(widest) + 16, header.sectionSizeHint(
+            LayerModel.COLUMN_COUNT))
+        header.resizeSection(LayerModel.COLUMN_COUNT, width)
     
     def _update_info_display(self, info):
-        # Show layer count excluding Defpoints
-        actual_layer_count = sum(
-            1 for layer in self.dxf_handler.doc.layers 
-            if layer.dxf.name.lower() != 'defpoints'
-        )
-        
+        # Layer count already excludes Defpoints
         text = f"{self._tr('file')}: {info.filename}\n"
-        text += f"{self._tr('layer_count')}: {actual_layer_count}\n\n"
+        text += f"{self._tr('layer_count')}: {info.layer_count}\n\n"
         text += f"{self._tr('geometry_types')}:\n"
         
         # Exclude entities in Defpoints layer
@@ -457,32 +388,26 @@ class FilePanel(QWidget):
         for entity_type, count in filtered_counts.items():
             text += f"- {entity_type}: {count}\n"
         
+        # Entities that are counted but have no drawable geometry
+        if info.skipped:
+            text += f"\n{self._tr('skipped_types')}:\n"
+            for entity_type, count in info.skipped.items():
+                text += f"- {entity_type}: {count}\n"
+        
+        if info.read_only:
+            text += f"\n{self._tr('view_only')}\n"
+        
         self.info_display.setText(text)
     
     def _update_info_display_with_current_language(self):
         """Update info display with current language"""
-        if self.dxf_handler.doc and self.dxf_handler.current_file:
+        if self.dxf_handler.document and self.dxf_handler.current_file:
             info = self.dxf_handler.get_info()
             self._update_info_display(info)
     
     def _hide_all_layers(self):
         """Hide all layers"""
-        root = self.layer_tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            item = root.child(i)
-            item.setCheckState(0, Qt.CheckState.Unchecked) 
-    
-    def _set_bold_layer(self, item):
-        """Make layer font bold (Show current layer)"""
-        font = item.font(0)
-        font.setBold(True)
-        item.setFont(0, font)
-    
-    def _set_normal_layer(self, item):
-        """Set layer font to normal"""
-        font = item.font(0)
-        font.setBold(False)
-        item.setFont(0, font) 
+        self._set_visible_layers(())
     
     def _toggle_fill(self):
         """Toggle fill mode on/off"""
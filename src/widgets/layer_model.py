@@ -0,0 +1,204 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QColor, QPixmap, QFont
+
+# Edge of the layer color swatch in pixels
+SWATCH_SIZE = 12
+
+# Item flags of the count column and the checkable name column
+COUNT_FLAGS = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+NAME_FLAGS = COUNT_FLAGS | Qt.ItemFlag.ItemIsUserCheckable
+
+
+class LayerModel(QAbstractTableModel):
+    """
+    Layers of a document as checkable rows with a color swatch and an
+    entity count. Filtering and sorting happen on name lists in the model,
+    the view only asks for the rows it shows.
+    """
+    COLUMN_NAME = 0
+    COLUMN_COUNT = 1
+
+    visibility_changed = pyqtSignal(str, bool)  # layer_name, is_visible
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._names = []       # All layers in sort order
+        self._rows = []        # Layers matching the filter, in sort order
+        self._keys = {}        # Layer name -> lower case name for filtering
+        self._colors = {}
+        self._counts = {}
+        self._visible = set()
+        self._current = None
+        self._filter = ''
+        self._sort = (self.COLUMN_NAME, Qt.SortOrder.AscendingOrder)
+        self._headers = ('', '')
+        # RGB -> swatch pixmap, created when a row is first shown
+        self._swatches = {}
+
+    def set_layers(self, names, colors, counts):
+        """Show a new layer table, all layers visible"""
+        self.beginResetModel()
+        self._names = list(names)
+        self._keys = {name: name.casefold() for name in self._names}
+        self._colors = colors
+        self._counts = counts
+        self._visible = set(self._names)
+        self._current = None
+        self._sort_names()
+        self._rows = self._matching(self._names, self._filter)
+        self.endResetModel()
+
+    def set_counts(self, counts):
+        """New entity counts per layer, e.g. after entities were deleted or edited"""
+        self._counts = counts
+        if self._sort[0] == self.COLUMN_COUNT:
+            # The order depends on the counts, rows are sorted again
+            self.sort(*self._sort)
+        elif self._rows:
+            self.dataChanged.emit(self.index(0, self.COLUMN_COUNT),
+                                  self.index(len(self._rows) - 1, self.COLUMN_COUNT),
+                                  [Qt.ItemDataRole.DisplayRole])
+
+    def set_headers(self, name, count):
+        self._headers = (name, count)
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, 1)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 2
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self._headers[section]
+        return None
+
+    def flags(self, index):
+        return NAME_FLAGS if index.column() == self.COLUMN_NAME else COUNT_FLAGS
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self._rows[index.row()]
+        if index.column() == self.COLUMN_COUNT:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return self._counts.get(name, 0)
+            if role == Qt.ItemDataRole.TextAlignmentRole:
+                return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            return None
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return name
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if name in self._visible else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self._swatch(self._colors.get(name, (255, 255, 255)))
+        if role == Qt.ItemDataRole.FontRole and name == self._current:
+            # Current layer of Prev/Next is bold
+            font = QFont()
+            font.setBold(True)
+            return font
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        name = self._rows[index.row()]
+        visible = Qt.CheckState(value) == Qt.CheckState.Checked
+        if visible == (name in self._visible):
+            return False
+        if visible:
+            self._visible.add(name)
+        else:
+            self._visible.discard(name)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        self.visibility_changed.emit(name, visible)
+        return True
+
+    def _swatch(self, rgb):
+        swatch = self._swatches.get(rgb)
+        if swatch is None:
+            swatch = QPixmap(SWATCH_SIZE, SWATCH_SIZE)
+            swatch.fill(QColor(*rgb))
+            self._swatches[rgb] = swatch
+        return swatch
+
+    @property
+    def names(self):
+        """All layers in sort order, filtered or not"""
+        return list(self._names)
+
+    def rows(self):
+        """Layers shown, in sort order"""
+        return list(self._rows)
+
+    def row_of(self, name):
+        """Row of a shown layer, -1 if it is filtered out"""
+        try:
+            return self._rows.index(name)
+        except ValueError:
+            return -1
+
+    def name_at(self, row):
+        return self._rows[row]
+
+    def visible_layers(self):
+        return frozenset(self._visible)
+
+    def set_visible(self, names):
+        """Check exactly the given layers with one change notification"""
+        self._visible = set(names) & set(self._names)
+        if self._rows:
+            self.dataChanged.emit(self.index(0, self.COLUMN_NAME),
+                                  self.index(len(self._rows) - 1, self.COLUMN_NAME),
+                                  [Qt.ItemDataRole.CheckStateRole])
+
+    @property
+    def current(self):
+        return self._current
+
+    def set_current(self, name):
+        """Make a layer the bold current one"""
+        changed = [self._current, name]
+        self._current = name
+        for layer in changed:
+            row = self.row_of(layer) if layer is not None else -1
+            if row >= 0:
+                index = self.index(row, self.COLUMN_NAME)
+                self.dataChanged.emit(index, index, [Qt.ItemDataRole.FontRole])
+
+    def set_filter(self, text):
+        """Show layers whose name contains text, narrowing searches the shown rows only"""
+        text = text.casefold()
+        if text == self._filter:
+            return
+        source = self._rows if text.startswith(self._filter) else self._names
+        self.beginResetModel()
+        self._filter = text
+        self._rows = self._matching(source, text)
+        self.endResetModel()
+
+    def _matching(self, names, text):
+        if not text:
+            return list(names)
+        keys = self._keys
+        return [name for name in names if text in keys[name]]
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.beginResetModel()
+        self._sort = (column, order)
+        self._sort_names()
+        self._rows = self._matching(self._names, self._filter)
+        self.endResetModel()
+
+    def _sort_names(self):
+        column, order = self._sort
+        keys = self._keys
+        if column == self.COLUMN_COUNT:
+            counts = self._counts
+            self._names.sort(key=lambda name: (counts.get(name, 0), keys[name]))
+        else:
+            self._names.sort(key=keys.__getitem__)
+        if order == Qt.SortOrder.DescendingOrder:
+            self._names.reverse()
@@ -0,0 +1,83 @@
+from PyQt6.QtWidgets import QFileDialog, QLabel, QVBoxLayout, QWidget
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPixmap
+from translations import Translations
+from thumbnails import THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT
+
+
+class DXFFileDialog(QFileDialog):
+    """File open dialog with a thumbnail preview of the selected DXF file"""
+
+    def __init__(self, parent, thumbnails, language=Translations.DEFAULT_LANGUAGE):
+        super().__init__(parent)
+        self.current_language = language
+        self.thumbnails = thumbnails
+        self.preview_path = None
+
+        self.setWindowTitle(self._tr("select_dxf_file"))
+        self.setNameFilter(self._tr("dxf_files"))
+        self.setFileMode(QFileDialog.FileMode.ExistingFile)
+        # Qt dialog, native dialogs cannot show extra widgets
+        self.setOption(QFileDialog.Option.DontUseNativeDialog)
+
+        self._init_preview()
+        self.currentChanged.connect(self._show_preview)
+        self.thumbnails.thumbnail_ready.connect(self._on_thumbnail_ready)
+        self.thumbnails.thumbnail_failed.connect(self._on_thumbnail_failed)
+
+    def _tr(self, key):
+        """Get translation for key"""
+        return Translations.get(key, self.current_language)
+
+    def _init_preview(self):
+        preview = QWidget(self)
+        layout = QVBoxLayout(preview)
+        layout.setContentsMargins(8, 0, 0, 0)
+
+        title = QLabel(self._tr("preview"))
+        layout.addWidget(title)
+
+        self.preview_label = QLabel()
+        self.preview_label.setFixedSize(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+        self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.preview_label.setWordWrap(True)
+        self.preview_label.setStyleSheet("""
+            QLabel {
+                background-color: #f8f9fa;
+                border: 1px solid #dcdde1;
+                color: #7f8c8d;
+            }
+        """)
+        layout.addWidget(self.preview_label)
+        layout.addStretch()
+
+        # Extra column to the right of the file list
+        grid = self.layout()
+        grid.addWidget(preview, 0, grid.columnCount(), grid.rowCount(), 1)
+
+    def _show_preview(self, filepath):
+        self.preview_path = filepath
+        if not filepath.lower().endswith('.dxf'):
+            self.preview_label.clear()
+            return
+
+        image = self.thumbnails.request(filepath)
+        if image is not None:
+            self.preview_label.setPixmap(QPixmap.fromImage(image))
+        else:
+            self.preview_label.setText(self._tr("preview_loading"))
+
+    def _on_thumbnail_ready(self, filepath, image):
+        # Ignore thumbnails of files that are no longer selected
+        if filepath == self.preview_path:
+            self.preview_label.setPixmap(QPixmap.fromImage(image))
+
+    def _on_thumbnail_failed(self, filepath, error):
+        if filepath == self.preview_path:
+            self.preview_label.setText(self._tr("preview_unavailable"))
+
+    def done(self, result):
+        # Queued thumbnails are not needed once the dialog closes
+        self.thumbnails.cancel_pending()
+        self.preview_path = None
+        super().done(result)
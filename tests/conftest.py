@@ -0,0 +1,22 @@
+"""
+Test configuration for DXF Viewer application.
+Makes the modules in src importable and provides a headless Qt application.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Tests never open a window
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def qt_app():
+    """Text layout and painter paths need a QGuiApplication"""
+    from PyQt6.QtGui import QGuiApplication
+    app = QGuiApplication.instance() or QGuiApplication([])
+    yield app
@@ -0,0 +1,56 @@
+"""Tests of the incremental layer extents"""
+
+import numpy as np
+
+from bounds import LayerBounds
+
+
+def brute_force(bboxes, codes, layer_id):
+    boxes = bboxes[codes == layer_id]
+    boxes = boxes[~np.isnan(boxes).any(axis=1)]
+    if not len(boxes):
+        return None
+    return (*boxes[:, :2].min(axis=0).tolist(), *boxes[:, 2:].max(axis=0).tolist())
+
+
+def test_initial_extents():
+    bboxes = np.array([[0, 0, 1, 1], [5, 5, 6, 7], [-2, 3, 0, 4], [np.nan] * 4], dtype=float)
+    codes = np.array([0, 0, 1, 1])
+    bounds = LayerBounds(bboxes, codes, {"A": 0, "B": 1, "EMPTY": 2})
+    assert bounds.layer("A") == (0, 0, 6, 7)
+    assert bounds.layer("B") == (-2, 3, 0, 4)
+    assert bounds.layer("EMPTY") is None
+    assert bounds.layer("MISSING") is None
+    assert bounds.union() == (-2, 0, 6, 7)
+    assert bounds.union(["B", "EMPTY"]) == (-2, 3, 0, 4)
+    assert bounds.union([]) is None
+
+
+def test_incremental_updates_match_full_scan():
+    rng = np.random.default_rng(0)
+    count = 500
+    corners = rng.uniform(0, 100, (count, 2))
+    bboxes = np.hstack([corners, corners + rng.uniform(0, 5, (count, 2))])
+    codes = rng.integers(0, 4, count)
+    layer_ids = {f"L{i}": i for i in range(4)}
+    bounds = LayerBounds(bboxes, codes, layer_ids)
+
+    for step in range(400):
+        index = int(rng.integers(count))
+        old_bbox = bboxes[index].copy()
+        old_id = int(codes[index])
+        action = rng.random()
+        if action < 0.2:
+            bboxes[index] = np.nan
+        elif action < 0.3:
+            # Edits can move entities to a new layer
+            layer_ids[f"L{len(layer_ids)}"] = len(layer_ids)
+            codes[index] = len(layer_ids) - 1
+        else:
+            corner = rng.uniform(-20, 120, 2)
+            bboxes[index] = np.concatenate([corner, corner + rng.uniform(0, 5, 2)])
+            codes[index] = rng.integers(0, len(layer_ids))
+        bounds.update(index, None if np.isnan(old_bbox).any() else old_bbox, old_id)
+
+        for name, layer_id in layer_ids.items():
+            assert bounds.layer(name) == brute_force(bboxes, codes, layer_id)
@@ -0,0 +1,105 @@
+"""Tests of the on-disk geometry cache"""
+
+import os
+
+import ezdxf
+import numpy as np
+
+from dxf_document import DXFDocument
+import geometry_cache
+from geometry_cache import GeometryCache, load_document
+
+
+def write_drawing(path):
+    doc = ezdxf.new()
+    doc.layers.add("WALLS", color=1)
+    msp = doc.modelspace()
+    msp.add_line((0, 0), (10, 0), dxfattribs={"layer": "WALLS"})
+    msp.add_circle((5, 5), 2)
+    msp.add_lwpolyline([(0, 0, 0, 0, 0.5), (4, 0), (4, 4)], format="xyseb", close=True)
+    msp.add_text("label", dxfattribs={"height": 1.5, "insert": (1, 8)})
+    block = doc.blocks.new("MARK")
+    block.add_circle((0, 0), 1)
+    msp.add_blockref("MARK", (20, 5), dxfattribs={"xscale": 2, "rotation": 30})
+    doc.saveas(path)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "drawing.dxf")
+    write_drawing(path)
+    cache = GeometryCache(str(tmp_path / "cache"))
+    assert cache.load(path) is None
+
+    parsed = load_document(path, cache=cache)
+    cached = cache.load(path)
+    assert cached is not None
+
+    expected = parsed.scene.store.arrays()
+    actual = cached.scene.store.arrays()
+    assert expected.keys() == actual.keys()
+    for name in expected:
+        np.testing.assert_array_equal(actual[name], expected[name], err_msg=name)
+    assert cached.scene.store.texts == parsed.scene.store.texts
+    assert cached.scene.store.layer_names == parsed.scene.store.layer_names
+    assert cached.scene.style_keys == parsed.scene.style_keys
+    assert cached.scene.bounds() == parsed.scene.bounds()
+    assert [cached.scene.handle(i) for i in range(len(cached.scene.store))] == \
+        [parsed.scene.handle(i) for i in range(len(parsed.scene.store))]
+
+
+def test_changed_file_misses(tmp_path):
+    path = str(tmp_path / "drawing.dxf")
+    write_drawing(path)
+    cache = GeometryCache(str(tmp_path / "cache"))
+    load_document(path, cache=cache)
+    assert cache.load(path) is not None
+
+    doc = ezdxf.readfile(path)
+    doc.modelspace().add_line((0, 0), (1, 1))
+    doc.saveas(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.load(path) is None
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = GeometryCache(str(tmp_path / "cache"), max_bytes=0)
+    paths = []
+    for name in ("a", "b"):
+        path = str(tmp_path / f"{name}.dxf")
+        write_drawing(path)
+        paths.append(path)
+        cache.store(DXFDocument.load(path))
+    # Every entry exceeds a zero budget
+    assert os.listdir(cache.directory) == []
+
+
+def test_evict_skips_vanished_entries(tmp_path, monkeypatch):
+    path = str(tmp_path / "drawing.dxf")
+    write_drawing(path)
+    cache = GeometryCache(str(tmp_path / "cache"))
+    cache.store(DXFDocument.load(path))
+
+    def vanished(path):
+        raise FileNotFoundError(path)
+
+    # Another process removes the entry between listing and stat
+    monkeypatch.setattr(geometry_cache.os.path, "getmtime", vanished)
+    cache.max_bytes = 0
+    cache.evict()
+    assert len(os.listdir(cache.directory)) == 1
+
+    GeometryCache(str(tmp_path / "missing")).evict()
+
+
+def test_load_without_cache(tmp_path, monkeypatch):
+    path = str(tmp_path / "drawing.dxf")
+    write_drawing(path)
+
+    def unused(*args):
+        raise AssertionError("cache used")
+
+    monkeypatch.setattr(GeometryCache, "load", unused)
+    monkeypatch.setattr(GeometryCache, "store", unused)
+    document = load_document(path, cache=None)
+    assert len(document.scene.store) > 0
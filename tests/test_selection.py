@@ -0,0 +1,166 @@
+"""Tests of picking and the distance functions behind it"""
+
+import ezdxf
+import numpy as np
+import pytest
+
+from dxf_document import DXFDocument
+from selection import (entity_distances, outline_distances, pick, quad_distances,
+                       quads_cross_rect, segment_distances, select_in_rect)
+
+
+def test_segment_distances():
+    starts = np.array([[0, 0], [0, 0], [5, 5]], dtype=float)
+    ends = np.array([[10, 0], [0, 10], [5, 5]], dtype=float)
+    np.testing.assert_allclose(segment_distances(starts, ends, np.array([5.0, 3.0])),
+                               [3.0, 5.0, 2.0])
+    # Beyond the ends the nearest end counts
+    np.testing.assert_allclose(segment_distances(starts, ends, np.array([-3.0, -4.0])),
+                               [5.0, 5.0, np.hypot(8, 9)])
+
+
+def test_quad_distances():
+    square = [[0, 0], [4, 0], [4, 4], [0, 4]]
+    # Rotated by 45 degrees, corners in clockwise order
+    diamond = [[0, 10], [2, 12], [4, 10], [2, 8]]
+    quads = np.array([square, diamond], dtype=float)
+    np.testing.assert_allclose(quad_distances(quads, np.array([1.0, 1.0])),
+                               [0.0, np.hypot(1, 7)])
+    np.testing.assert_allclose(quad_distances(quads, np.array([2.0, 10.0])), [6.0, 0.0])
+    np.testing.assert_allclose(quad_distances(quads, np.array([6.0, 2.0])),
+                               [2.0, np.hypot(4, 6)])
+
+
+def test_quads_cross_rect():
+    square = [[0, 0], [4, 0], [4, 4], [0, 4]]
+    diamond = [[0, 10], [2, 12], [4, 10], [2, 8]]
+    quads = np.array([square, diamond], dtype=float)
+    # Touching an edge, inside a quad, around a quad and in the corner gap of the diamond
+    assert quads_cross_rect(quads, (3, 3, 5, 5)).tolist() == [True, False]
+    assert quads_cross_rect(quads, (1.5, 9.5, 2.5, 10.5)).tolist() == [False, True]
+    assert quads_cross_rect(quads, (-1, -1, 5, 13)).tolist() == [True, True]
+    assert quads_cross_rect(quads, (3.2, 11.2, 4, 12)).tolist() == [False, False]
+
+
+def test_outline_distances():
+    outlines = [
+        [np.array([[0, 0], [10, 0]], dtype=float), np.array([[0, 5], [10, 5]], dtype=float)],
+        [np.array([[3, 3]], dtype=float)],
+        [],
+    ]
+    np.testing.assert_allclose(outline_distances(outlines, np.array([5.0, 4.0])),
+                               [1.0, np.hypot(2, 1), np.inf])
+
+
+@pytest.fixture(scope="module")
+def drawing(tmp_path_factory):
+    """Scene with nested and repeated block references, plus handles by name"""
+    doc = ezdxf.new()
+    doc.layers.add("TB")
+    msp = doc.modelspace()
+
+    border = doc.blocks.new("BORDER")
+    border.add_lwpolyline([(0, 0), (100, 0), (100, 70), (0, 70)], close=True)
+    border.add_line((60, 0), (60, 10), dxfattribs={"layer": "TB"})
+    inner = doc.blocks.new("INNER")
+    inner.add_circle((0, 0), 2)
+    outer = doc.blocks.new("OUTER")
+    outer.add_blockref("INNER", (10, 0))
+    outer.add_line((0, -5), (0, 5))
+
+    entities = {
+        "border": msp.add_blockref("BORDER", (0, 0)),
+        "line": msp.add_line((20, 30), (40, 30)),
+        "big_text": msp.add_text("BIG", dxfattribs={"height": 20, "insert": (10, 40)}),
+        "small_text": msp.add_text("s", dxfattribs={"height": 2, "insert": (50, 45)}),
+        "rotated": msp.add_blockref("OUTER", (200, 0),
+                                    dxfattribs={"rotation": 90, "xscale": 2, "yscale": 2}),
+        "grid": msp.add_blockref("INNER", (300, 0)),
+    }
+    grid = entities["grid"]
+    grid.dxf.column_count = 3
+    grid.dxf.column_spacing = 20
+    grid.dxf.row_count = 2
+    grid.dxf.row_spacing = 10
+
+    path = str(tmp_path_factory.mktemp("selection") / "inserts.dxf")
+    doc.saveas(path)
+    scene = DXFDocument.load(path).scene
+    handles = {name: entity.dxf.handle for name, entity in entities.items()}
+    return scene, handles
+
+
+def picked(scene, point, tolerance, hidden_layers=()):
+    index = pick(scene, point, tolerance, hidden_layers)
+    return None if index is None else scene.handle(index)
+
+
+def test_pick_insert_by_geometry(drawing):
+    scene, handles = drawing
+    assert picked(scene, (50, 0.3), 0.5) == handles["border"]
+    # The empty middle of a block reference is not a hit
+    assert picked(scene, (80, 20), 0.5) is None
+    # Geometry inside the box of a block reference wins
+    assert picked(scene, (30, 30.2), 0.5) == handles["line"]
+
+
+def test_pick_text(drawing):
+    scene, handles = drawing
+    assert picked(scene, (15, 45), 0.5) == handles["big_text"]
+    # Of nested text boxes the smaller one wins
+    assert picked(scene, (50.5, 45.5), 0.5) == handles["small_text"]
+
+
+def test_pick_transformed_and_repeated_inserts(drawing):
+    scene, handles = drawing
+    # INNER at (10, 0) in OUTER, rotated by 90 degrees and scaled by 2: radius 4 around (200, 20)
+    assert picked(scene, (204, 20), 0.3) == handles["rotated"]
+    assert picked(scene, (200, 20), 0.3) is None
+    # Third column of the MINSERT grid, second row
+    assert picked(scene, (342, 10), 0.2) == handles["grid"]
+    assert picked(scene, (330, 5), 0.2) is None
+
+
+def test_pick_skips_hidden_block_layers(drawing):
+    scene, handles = drawing
+    assert picked(scene, (60, 5), 0.3) == handles["border"]
+    assert picked(scene, (60, 5), 0.3, {"TB"}) is None
+
+
+def test_entity_distances(drawing):
+    scene, handles = drawing
+    rows = {scene.handle(i): i for i in range(len(scene.store)) if scene.kinds[i] >= 0}
+    indices = [rows[handles[name]] for name in ("border", "line", "big_text", "rotated")]
+    distances, boxed = entity_distances(scene, indices, (30, 33), 5.0)
+    assert distances[0] == pytest.approx(30.0)
+    assert distances[1] == pytest.approx(3.0)
+    assert boxed.tolist() == [False, False, True, False]
+    # Nothing of the rotated reference is within the searched tolerance
+    assert distances[3] == np.inf
+
+
+def selected(scene, rect, crossing=True, hidden_layers=()):
+    return sorted(scene.handle(i) for i in select_in_rect(scene, rect, crossing, hidden_layers))
+
+
+def test_crossing_selects_inserts_by_geometry(drawing):
+    scene, handles = drawing
+    assert selected(scene, (95, 65, 105, 75)) == [handles["border"]]
+    # Inside the box of the border but away from its lines
+    assert selected(scene, (70, 50, 80, 60)) == []
+    # Only the line on layer TB is touched
+    assert selected(scene, (58, 3, 62, 7)) == [handles["border"]]
+    assert selected(scene, (58, 3, 62, 7), hidden_layers={"TB"}) == []
+    # Nested circle of the rotated reference and its empty center
+    assert selected(scene, (203, 19, 205, 21)) == [handles["rotated"]]
+    assert selected(scene, (199, 19, 201, 21)) == []
+    # Second column of the MINSERT grid
+    assert selected(scene, (321, -1, 323, 1)) == [handles["grid"]]
+    assert selected(scene, (309, -1, 311, 1)) == []
+
+
+def test_window_selects_whole_inserts(drawing):
+    scene, handles = drawing
+    assert selected(scene, (70, 50, 80, 60), crossing=False) == []
+    assert selected(scene, (-1, -1, 101, 71), crossing=False) == sorted(
+        handles[name] for name in ("border", "line", "big_text", "small_text"))
@@ -0,0 +1,99 @@
+"""Tests of the spatial index against a brute force bounding box filter"""
+
+import numpy as np
+import pytest
+
+from spatial_index import GridIndex, LayerIndex
+
+
+def random_boxes(rng, count, extent=1000.0, max_size=20.0):
+    corners = rng.uniform(0, extent, (count, 2))
+    sizes = rng.exponential(max_size / 4, (count, 2)).clip(0, max_size)
+    return np.hstack([corners, corners + sizes])
+
+
+def brute_force(bboxes, rect):
+    min_x, min_y, max_x, max_y = rect
+    hits = ((bboxes[:, 0] <= max_x) & (bboxes[:, 2] >= min_x) &
+            (bboxes[:, 1] <= max_y) & (bboxes[:, 3] >= min_y))
+    return np.flatnonzero(hits)
+
+
+def random_rects(rng, count, extent=1000.0):
+    corners = rng.uniform(-50, extent, (count, 2))
+    sizes = rng.uniform(0, extent / 4, (count, 2))
+    # A few rects covering most of the grid take the full scan path
+    sizes[:count // 10] = extent
+    return np.hstack([corners, corners + sizes])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_grid_query_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    bboxes = random_boxes(rng, 5000)
+    # Entities spanning many cells go to the separate large list
+    bboxes[:20, 2:] += 400
+    bboxes[20:40] = np.nan
+    grid = GridIndex(bboxes)
+    for rect in random_rects(rng, 100):
+        np.testing.assert_array_equal(grid.query(rect), brute_force(bboxes, rect))
+
+
+def test_grid_query_degenerate_boxes():
+    # Points and a drawing of zero height
+    bboxes = np.array([[x, 5.0, x, 5.0] for x in range(100)], dtype=float)
+    grid = GridIndex(bboxes)
+    for rect in [(10, 5, 20, 5), (-1, 0, 0.5, 10), (50.5, 4, 50.7, 6), (0, 6, 100, 7)]:
+        np.testing.assert_array_equal(grid.query(rect), brute_force(bboxes, rect))
+
+
+def test_grid_query_empty():
+    grid = GridIndex(np.empty((0, 4)))
+    assert len(grid.query((0, 0, 1, 1))) == 0
+
+
+def test_grid_update_matches_brute_force():
+    rng = np.random.default_rng(3)
+    bboxes = random_boxes(rng, 2000)
+    grid = GridIndex(bboxes)
+    moved = rng.choice(len(bboxes), 300, replace=False)
+    for index in moved[:250]:
+        grid.update(index, random_boxes(rng, 1, extent=1500.0)[0])
+    for index in moved[250:]:
+        grid.update(index, None)
+    for rect in random_rects(rng, 100, extent=1500.0):
+        np.testing.assert_array_equal(grid.query(rect), brute_force(grid.bboxes, rect))
+
+
+def test_grid_subset_ids():
+    rng = np.random.default_rng(4)
+    bboxes = random_boxes(rng, 1000)
+    ids = np.flatnonzero(rng.random(len(bboxes)) < 0.3)
+    grid = GridIndex(bboxes, ids)
+    for rect in random_rects(rng, 50):
+        expected = np.intersect1d(brute_force(bboxes, rect), ids)
+        np.testing.assert_array_equal(grid.query(rect), expected)
+
+
+@pytest.mark.parametrize("hidden_count", [0, 2, 45])
+def test_layer_query_matches_brute_force(hidden_count):
+    rng = np.random.default_rng(5)
+    bboxes = random_boxes(rng, 3000)
+    layer_ids = {f"L{i}": i for i in range(50)}
+    codes = rng.integers(0, len(layer_ids), len(bboxes))
+    layers = LayerIndex(GridIndex(bboxes), codes, layer_ids)
+    hidden = {f"L{i}" for i in range(hidden_count)}
+    visible = layers.visible_mask(hidden)
+    for rect in random_rects(rng, 50):
+        expected = brute_force(bboxes, rect)
+        expected = expected[codes[expected] >= hidden_count]
+        np.testing.assert_array_equal(layers.query(rect, visible), expected)
+
+
+def test_layer_counts():
+    codes = np.array([0, 2, 2, 1, 2])
+    bboxes = np.zeros((5, 4))
+    bboxes[1] = np.nan
+    layers = LayerIndex(GridIndex(bboxes), codes, {"A": 0, "B": 1, "C": 2})
+    assert layers.counts().tolist() == [1, 1, 2]
+    assert layers.rows(2).tolist() == [2, 4]
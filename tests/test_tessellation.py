@@ -0,0 +1,64 @@
+"""Tests of the polyline bulge tessellation"""
+
+import numpy as np
+import pytest
+
+from tessellation import BulgePolyline, lod_level
+
+
+def test_straight_segments_keep_vertices():
+    vertices = np.array([[0, 0], [10, 0], [10, 5]], dtype=float)
+    polyline = BulgePolyline(vertices, np.zeros(3), None, False)
+    np.testing.assert_allclose(polyline.points(0), vertices)
+    np.testing.assert_allclose(polyline.points(6), vertices)
+
+
+@pytest.mark.parametrize("bulge", [1.0, -1.0, 0.3, -2.5])
+@pytest.mark.parametrize("level", [0, 4, 8])
+def test_arc_points_on_circle(bulge, level):
+    start = np.array([0.0, 0.0])
+    end = np.array([4.0, 2.0])
+    polyline = BulgePolyline(np.array([start, end]), np.array([bulge, 0.0]), None, False)
+    points = polyline.points(level)
+    np.testing.assert_allclose(points[0], start, atol=1e-9)
+    np.testing.assert_allclose(points[-1], end, atol=1e-9)
+
+    # Center left of the chord for positive bulges, sweep 4 * atan(bulge)
+    chord = end - start
+    normal = np.array([-chord[1], chord[0]])
+    center = start + chord / 2 + normal * (1 - bulge ** 2) / (4 * bulge)
+    radius = np.hypot(*(start - center))
+    np.testing.assert_allclose(np.hypot(*(points - center).T), radius)
+
+    angles = np.unwrap(np.arctan2(*(points - center).T[::-1]))
+    steps = np.diff(angles)
+    assert np.all(np.sign(steps) == np.sign(bulge))
+    assert angles[-1] - angles[0] == pytest.approx(4 * np.arctan(bulge))
+
+    # Chords stay within the tolerance of the level
+    sagitta = radius * (1 - np.cos(steps / 2))
+    assert sagitta.max() <= polyline.tolerance(level) + 1e-9
+
+
+def test_finer_levels_add_points():
+    polyline = BulgePolyline(np.array([[0, 0], [10, 0]], dtype=float),
+                             np.array([1.0, 0.0]), None, False)
+    counts = [len(polyline.points(level)) for level in range(0, 10, 3)]
+    assert counts == sorted(counts)
+    assert counts[0] < counts[-1]
+
+
+def test_closed_polyline_closing_bulge():
+    # Two half circles make a full circle of radius 1 around (1, 0)
+    vertices = np.array([[0, 0], [2, 0]], dtype=float)
+    polyline = BulgePolyline(vertices, np.array([1.0, 1.0]), None, True)
+    points = polyline.points(6)
+    np.testing.assert_allclose(np.hypot(points[:, 0] - 1, points[:, 1]), 1.0)
+    assert points[:, 1].min() < -0.99 and points[:, 1].max() > 0.99
+
+
+def test_level_grows_with_scale():
+    polyline = BulgePolyline(np.array([[0, 0], [10, 0]], dtype=float),
+                             np.array([0.5, 0.0]), None, False)
+    assert polyline.level(1.0) == lod_level(10.0)
+    assert polyline.level(100.0) >= polyline.level(1.0)